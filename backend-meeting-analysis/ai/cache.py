@@ -0,0 +1,261 @@
+"""Result cache for AI extraction - in-process LRU tier + shared SQLite tier"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+from utils.metrics import cache_requests_total, errors_total
+
+# stats counter -> result label of the cache_requests_total metric
+LOOKUP_RESULTS = {"memory_hits": "memory_hit", "disk_hits": "disk_hit", "misses": "miss"}
+
+
+def normalize_text(text):
+    """Normalize document text so trivial whitespace changes hit the same entry."""
+    text = (text or "").replace("\r\n", "\n").replace("\r", "\n")
+    text = re.sub(r"[ \t\f\v]+", " ", text)
+    text = re.sub(r" ?\n ?", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def make_cache_key(text, model, prompt_version, extra=""):
+    """Content-addressed key: hash of normalized text, model and prompt version."""
+    digest = hashlib.sha256()
+    for part in (model, prompt_version, extra, normalize_text(text)):
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class MemoryTier:
+    """Thread-safe LRU with TTL and size-based eviction (entries and bytes)."""
+
+    def __init__(self, max_entries, max_bytes, ttl_seconds):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, size, entry)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, size, entry = item
+            if expires_at < time.time():
+                del self._entries[key]
+                self._bytes -= size
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry, size, expires_at=None):
+        """Store entry for ttl_seconds, or until expires_at if that comes first."""
+        if size > self.max_bytes:
+            return
+        ttl_expiry = time.time() + self.ttl_seconds
+        if expires_at is not None:
+            ttl_expiry = min(ttl_expiry, expires_at)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (ttl_expiry, size, entry)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteTier:
+    """Persistent tier shared by all worker processes (WAL mode, one connection per thread)."""
+
+    def __init__(self, path, ttl_seconds, max_entries):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS insights_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                llm_seconds REAL NOT NULL DEFAULT 0,
+                tokens INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_insights_cache_created ON insights_cache (created_at)")
+        conn.commit()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value, created_at, llm_seconds, tokens FROM insights_cache WHERE key = ?",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, created_at, llm_seconds, tokens = row
+        expires_at = created_at + self.ttl_seconds
+        if expires_at < time.time():
+            return None
+        return {"data": json.loads(value), "llm_seconds": llm_seconds, "tokens": tokens, "expires_at": expires_at}
+
+    def put(self, key, value_json, llm_seconds, tokens):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO insights_cache (key, value, created_at, llm_seconds, tokens) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, value_json, time.time(), llm_seconds, tokens)
+        )
+        conn.commit()
+        self._writes += 1
+        if self._writes % 50 == 0:
+            self.prune()
+
+    def prune(self):
+        """Drop expired rows and keep at most max_entries of the newest."""
+        conn = self._connection()
+        conn.execute("DELETE FROM insights_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        conn.execute(
+            "DELETE FROM insights_cache WHERE key NOT IN "
+            "(SELECT key FROM insights_cache ORDER BY created_at DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+        conn.commit()
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM insights_cache")
+        conn.commit()
+
+
+class InsightsCache:
+    """Two-tier cache for parsed LLM output with hit/miss accounting."""
+
+    def __init__(self, memory_tier, disk_tier=None):
+        self.memory = memory_tier
+        self.disk = disk_tier
+        self._lock = threading.Lock()
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "errors": 0,
+            "llm_seconds_saved": 0.0,
+            "tokens_saved": 0,
+        }
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self.stats[name] += delta
+        for name, result in LOOKUP_RESULTS.items():
+            if name in deltas:
+                cache_requests_total.inc(cache="insights", result=result)
+        if "errors" in deltas:
+            errors_total.inc(component="insights_cache")
+
+    def get(self, key):
+        """Return the cached LLM data dict for key, or None."""
+        entry = self.memory.get(key)
+        if entry is not None:
+            self._count(memory_hits=1, llm_seconds_saved=entry["llm_seconds"], tokens_saved=entry["tokens"])
+            return entry["data"]
+
+        if self.disk is not None:
+            try:
+                entry = self.disk.get(key)
+            except sqlite3.Error as e:
+                print(f"⚠️ Insights cache read error: {e}")
+                self._count(errors=1)
+                entry = None
+            if entry is not None:
+                size = len(json.dumps(entry["data"]))
+                # Promoted with what is left of the disk row's lifetime, not a fresh memory TTL
+                self.memory.put(key, entry, size, expires_at=entry["expires_at"])
+                self._count(disk_hits=1, llm_seconds_saved=entry["llm_seconds"], tokens_saved=entry["tokens"])
+                return entry["data"]
+
+        self._count(misses=1)
+        return None
+
+    def put(self, key, data, llm_seconds=0.0, tokens=0):
+        """Store LLM data dict together with what it cost to produce."""
+        value_json = json.dumps(data)
+        entry = {"data": data, "llm_seconds": llm_seconds, "tokens": tokens or 0}
+        self.memory.put(key, entry, len(value_json))
+        if self.disk is not None:
+            try:
+                self.disk.put(key, value_json, llm_seconds, tokens or 0)
+            except sqlite3.Error as e:
+                print(f"⚠️ Insights cache write error: {e}")
+                self._count(errors=1)
+        self._count(stores=1)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((lookups - stats["misses"]) / lookups, 4) if lookups else 0.0
+        stats["llm_seconds_saved"] = round(stats["llm_seconds_saved"], 2)
+        stats["memory_entries"] = len(self.memory)
+        stats["enabled"] = Config.INSIGHTS_CACHE_ENABLED
+        return stats
+
+
+def create_insights_cache():
+    """Build the cache from Config; the disk tier is skipped if the path is empty."""
+    memory = MemoryTier(
+        max_entries=Config.INSIGHTS_CACHE_MAX_ENTRIES,
+        max_bytes=Config.INSIGHTS_CACHE_MAX_BYTES,
+        ttl_seconds=Config.INSIGHTS_CACHE_TTL
+    )
+    disk = None
+    if Config.INSIGHTS_CACHE_PATH:
+        try:
+            disk = SQLiteTier(
+                Config.INSIGHTS_CACHE_PATH,
+                ttl_seconds=Config.INSIGHTS_CACHE_TTL,
+                max_entries=Config.INSIGHTS_CACHE_DISK_MAX_ENTRIES
+            )
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️ Insights cache disk tier disabled: {e}")
+    return InsightsCache(memory, disk)
+
+
+insights_cache = create_insights_cache()
@@ -0,0 +1,144 @@
+"""Chunked (map-reduce) extraction helpers - splitting long protocols and merging results"""
+import re
+
+# Rough size of one model token in characters (good enough for mistral on EN/DE prose)
+CHARS_PER_TOKEN = 4
+
+# Lines that start a new section: "1. Project Timeline", "ATTENDEES", "Teilnehmer:", "# Heading", "---"
+SECTION_HEADING = re.compile(
+    r"^\s*(?:"
+    r"#{1,6}\s+\S.*"                              # markdown heading
+    r"|\d{1,2}(?:\.\d{1,2})*[.)]\s+\S.{0,80}"     # numbered heading
+    r"|[A-ZÄÖÜ][A-ZÄÖÜ0-9 /&()\-]{2,60}:?"        # ALL CAPS heading
+    r"|[A-ZÄÖÜ][\wäöüß ./&\-]{1,60}:"             # "Teilnehmer:" / "Aufgaben zu nächster Woche:"
+    r"|[=\-_*═]{3,}"                              # separator line
+    r")\s*$"
+)
+
+# Category -> fields identifying the same entry across chunks (None = plain string entries)
+DEDUP_FIELDS = {
+    "participants": ("email",),
+    "action_items": ("description", "assignee"),
+    "decisions": None,
+    "changes": None,
+    "risks": ("description",),
+    "questions": ("question",),
+    "agreements": None,
+    "delays": ("item",),
+    "milestones": ("event", "date"),
+    "reminders": ("reminder",),
+    "compliance": ("item",),
+}
+
+
+def estimate_tokens(text):
+    """Cheap token estimate used for chunk sizing."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_sections(text):
+    """Split text into sections, each starting at a heading line."""
+    sections = []
+    current = []
+    for line in text.split("\n"):
+        if current and SECTION_HEADING.match(line):
+            sections.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("\n".join(current))
+    return [s for s in sections if s.strip()]
+
+
+def split_oversized(section, max_chars):
+    """Split a section that does not fit into one chunk on paragraph, line and word boundaries."""
+    if len(section) <= max_chars:
+        return [section]
+
+    for separator in ("\n\n", "\n", " "):
+        parts = section.split(separator)
+        if len(parts) > 1:
+            break
+    else:
+        return [section[i:i + max_chars] for i in range(0, len(section), max_chars)]
+
+    pieces = []
+    current = ""
+    for part in parts:
+        candidate = f"{current}{separator}{part}" if current else part
+        if len(candidate) <= max_chars:
+            current = candidate
+            continue
+        if current:
+            pieces.append(current)
+        if len(part) > max_chars:
+            pieces.extend(split_oversized(part, max_chars))
+            current = ""
+        else:
+            current = part
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_into_chunks(text, max_tokens):
+    """Greedily pack whole sections into chunks of at most max_tokens (estimated)."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks = []
+    current = ""
+    for section in split_sections(text):
+        for piece in split_oversized(section, max_chars):
+            candidate = f"{current}\n{piece}" if current else piece
+            if len(candidate) <= max_chars:
+                current = candidate
+            else:
+                chunks.append(current)
+                current = piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def normalize_for_dedup(value):
+    """Lowercase, drop punctuation and collapse whitespace."""
+    if value is None:
+        return ""
+    value = re.sub(r"[^\w\s]", " ", str(value).lower())
+    return " ".join(value.split())
+
+
+def dedup_key(item, fields):
+    if fields is None or not isinstance(item, dict):
+        return normalize_for_dedup(item if not isinstance(item, dict) else sorted(item.items()))
+    return tuple(normalize_for_dedup(item.get(field)) for field in fields)
+
+
+def merge_insights_data(results):
+    """Merge per-chunk LLM outputs (in chunk order) into one data dict.
+
+    Entries that describe the same thing in several chunks are kept once;
+    empty fields of the first occurrence are filled from later duplicates.
+    """
+    merged = {}
+    seen = {}
+    for data in results:
+        if not isinstance(data, dict):
+            continue
+        for category, items in data.items():
+            if not isinstance(items, list):
+                continue
+            fields = DEDUP_FIELDS.get(category)
+            bucket = merged.setdefault(category, [])
+            index = seen.setdefault(category, {})
+            for item in items:
+                key = dedup_key(item, fields)
+                if key in index:
+                    existing = bucket[index[key]]
+                    if isinstance(existing, dict) and isinstance(item, dict):
+                        for field, value in item.items():
+                            if value and not existing.get(field):
+                                existing[field] = value
+                    continue
+                index[key] = len(bucket)
+                bucket.append(dict(item) if isinstance(item, dict) else item)
+    return merged
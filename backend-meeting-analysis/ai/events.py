@@ -0,0 +1,274 @@
+"""Event schema - slotted structs for everything the extraction produces
+
+LLM (or rule) output entries are decoded and validated straight into these structs,
+one pass per entry, all sharing the timestamp of their request. Each struct knows its
+JSON layout (field order, fields left out when empty), so API responses, RabbitMQ
+messages and SSE payloads keep the shape the old dict events had.
+Serialise with utils.fastjson - it calls to_dict() for every struct it meets.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import ClassVar
+
+PRIORITIES = ("high", "medium", "low")
+
+
+def utc_timestamp():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def as_text(value, default=None):
+    """LLM scalar -> str; None/'' -> default."""
+    if value is None or value == "":
+        return default
+    return value if isinstance(value, str) else str(value)
+
+
+def as_priority(value, default="medium"):
+    value = as_text(value, default).lower()
+    return value if value in PRIORITIES else default
+
+
+@dataclass(slots=True)
+class Event:
+    """Base event; subclasses add their fields and a decode() for one LLM entry."""
+    type: str
+    message: str
+    timestamp: str
+    priority: str = "medium"
+    # Built from a structured (dict) entry rather than a bare string
+    detailed: bool = False
+
+    # (field, omit when empty) in output order, for dict and string entries
+    FIELDS: ClassVar[tuple] = (("type", False), ("message", False), ("timestamp", False), ("priority", False))
+    SIMPLE_FIELDS: ClassVar[tuple] = FIELDS
+
+    def to_dict(self):
+        out = {}
+        for name, optional in (self.FIELDS if self.detailed else self.SIMPLE_FIELDS):
+            value = getattr(self, name)
+            if optional and not value:
+                continue
+            out[name] = value
+        return out
+
+
+@dataclass(slots=True)
+class StatementEvent(Event):
+    """Decisions, changes and agreements - one line of text each."""
+    LABEL: ClassVar[str] = ""
+
+    @classmethod
+    def decode(cls, entry, i, timestamp):
+        return cls(cls.LABEL.lower(), f"{cls.LABEL} {i+1}: {entry}", timestamp)
+
+
+@dataclass(slots=True)
+class DecisionEvent(StatementEvent):
+    LABEL: ClassVar[str] = "Decision"
+
+
+@dataclass(slots=True)
+class ChangeEvent(StatementEvent):
+    LABEL: ClassVar[str] = "Change"
+
+
+@dataclass(slots=True)
+class AgreementEvent(StatementEvent):
+    LABEL: ClassVar[str] = "Agreement"
+
+
+@dataclass(slots=True)
+class ActionItemEvent(Event):
+    description: str = None
+    assignee: str = None
+    deadline: str = None
+    assignee_email: str = None
+
+    FIELDS: ClassVar[tuple] = (("type", False), ("message", False), ("description", False), ("timestamp", False),
+                               ("priority", False), ("assignee", True), ("deadline", True), ("assignee_email", True))
+
+    @classmethod
+    def decode(cls, entry, i, timestamp):
+        if not isinstance(entry, dict):
+            return cls("action_item", f"Action Item {i+1}: {entry}", timestamp)
+
+        description = as_text(entry.get('description'), 'No description')
+        assignee = as_text(entry.get('assignee'))
+        deadline = as_text(entry.get('deadline'))
+
+        message = f"Action Item {i+1}: {description}"
+        if assignee:
+            message += f" (Assigned to: {assignee})"
+        if deadline:
+            message += f" – Deadline: {deadline}"
+        return cls("action_item", message, timestamp, as_priority(entry.get('priority')), True,
+                   description, assignee, deadline, as_text(entry.get('assignee_email')))
+
+
+@dataclass(slots=True)
+class RiskEvent(Event):
+    description: str = None
+    severity: str = None
+    raised_by: str = None
+
+    FIELDS: ClassVar[tuple] = (("type", False), ("message", False), ("description", False), ("timestamp", False),
+                               ("priority", False), ("severity", False), ("raised_by", False))
+
+    @classmethod
+    def decode(cls, entry, i, timestamp):
+        if not isinstance(entry, dict):
+            return cls("risk", f"Risk {i+1}: {entry}", timestamp)
+
+        description = as_text(entry.get('description'), 'No description')
+        severity = as_priority(entry.get('severity'))
+        raised_by = as_text(entry.get('raised_by'))
+
+        message = f"Risk {i+1}: {description}"
+        if raised_by:
+            message += f" (Raised by: {raised_by})"
+        return cls("risk", message, timestamp, "high" if severity == "high" else "medium", True,
+                   description, severity, raised_by)
+
+
+@dataclass(slots=True)
+class QuestionEvent(Event):
+    question: str = None
+    asked_by: str = None
+    status: str = "open"
+
+    FIELDS: ClassVar[tuple] = (("type", False), ("message", False), ("question", False), ("timestamp", False),
+                               ("priority", False), ("asked_by", False), ("status", False))
+    SIMPLE_FIELDS: ClassVar[tuple] = Event.FIELDS + (("status", False),)
+
+    @classmethod
+    def decode(cls, entry, i, timestamp):
+        if not isinstance(entry, dict):
+            return cls("question", f"Question {i+1}: {entry}", timestamp)
+
+        question = as_text(entry.get('question'), 'No question')
+        asked_by = as_text(entry.get('asked_by'))
+
+        message = f"Question {i+1}: {question}"
+        if asked_by:
+            message += f" (Asked by: {asked_by})"
+        return cls("question", message, timestamp, "medium", True, question, asked_by)
+
+
+@dataclass(slots=True)
+class DelayEvent(Event):
+    item: str = None
+    original_date: str = None
+    new_date: str = None
+    reason: str = None
+
+    FIELDS: ClassVar[tuple] = (("type", False), ("message", False), ("item", False), ("timestamp", False),
+                               ("priority", False), ("original_date", False), ("new_date", False), ("reason", False))
+
+    @classmethod
+    def decode(cls, entry, i, timestamp):
+        if not isinstance(entry, dict):
+            return cls("delay", f"Delay {i+1}: {entry}", timestamp, "high")
+
+        item = as_text(entry.get('item'), 'Unknown item')
+        original_date = as_text(entry.get('original_date'))
+        new_date = as_text(entry.get('new_date'))
+        reason = as_text(entry.get('reason'), 'No reason provided')
+
+        message = f"Delay {i+1}: {item}"
+        if original_date and new_date:
+            message += f" (from {original_date} to {new_date})"
+        message += f" – Reason: {reason}"
+        return cls("delay", message, timestamp, "high", True, item, original_date, new_date, reason)
+
+
+@dataclass(slots=True)
+class MilestoneEvent(Event):
+    event: str = None
+    date: str = None
+    owner: str = None
+
+    FIELDS: ClassVar[tuple] = (("type", False), ("message", False), ("event", False), ("timestamp", False),
+                               ("priority", False), ("date", True), ("owner", True))
+
+    @classmethod
+    def decode(cls, entry, i, timestamp):
+        if not isinstance(entry, dict):
+            return cls("milestone", f"Milestone {i+1}: {entry}", timestamp, "high")
+
+        event = as_text(entry.get('event'), 'Unknown event')
+        date = as_text(entry.get('date'))
+        owner = as_text(entry.get('owner'))
+
+        message = f"Milestone {i+1}: {event}"
+        if date:
+            message += f" – Date: {date}"
+        if owner:
+            message += f" (Owner: {owner})"
+        return cls("milestone", message, timestamp, "high", True, event, date, owner)
+
+
+@dataclass(slots=True)
+class ReminderEvent(Event):
+    reminder: str = None
+    deadline: str = None
+
+    FIELDS: ClassVar[tuple] = (("type", False), ("message", False), ("reminder", False), ("timestamp", False),
+                               ("priority", False), ("deadline", True))
+
+    @classmethod
+    def decode(cls, entry, i, timestamp):
+        if not isinstance(entry, dict):
+            return cls("reminder", f"Reminder {i+1}: {entry}", timestamp)
+
+        reminder = as_text(entry.get('reminder'), 'No reminder')
+        deadline = as_text(entry.get('deadline'))
+
+        message = f"Reminder {i+1}: {reminder}"
+        if deadline:
+            message += f" – Deadline: {deadline}"
+        return cls("reminder", message, timestamp, "medium", True, reminder, deadline)
+
+
+@dataclass(slots=True)
+class ComplianceEvent(Event):
+    item: str = None
+    compliance_type: str = None
+    deadline: str = None
+    owner: str = None
+
+    FIELDS: ClassVar[tuple] = (("type", False), ("message", False), ("item", False), ("compliance_type", False),
+                               ("timestamp", False), ("priority", False), ("deadline", True), ("owner", True))
+
+    @classmethod
+    def decode(cls, entry, i, timestamp):
+        if not isinstance(entry, dict):
+            return cls("compliance", f"Compliance {i+1}: {entry}", timestamp, "high")
+
+        item = as_text(entry.get('item'), 'Unknown item')
+        deadline = as_text(entry.get('deadline'))
+        owner = as_text(entry.get('owner'))
+
+        message = f"Compliance {i+1}: {item}"
+        if deadline:
+            message += f" – Deadline: {deadline}"
+        if owner:
+            message += f" (Owner: {owner})"
+        return cls("compliance", message, timestamp, "high", True,
+                   item, as_text(entry.get('type'), 'compliance'), deadline, owner)
+
+
+# LLM output category -> event struct (in output order)
+EVENT_TYPES = [
+    ("action_items", ActionItemEvent),
+    ("decisions", DecisionEvent),
+    ("changes", ChangeEvent),
+    ("risks", RiskEvent),
+    ("questions", QuestionEvent),
+    ("agreements", AgreementEvent),
+    ("delays", DelayEvent),
+    ("milestones", MilestoneEvent),
+    ("reminders", ReminderEvent),
+    ("compliance", ComplianceEvent),
+]
+EVENT_TYPE_BY_CATEGORY = dict(EVENT_TYPES)
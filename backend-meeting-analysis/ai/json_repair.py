@@ -0,0 +1,322 @@
+"""Tolerant JSON parser for LLM answers
+
+Finds the JSON object in the text and repairs what models typically get wrong:
+prose or code fences around the object, trailing or missing commas, comments, single
+quotes, Python literals, unquoted values such as dates, raw newlines in strings. Output
+cut off by the token limit keeps every complete top-level field, and every complete
+entry of the category array that was being written when it stopped.
+
+repair_json(text) -> (data or None, [repairs]) - clean JSON takes the json.loads fast path.
+Prose around the answer may contain braces of its own, so every candidate object is scored:
+one with a known category key beats one without, complete beats salvaged, then more entries.
+"""
+import json
+import re
+
+from ai.events import EVENT_TYPES
+
+NUMBER = re.compile(r"-?(?:\d+)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+BARE_WORD = re.compile(r"[^\W\d][\w\-]*")
+# An unquoted value runs to the next structural character, quote, line break or comment
+BARE_VALUE = re.compile(r"(?:[^,:\[\]{}\"'\s/]|/(?![/*]))+")
+LITERALS = {"true": True, "false": False, "null": None}
+PYTHON_LITERALS = {"True": True, "False": False, "None": None}
+ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+# Candidate objects tried before giving up (prose may contain stray braces)
+MAX_CANDIDATES = 5
+CATEGORIES = {"participants"} | {category for category, _ in EVENT_TYPES}
+
+EOF = ("eof", None)
+
+
+class RepairParser:
+    """Single pass over the text: tokens are read lazily while the value tree is built."""
+
+    def __init__(self, text, pos=0):
+        self.text = text
+        self.pos = pos
+        self.repairs = []
+        self.token = None
+
+    def repair(self, message):
+        if message not in self.repairs:
+            self.repairs.append(message)
+
+    # ---------- tokens ----------
+
+    def skip_space(self):
+        text, pos = self.text, self.pos
+        while pos < len(text):
+            ch = text[pos]
+            if ch in " \t\r\n":
+                pos += 1
+            elif text.startswith("//", pos):
+                end = text.find("\n", pos)
+                pos = len(text) if end == -1 else end
+                self.repair("removed comments")
+            elif text.startswith("/*", pos):
+                end = text.find("*/", pos + 2)
+                pos = len(text) if end == -1 else end + 2
+                self.repair("removed comments")
+            else:
+                break
+        self.pos = pos
+
+    def peek(self):
+        if self.token is None:
+            self.token = self.read_token()
+        return self.token
+
+    def advance(self):
+        token = self.peek()
+        self.token = None
+        return token
+
+    def read_token(self):
+        while True:
+            self.skip_space()
+            if self.pos >= len(self.text):
+                return EOF
+            ch = self.text[self.pos]
+            if ch in "{}[]:,":
+                self.pos += 1
+                return ("punct", ch)
+            if ch in "\"'":
+                return self.read_string(ch)
+            match = BARE_VALUE.match(self.text, self.pos)
+            if match and not NUMBER.fullmatch(match.group()) and not BARE_WORD.fullmatch(match.group()) \
+                    and any(c.isalnum() for c in match.group()):
+                # '2025-07-01', '01.07.2025' - one value, not a number followed by junk
+                self.pos = match.end()
+                self.repair("quoted bare values")
+                return ("string", match.group())
+            match = NUMBER.match(self.text, self.pos)
+            if match:
+                self.pos = match.end()
+                number = match.group()
+                return ("value", float(number) if any(c in number for c in ".eE") else int(number))
+            match = BARE_WORD.match(self.text, self.pos)
+            if match:
+                self.pos = match.end()
+                word = match.group()
+                if word in LITERALS:
+                    return ("value", LITERALS[word])
+                if word in PYTHON_LITERALS:
+                    self.repair("converted Python literals")
+                    return ("value", PYTHON_LITERALS[word])
+                self.repair("quoted bare words")
+                return ("string", word)
+            # Stray characters (ellipses, arrows, dashes, ...) between tokens are dropped
+            self.pos += 1
+            self.repair("skipped stray characters")
+
+    def is_inner_quote(self, pos):
+        """A '"' followed by a word ('"Jonas is "unreliable""') is part of the string, not its end."""
+        rest = self.text[pos + 1:pos + 40].lstrip(" \t")
+        if not rest:
+            return False
+        if rest[0] == '"':
+            # '""' closing a quoted word vs. a missing comma before the next string
+            after = rest[1:2]
+            return after == "" or after in ",:]}\n" or after.isspace()
+        return rest[0].isalnum()
+
+    def read_string(self, quote):
+        if quote == "'":
+            self.repair("converted single quotes")
+        text = self.text
+        pos = self.pos + 1
+        chars = []
+        while pos < len(text):
+            ch = text[pos]
+            if ch == quote and not (quote == '"' and self.is_inner_quote(pos)):
+                self.pos = pos + 1
+                return ("string", "".join(chars))
+            if ch == quote:
+                self.repair("escaped inner quotes")
+                chars.append(ch)
+                pos += 1
+                continue
+            if ch == "\\" and pos + 1 < len(text):
+                nxt = text[pos + 1]
+                if nxt in ESCAPES:
+                    chars.append(ESCAPES[nxt])
+                    pos += 2
+                    continue
+                if nxt == "u" and re.fullmatch(r"[0-9a-fA-F]{4}", text[pos + 2:pos + 6]):
+                    chars.append(chr(int(text[pos + 2:pos + 6], 16)))
+                    pos += 6
+                    continue
+                if nxt == "'":
+                    chars.append("'")
+                    pos += 2
+                    continue
+                self.repair("kept invalid escapes literally")
+                chars.append(ch)
+                pos += 1
+                continue
+            if ch < " ":
+                self.repair("escaped control characters in strings")
+            chars.append(ch)
+            pos += 1
+        self.pos = len(text)
+        return ("partial", "".join(chars))
+
+    # ---------- values ----------
+
+    def parse_value(self, depth=0):
+        """Return (value, complete). Incomplete values come from truncated input."""
+        while True:
+            kind, value = self.advance()
+            if kind == "punct" and value == "{":
+                return self.parse_object(depth)
+            if kind == "punct" and value == "[":
+                return self.parse_array(depth)
+            if kind in ("value", "string"):
+                return value, True
+            if kind == "partial":
+                return value, False
+            if kind == "eof":
+                return None, False
+            # A stray ":" / "," / closing bracket where a value should be
+            self.repair("skipped misplaced punctuation")
+
+    def parse_array(self, depth):
+        items = []
+        expect_value = True
+        while True:
+            kind, value = self.peek()
+            if kind == "eof":
+                return items, False
+            if kind == "punct" and value == "]":
+                self.advance()
+                if expect_value and items:
+                    self.repair("removed trailing commas")
+                return items, True
+            if kind == "punct" and value == "}":
+                # Wrong closing bracket - treat as the end of the array
+                self.advance()
+                self.repair("fixed mismatched brackets")
+                return items, True
+            if kind == "punct" and value == ",":
+                self.advance()
+                if expect_value:
+                    self.repair("removed extra commas")
+                expect_value = True
+                continue
+            if not expect_value:
+                self.repair("inserted missing commas")
+            item, complete = self.parse_value(depth + 1)
+            if not complete:
+                return items, False
+            items.append(item)
+            expect_value = False
+
+    def parse_object(self, depth):
+        obj = {}
+        expect_key = True
+        while True:
+            kind, value = self.peek()
+            if kind == "eof":
+                return obj, False
+            if kind == "punct" and value == "}":
+                self.advance()
+                if expect_key and obj:
+                    self.repair("removed trailing commas")
+                return obj, True
+            if kind == "punct" and value == "]":
+                self.advance()
+                self.repair("fixed mismatched brackets")
+                return obj, True
+            if kind == "punct" and value == ",":
+                self.advance()
+                if expect_key:
+                    self.repair("removed extra commas")
+                expect_key = True
+                continue
+            if kind not in ("string", "value"):
+                # "{" / "[" / ":" where a key should be, or a key cut off mid-string
+                if kind == "partial":
+                    self.advance()
+                    return obj, False
+                self.advance()
+                self.repair("skipped misplaced punctuation")
+                continue
+            if not expect_key:
+                self.repair("inserted missing commas")
+            self.advance()
+            key = value if isinstance(value, str) else json.dumps(value)
+
+            kind, value = self.peek()
+            if kind == "punct" and value == ":":
+                self.advance()
+            elif kind == "eof":
+                return obj, False
+            else:
+                self.repair("inserted missing colons")
+
+            item, complete = self.parse_value(depth + 1)
+            if not complete:
+                # Truncated: a category array keeps its finished entries, anything else is dropped
+                if depth == 0 and isinstance(item, list) and item:
+                    obj[key] = item
+                return obj, False
+            obj[key] = item
+            expect_key = False
+
+
+def count_entries(data):
+    return sum(len(v) for v in data.values() if isinstance(v, list))
+
+
+def repair_json(text):
+    """Parse the first JSON object in an LLM answer. Returns (dict or None, list of repairs)."""
+    if not text:
+        return None, []
+    stripped = text.strip()
+    try:
+        data = json.loads(stripped)
+        if isinstance(data, dict):
+            return data, []
+    except ValueError:
+        pass
+
+    best, best_score = None, None
+    start = -1
+    for _ in range(MAX_CANDIDATES):
+        start = text.find("{", start + 1)
+        if start == -1:
+            break
+        parser = RepairParser(text, start + 1)
+        data, complete = parser.parse_object(0)
+        if not data:
+            continue
+        known = any(key in CATEGORIES for key in data)
+        score = (known, complete, count_entries(data))
+        # Earlier candidates win ties - the outer object over the entries nested in it
+        if best_score is None or score > best_score:
+            best, best_score = (start, parser, data, complete), score
+        if known and complete:
+            break
+    if best is None:
+        return None, []
+
+    start, parser, data, complete = best
+    repairs = []
+    leading = text[:start].strip()
+    if leading:
+        repairs.append("stripped code fence" if leading.strip("`").strip().lower() in ("", "json")
+                       else "skipped leading text")
+    repairs.extend(parser.repairs)
+    if not complete:
+        repairs.append(f"salvaged truncated output ({count_entries(data)} complete entries)")
+    elif text[parser.pos:].strip().strip("`").strip():
+        repairs.append("dropped trailing text")
+    return data, repairs
+
+
+def repair_fragment(text):
+    """Parse a single JSON value (e.g. one streamed array entry). Returns (value or None, repairs)."""
+    parser = RepairParser(text)
+    value, complete = parser.parse_value()
+    return (value if complete else None), parser.repairs
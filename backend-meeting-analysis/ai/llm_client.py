@@ -0,0 +1,230 @@
+"""OpenRouter client - pooled keep-alive session, timeouts, retries and a circuit breaker"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+from utils.metrics import llm_request_seconds, errors_total
+
+API_URL = "https://openrouter.ai/api/v1/chat/completions"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LLMRequestError(Exception):
+    """OpenRouter answered with an error (after retries) or could not be reached."""
+
+    def __init__(self, message, status_code=None, body=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+
+class CircuitOpenError(LLMRequestError):
+    """Raised without calling OpenRouter while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """closed -> open after N consecutive failures -> half-open after a cooldown -> closed on success."""
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        """True if a call may go out; in half-open state only one trial call at a time."""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.trial_running:
+                self.trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    print(f"⚠️ OpenRouter circuit opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+
+
+def parse_retry_after(value):
+    """Retry-After header (seconds or HTTP date) -> seconds, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class OpenRouterClient:
+    """Shared chat-completions client. Use chat() for JSON answers and stream() for SSE."""
+
+    def __init__(self, api_url, api_key, connect_timeout, read_timeout, max_retries,
+                 backoff_base, backoff_max, pool_size, breaker):
+        self.api_url = api_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "http://localhost",
+            "X-Title": "meeting-parser",
+        })
+        # Retries are handled below (jitter, Retry-After, breaker), not by urllib3
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self.stats = {
+            "calls": 0,
+            "failures": 0,
+            "retries": 0,
+            "circuit_rejections": 0,
+            "total_latency": 0.0,
+            "last_latency": None,
+            "last_retries": 0,
+        }
+
+    def _record(self, latency, retries, ok, stream):
+        llm_request_seconds.observe(latency, kind="stream" if stream else "chat", outcome="ok" if ok else "error")
+        if not ok:
+            errors_total.inc(component="llm")
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["retries"] += retries
+            self.stats["total_latency"] += latency
+            self.stats["last_latency"] = round(latency, 3)
+            self.stats["last_retries"] = retries
+            if not ok:
+                self.stats["failures"] += 1
+
+    def backoff_delay(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff; a Retry-After from the server is a lower bound."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def post(self, payload, stream=False):
+        """POST with retries on connection errors, 429 and 5xx. Returns the 200 response."""
+        if not self.breaker.allow():
+            with self._lock:
+                self.stats["circuit_rejections"] += 1
+            errors_total.inc(component="llm_circuit_open")
+            raise CircuitOpenError("OpenRouter circuit is open - failing fast")
+
+        start = time.monotonic()
+        attempt = 0
+        try:
+            while True:
+                retry_after = None
+                try:
+                    response = self.session.post(self.api_url, json=payload, timeout=self.timeout, stream=stream)
+                except requests.ConnectionError as e:
+                    # Covers connect timeouts; read timeouts are not retried (the generation may still be running)
+                    error = LLMRequestError(f"OpenRouter unreachable: {e}")
+                except requests.Timeout as e:
+                    self.breaker.record_failure()
+                    self._record(time.monotonic() - start, attempt, ok=False, stream=stream)
+                    raise LLMRequestError(f"OpenRouter read timeout: {e}")
+                else:
+                    if response.status_code == 200:
+                        self.breaker.record_success()
+                        latency = time.monotonic() - start
+                        self._record(latency, attempt, ok=True, stream=stream)
+                        print(f" OpenRouter call: {latency:.2f}s, {attempt} retries")
+                        return response
+                    body = response.text[:1000]
+                    response.close()
+                    error = LLMRequestError(f"API-Fehler {response.status_code}: {body}", response.status_code, body)
+                    if response.status_code not in RETRY_STATUSES:
+                        # Client errors (bad key, bad payload) are not an upstream outage
+                        self.breaker.record_success()
+                        self._record(time.monotonic() - start, attempt, ok=False, stream=stream)
+                        raise error
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+                self.breaker.record_failure()
+                if attempt >= self.max_retries or self.breaker.state == 'open' \
+                        or (retry_after is not None and retry_after > Config.LLM_RETRY_AFTER_MAX):
+                    self._record(time.monotonic() - start, attempt, ok=False, stream=stream)
+                    raise error
+
+                delay = self.backoff_delay(attempt, retry_after)
+                attempt += 1
+                print(f" OpenRouter retry {attempt}/{self.max_retries} in {delay:.1f}s ({error})")
+                time.sleep(delay)
+        except LLMRequestError:
+            raise
+        except BaseException:
+            # Anything else (e.g. a decode error) still has to end a half-open trial,
+            # otherwise trial_running stays set and the breaker rejects every call
+            self.breaker.record_failure()
+            self._record(time.monotonic() - start, attempt, ok=False, stream=stream)
+            raise
+
+    def chat(self, payload):
+        """Non-streaming completion; returns the decoded JSON body."""
+        return self.post(payload).json()
+
+    def stream(self, payload):
+        """Streaming completion; returns the open response (caller iterates and closes it)."""
+        return self.post(dict(payload, stream=True), stream=True)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["avg_latency"] = round(stats["total_latency"] / stats["calls"], 3) if stats["calls"] else None
+        stats["total_latency"] = round(stats["total_latency"], 3)
+        stats["circuit_state"] = self.breaker.state
+        return stats
+
+
+llm_client = OpenRouterClient(
+    API_URL,
+    Config.OPENROUTER_API_KEY,
+    connect_timeout=Config.LLM_CONNECT_TIMEOUT,
+    read_timeout=Config.LLM_READ_TIMEOUT,
+    max_retries=Config.LLM_MAX_RETRIES,
+    backoff_base=Config.LLM_BACKOFF_BASE,
+    backoff_max=Config.LLM_BACKOFF_MAX,
+    pool_size=Config.LLM_POOL_SIZE,
+    breaker=CircuitBreaker(Config.LLM_CIRCUIT_FAILURES, Config.LLM_CIRCUIT_RESET)
+)
@@ -0,0 +1,323 @@
+"""Participant directory - fast name -> email resolution for action item assignees
+
+Per scope an in-memory index is built from past meetings (the participants table) and
+the User table, and kept up to date as new meetings are parsed. The scope is the
+uploader's: their company domain, or the account alone for free-mail addresses, so one
+tenant's contacts are never offered to another (see directory_scope).
+Lookups resolve exact names, initials ("Lena M.", "L. Maier"), bare surnames with or
+without honorific ("Herr Khammari") and typos (edit distance via a trigram index).
+Ambiguous names resolve to nothing rather than to the wrong person.
+"""
+import re
+import threading
+import time
+import unicodedata
+from datetime import datetime
+
+from flask import has_app_context, has_request_context
+
+from config import Config
+
+HONORIFICS = {"herr", "frau", "hr", "fr", "mr", "mrs", "ms", "miss", "dr", "prof"}
+TOKEN = re.compile(r"[^\W\d_]+\.?")
+EMAIL = re.compile(r"^[^@\s]+@([^@\s]+\.[a-z]{2,})$", re.IGNORECASE)
+UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+
+def normalize_token(token):
+    """Lower-case, transliterate umlauts and strip accents: 'Müller' -> 'mueller'."""
+    token = token.lower().translate(UMLAUTS)
+    token = unicodedata.normalize("NFKD", token)
+    return "".join(ch for ch in token if not unicodedata.combining(ch))
+
+
+def name_tokens(name):
+    """Normalised name tokens without honorifics; initials keep a trailing '.'."""
+    tokens = []
+    for raw in TOKEN.findall(name or ""):
+        token = normalize_token(raw)
+        if token.rstrip(".") in HONORIFICS:
+            continue
+        # A single letter is an initial whether or not it was written with a dot
+        if len(token.rstrip(".")) == 1:
+            token = token.rstrip(".") + "."
+        tokens.append(token)
+    return tokens
+
+
+def is_initial(token):
+    return token.endswith(".")
+
+
+def organisation_of(email):
+    """Organisation key of an email address (its domain), or None."""
+    match = EMAIL.match((email or "").strip())
+    return match.group(1).lower() if match else None
+
+
+def directory_scope(user):
+    """Directory key of an account: its company domain, or 'user:<id>' on a free-mail domain."""
+    if user is None or not getattr(user, "is_authenticated", False) or getattr(user, "id", None) is None:
+        return None
+    organisation = organisation_of(getattr(user, "email", None))
+    if organisation and organisation not in Config.PARTICIPANT_FREE_MAIL_DOMAINS:
+        return organisation
+    return f"user:{user.id}"
+
+
+def current_scope():
+    """Scope of the logged-in user, or None outside a request."""
+    if not has_request_context():
+        return None
+    from flask_login import current_user
+    return directory_scope(current_user)
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance, or limit + 1 as soon as it must exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class TokenTrie:
+    """Prefix trie over name tokens; every node holds the ids of all entries below it."""
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, token, entry_id):
+        node = self.root
+        for ch in token:
+            node = node.setdefault(ch, {})
+            node.setdefault("ids", set()).add(entry_id)
+        node.setdefault("exact", set()).add(entry_id)
+
+    def find(self, token, prefix=False):
+        node = self.root
+        for ch in token:
+            node = node.get(ch)
+            if node is None:
+                return set()
+        return node.get("ids" if prefix else "exact", set())
+
+
+class ParticipantDirectory:
+    """Name -> email index for one organisation (or one meeting)."""
+
+    def __init__(self, max_distance=None):
+        self.max_distance = Config.PARTICIPANT_MAX_EDIT_DISTANCE if max_distance is None else max_distance
+        self.entries = []         # id -> (name, email, normalised full name)
+        self.keys = set()         # (normalised full name, email) already indexed
+        self.full_names = {}      # normalised full name -> ids
+        self.first_names = TokenTrie()
+        self.surnames = TokenTrie()
+        self.trigram_index = {}   # trigram -> ids
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, name, email):
+        """Index a participant; returns False if it was already known (or unusable)."""
+        tokens = [t for t in name_tokens(name) if not is_initial(t)]
+        if not tokens or not email:
+            return False
+        full = " ".join(tokens)
+        email = email.strip()
+        with self._lock:
+            if (full, email.lower()) in self.keys:
+                return False
+            self.keys.add((full, email.lower()))
+            entry_id = len(self.entries)
+            self.entries.append((name.strip(), email, full))
+            self.full_names.setdefault(full, set()).add(entry_id)
+            self.first_names.insert(tokens[0], entry_id)
+            if len(tokens) > 1:
+                self.surnames.insert(tokens[-1], entry_id)
+            for gram in trigrams(full):
+                self.trigram_index.setdefault(gram, set()).add(entry_id)
+        return True
+
+    def unique_email(self, ids):
+        """The email if all ids belong to the same address, else None (unknown or ambiguous)."""
+        emails = {self.entries[i][1].lower(): self.entries[i][1] for i in ids}
+        if len(emails) == 1:
+            return next(iter(emails.values()))
+        return None
+
+    def match_token(self, token, trie):
+        return trie.find(token.rstrip("."), prefix=is_initial(token))
+
+    def lookup(self, name):
+        """Email for a written name, or None if unknown or ambiguous."""
+        tokens = name_tokens(name)
+        if not tokens or not self.entries:
+            return None
+
+        # 1. Exact full name
+        ids = self.full_names.get(" ".join(tokens))
+        if ids:
+            return self.unique_email(ids)
+
+        if len(tokens) == 1:
+            # 2. Bare first name ("Lena") or surname ("Herr Khammari")
+            for trie in (self.first_names, self.surnames):
+                ids = self.match_token(tokens[0], trie)
+                if ids:
+                    return self.unique_email(ids)
+        else:
+            # 3. First + last with initials ("Lena M.", "L. Maier"), then first name alone
+            ids = self.match_token(tokens[0], self.first_names) & self.match_token(tokens[-1], self.surnames)
+            if ids:
+                return self.unique_email(ids)
+            if not is_initial(tokens[0]):
+                ids = self.first_names.find(tokens[0])
+                if ids:
+                    return self.unique_email(ids)
+
+        # 4. Typos: trigram candidates, closest by edit distance
+        return self.fuzzy_lookup(" ".join(t.rstrip(".") for t in tokens))
+
+    def fuzzy_lookup(self, text, max_candidates=20):
+        if self.max_distance <= 0:
+            return None
+        postings = sorted((self.trigram_index.get(gram, ()) for gram in trigrams(text)), key=len)
+        # Trigrams shared by a large part of the directory ("  j", "en ") only add noise and time
+        common = max(50, len(self.entries) // 10)
+        postings = [ids for ids in postings if ids and len(ids) <= common] or postings[:1]
+        shared = {}
+        for ids in postings:
+            for entry_id in ids:
+                shared[entry_id] = shared.get(entry_id, 0) + 1
+        if not shared:
+            return None
+        candidates = sorted(shared, key=shared.get, reverse=True)[:max_candidates]
+
+        limit = self.max_distance if len(text) > 5 else 1
+        best, best_ids = limit + 1, set()
+        for entry_id in candidates:
+            full = self.entries[entry_id][2]
+            # Compare against the full name and against the first name alone
+            distance = min(edit_distance(text, full, limit), edit_distance(text, full.split()[0], limit))
+            if distance < best:
+                best, best_ids = distance, {entry_id}
+            elif distance == best:
+                best_ids.add(entry_id)
+        if best > limit:
+            return None
+        return self.unique_email(best_ids)
+
+
+class MeetingDirectory:
+    """Resolver for one document: its own participant list first, then the uploader's directory."""
+
+    def __init__(self, local, organisations):
+        self.local = local
+        self.organisations = organisations
+
+    def lookup(self, name):
+        for directory in [self.local] + self.organisations:
+            email = directory.lookup(name)
+            if email:
+                return email
+        return None
+
+
+class DirectoryStore:
+    """Per-scope directories, loaded from the DB on first use and refreshed after a TTL."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.directories = {}     # scope -> (directory, loaded_at)
+        self._lock = threading.Lock()
+
+    def load(self, organisation):
+        from database.models import Participant, User
+
+        directory = ParticipantDirectory()
+        for person in Participant.query.filter_by(organisation=organisation).all():
+            directory.add(person.name, person.email)
+        if organisation.startswith("user:"):
+            users = User.query.filter_by(id=int(organisation[len("user:"):])).all()
+        else:
+            users = User.query.filter(User.email.ilike(f"%@{organisation}")).all()
+        for user in users:
+            if user.name:
+                directory.add(user.name, user.email)
+        return directory
+
+    def get(self, organisation):
+        """Directory for a scope, or None if it cannot be loaded (no app context, DB error)."""
+        with self._lock:
+            cached = self.directories.get(organisation)
+        if cached and time.monotonic() - cached[1] < self.ttl:
+            return cached[0]
+        if not has_app_context():
+            return cached[0] if cached else None
+        try:
+            directory = self.load(organisation)
+        except Exception as e:
+            print(f"⚠️ Could not load participant directory for {organisation}: {e}")
+            return cached[0] if cached else None
+        with self._lock:
+            self.directories[organisation] = (directory, time.monotonic())
+        return directory
+
+    def record(self, participants, organisation):
+        """Remember a meeting's participants in the uploader's scope (DB and loaded directory)."""
+        directory = self.get(organisation)
+        if directory is None:
+            return
+        new = [p for p in participants if directory.add(p["name"], p["email"])]
+        if not new or not has_app_context():
+            return
+
+        from database.models import db, Participant
+        try:
+            for p in new:
+                db.session.add(Participant(organisation=organisation, name=p["name"], email=p["email"],
+                                           last_seen=datetime.utcnow()))
+            db.session.commit()
+            print(f"📇 Added {len(new)} participants to the directory")
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ Could not store participants: {e}")
+
+    def clear(self):
+        with self._lock:
+            self.directories.clear()
+
+
+directory_store = DirectoryStore(Config.PARTICIPANT_DIRECTORY_TTL)
+
+
+def directory_for_meeting(participants, scope=None):
+    """Resolver for a document's assignees; also records its participants for later meetings.
+
+    scope is the uploader's directory_scope (default: the logged-in user's). The
+    participants' own domains are never used - a document cannot open another tenant's directory.
+    """
+    local = ParticipantDirectory()
+    for p in participants:
+        local.add(p["name"], p["email"])
+    scope = scope or current_scope()
+    if not Config.PARTICIPANT_DIRECTORY_ENABLED or not scope:
+        return MeetingDirectory(local, [])
+
+    directory_store.record(participants, scope)
+    directory = directory_store.get(scope)
+    return MeetingDirectory(local, [directory] if directory is not None else [])
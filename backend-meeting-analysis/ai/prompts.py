@@ -0,0 +1,434 @@
+"""Prompt registry - named, versioned templates for the extraction call
+
+Every template renders to chat messages: a static system message (identical for every
+request, so the provider can reuse the cached prefix) and a short user message with the
+document. The template id ("name@version") is part of the result cache key and is
+reported in API responses - bump the version whenever a template's wording changes.
+
+Token report for all templates:  python -m ai.prompts [document.txt]
+"""
+import re
+import sys
+
+from config import Config
+from ai.chunking import estimate_tokens
+
+# Single-call extraction only sends the start of the document (longer ones are chunked)
+DOCUMENT_CHAR_LIMIT = 4500
+BAR = "═══════════════════════════════════════════════════════════════════"
+
+
+# ==================== FULL (original prompt, split into system + user) ====================
+
+FULL_SYSTEM = """You are an expert meeting protocol analyzer. Extract ALL tasks, decisions, participants, and events.
+
+═══════════════════════════════════════════════════════════════════
+STEP 1: EXTRACT PARTICIPANTS FIRST
+═══════════════════════════════════════════════════════════════════
+
+Look for sections named:
+- "ATTENDEES" / "Attendees:" / "PARTICIPANTS"
+- "Teilnehmer:" (German)
+
+Extract ALL name-email pairs using these patterns:
+✓ "Name Email" → e.g., "Manel Khammari khamarimanel11@gmail.com"
+✓ "Name, Email" → e.g., "Lena M., lena@company.com"
+✓ "Name (Email)" → e.g., "Thomas (thomas@company.com)"
+✓ Emails mentioned anywhere in document
+
+Create a NAME → EMAIL mapping to use for task assignments.
+
+═══════════════════════════════════════════════════════════════════
+STEP 2: EXTRACT ACTION ITEMS
+═══════════════════════════════════════════════════════════════════
+
+Search the ENTIRE document (not just specific sections) for tasks using these patterns:
+
+FORMAL PATTERNS:
+✓ "Action: Name to do X by DATE"
+✓ "Name will do X by DATE"
+✓ "Name should do X by DATE"
+✓ "Name must do X by DATE"
+✓ "Name needs to do X by DATE"
+✓ "Name agreed to do X by DATE"
+✓ "Name volunteered to do X"
+✓ "Name (email@domain.com) will do X by DATE"
+✓ "email@domain.com will do X by DATE"
+
+GERMAN STANDUP PATTERNS:
+✓ "Name - does X" (in Standup section)
+✓ "Name: does X" (in task sections)
+✓ "Ticket ### Description → Name"
+✓ Tasks under "Aufgaben zu nächster Woche"
+✓ Tasks under "Neue Tickets"
+
+IMPLICIT PATTERNS:
+✓ Sentences in DECISION, AGREEMENT, ACTION REQUIRED, RESPONSIBILITIES sections
+✓ "Someone should..." → task with no assignee
+✓ "We need to..." → team task
+
+SECTIONS TO CHECK:
+- Entire document (don't limit to specific sections!)
+- DECISION sections
+- ACTION sections
+- ACTION REQUIRED sections
+- AGREEMENT sections
+- RESPONSIBILITIES sections
+- Standup sections
+- "Aufgaben zu nächster Woche" (German: Tasks for next week)
+- "Neue Tickets" (German: New tickets)
+
+FOR EACH TASK EXTRACT:
+- **description**: Clear task description
+- **assignee**: Person NAME (not email)
+- **assignee_email**: Email address (lookup from participants or extract from text)
+- **deadline**: Date in DD.MM.YYYY format
+- **priority**: high/medium/low
+
+═══════════════════════════════════════════════════════════════════
+STEP 3: DATE CONVERSION
+═══════════════════════════════════════════════════════════════════
+
+Convert ALL dates to DD.MM.YYYY format (assume year 2026 if not specified):
+
+ENGLISH DATES:
+- "June 17" → 17.06.2026
+- "Friday (June 13)" → 13.06.2026
+- "next Tuesday (June 17)" → 17.06.2026
+- "February 18th" → 18.02.2026
+- "March 1st" → 01.03.2026
+- "by end of this week" → find closest Friday
+- "Thursday EOD" → find Thursday date
+
+GERMAN DATES:
+- "17.06.2025" → 17.06.2025 (keep as is)
+- "01.07.2025" → 01.07.2025
+- "Ende august" → 31.08.2026
+
+RELATIVE DATES:
+- "next week" → next Monday
+- "by Friday noon" → find Friday date
+
+═══════════════════════════════════════════════════════════════════
+CRITICAL EXTRACTION RULES
+═══════════════════════════════════════════════════════════════════
+
+1. **IMPEDIMENTS = RISKS**: "impediments", "Hindernis" → extract as RISK
+2. **PROBLEMS = RISKS**: "problems", "Problem" → extract as RISK  
+3. **BLOCKERS = RISKS**: "blocker", "Blocker" → extract as RISK
+4. **ISSUES = RISKS**: "issues" → extract as RISK
+5. **TICKETS = ACTION ITEMS**: "Ticket XX → Name" → Name assigned to Ticket XX
+6. **DATES = MILESTONES**: "DD.MM.YYYY event description" → milestone
+7. **DEADLINES = COMPLIANCE**: "documentation must be finished by X" → compliance
+8. **Extract participants BEFORE extracting tasks** (to map names → emails)
+9. **Include ALL tasks**, even if assignee unclear
+10. **Use participant list to find emails** for task assignees
+
+═══════════════════════════════════════════════════════════════════
+OUTPUT FORMAT (VALID JSON ONLY)
+═══════════════════════════════════════════════════════════════════
+
+{
+  "participants": [
+    {
+      "name": "Full Name",
+      "email": "email@domain.com"
+    }
+  ],
+  "action_items": [
+    {
+      "description": "Task description",
+      "assignee": "Person Name",
+      "assignee_email": "email@domain.com",
+      "deadline": "DD.MM.YYYY",
+      "priority": "high|medium|low"
+    }
+  ],
+  "decisions": ["Decision text"],
+  "changes": ["Change description"],
+  "risks": [
+    {
+      "description": "Risk description",
+      "severity": "high|medium|low",
+      "raised_by": "Person Name or null"
+    }
+  ],
+  "questions": [
+    {
+      "question": "Question text",
+      "asked_by": "Person Name or null"
+    }
+  ],
+  "agreements": ["Agreement text"],
+  "delays": [
+    {
+      "item": "What was delayed",
+      "original_date": "DD.MM.YYYY or null",
+      "new_date": "DD.MM.YYYY or null",
+      "reason": "Reason"
+    }
+  ],
+  "milestones": [
+    {
+      "event": "Event name",
+      "date": "DD.MM.YYYY",
+      "owner": "Person Name or null"
+    }
+  ],
+  "reminders": [
+    {
+      "reminder": "Reminder text",
+      "deadline": "DD.MM.YYYY or null"
+    }
+  ],
+  "compliance": [
+    {
+      "item": "Compliance item",
+      "type": "audit|security|compliance|documentation",
+      "deadline": "DD.MM.YYYY or null",
+      "owner": "Person Name or null"
+    }
+  ]
+}
+
+═══════════════════════════════════════════════════════════════════
+EXAMPLES
+═══════════════════════════════════════════════════════════════════
+
+INPUT: "Manel Khammari khamarimanel11@gmail.com"
+OUTPUT: {"participants": [{"name": "Manel Khammari", "email": "khamarimanel11@gmail.com"}]}
+
+INPUT: "Lilwan will create documentation by February 18th"
++ PARTICIPANTS: [{"name": "Lilwan Akid", "email": "lakid@stud.hs-bremen.de"}]
+OUTPUT: {
+  "action_items": [{
+    "description": "Create comprehensive architecture documentation",
+    "assignee": "Lilwan Akid",
+    "assignee_email": "lakid@stud.hs-bremen.de",
+    "deadline": "18.02.2026",
+    "priority": "high"
+  }]
+}
+
+INPUT: "Thomas to prepare benchmarks by next Tuesday (June 17)"
+OUTPUT: {
+  "action_items": [{
+    "description": "Prepare benchmarks comparing RabbitMQ and NATS",
+    "assignee": "Thomas",
+    "assignee_email": null,
+    "deadline": "17.06.2026",
+    "priority": "high"
+  }]
+}
+
+INPUT: "Ticket 70 Test Imens Crawler → Jonas"
+OUTPUT: {
+  "action_items": [{
+    "description": "Test Imens Crawler (Ticket 70)",
+    "assignee": "Jonas",
+    "assignee_email": null,
+    "deadline": null,
+    "priority": "medium"
+  }]
+}
+
+INPUT: "Maya volunteered to write unit tests. Goal: 70% coverage by March 1st"
+OUTPUT: {
+  "action_items": [{
+    "description": "Write unit tests for document parsing module (70% coverage)",
+    "assignee": "Maya",
+    "assignee_email": null,
+    "deadline": "01.03.2026",
+    "priority": "high"
+  }]
+}
+
+INPUT: "Manel (khamarimanel11@gmail.com) should enhance AI parser by February 20th"
+OUTPUT: {
+  "action_items": [{
+    "description": "Enhance AI parser to detect natural language assignments",
+    "assignee": "Manel",
+    "assignee_email": "khamarimanel11@gmail.com",
+    "deadline": "20.02.2026",
+    "priority": "high"
+  }]
+}
+
+INPUT: "Still some impediments like unreliableJonas"
+OUTPUT: {
+  "risks": [{
+    "description": "Unreliable Jonas causing impediments",
+    "severity": "medium",
+    "raised_by": null
+  }]
+}
+"""
+
+FULL_USER = """{known_participants}═══════════════════════════════════════════════════════════════════
+MEETING DOCUMENT TO ANALYZE
+═══════════════════════════════════════════════════════════════════
+
+{document}
+
+═══════════════════════════════════════════════════════════════════
+
+CRITICAL: Extract participants FIRST, then use their emails for task assignments.
+Return ONLY valid JSON. No explanations, no markdown, no code blocks."""
+
+
+# ==================== COMPACT (same output schema, a fraction of the tokens) ====================
+
+COMPACT_SCHEMA = """{"participants":[{"name":"","email":""}],
+"action_items":[{"description":"","assignee":"","assignee_email":null,"deadline":"DD.MM.YYYY","priority":"high|medium|low"}],
+"decisions":[""],"changes":[""],"agreements":[""],
+"risks":[{"description":"","severity":"high|medium|low","raised_by":null}],
+"questions":[{"question":"","asked_by":null}],
+"delays":[{"item":"","original_date":null,"new_date":null,"reason":""}],
+"milestones":[{"event":"","date":"DD.MM.YYYY","owner":null}],
+"reminders":[{"reminder":"","deadline":null}],
+"compliance":[{"item":"","type":"audit|security|compliance|documentation","deadline":null,"owner":null}]}"""
+
+COMPACT_SYSTEM_EN = """You extract structured data from meeting protocols. Answer with ONE JSON object in exactly this schema (omit empty categories, use null for unknown values):
+""" + COMPACT_SCHEMA + """
+Rules:
+- Participants first: name/email pairs from attendee lists or anywhere in the text; use them to fill assignee_email.
+- Action items: every task anywhere in the document ("Action: X to ...", "X will/should/must/needs to ...", "X volunteered to ...", "Ticket 70 ... → X", "We need to ..." = team task). Assignee is a person name, not an email.
+- Impediments, problems, blockers and issues are risks. A dated event ("01.07.2025 code freeze") is a milestone. "Documentation must be finished by X" is compliance.
+- Dates as DD.MM.YYYY; resolve weekdays and "end of week" relative to the meeting date; assume the meeting's year if none is given.
+Return only JSON - no prose, no markdown."""
+
+COMPACT_SYSTEM_DE = """Du extrahierst strukturierte Daten aus Besprechungsprotokollen. Antworte mit GENAU EINEM JSON-Objekt in diesem Schema (leere Kategorien weglassen, unbekannte Werte als null; Schlüssel bleiben englisch, Inhalte in der Sprache des Protokolls):
+""" + COMPACT_SCHEMA + """
+Regeln:
+- Zuerst Teilnehmer ("Teilnehmer:", "Anwesend:"): Name/E-Mail-Paare; damit assignee_email füllen.
+- Aufgaben im gesamten Dokument: "Name - macht X" (Standup), "Name: X", "Name wird/soll/muss X bis DATUM", "Ticket 70 ... → Name", Abschnitte "Aufgaben zu nächster Woche" und "Neue Tickets". assignee ist ein Name, keine E-Mail.
+- Hindernisse, Probleme und Blocker sind risks. Ein Datum mit Ereignis ("01.07.2025 Code Freeze") ist ein milestone. "Dokumentation muss bis X fertig sein" ist compliance.
+- Datumsangaben als TT.MM.JJJJ ("Ende August" = 31.08.); Wochentage relativ zum Besprechungsdatum; ohne Jahr das Jahr der Besprechung.
+Nur JSON zurückgeben - kein Fließtext, kein Markdown."""
+
+COMPACT_USER_EN = """{known_participants}Meeting protocol:
+<<<
+{document}
+>>>"""
+
+COMPACT_USER_DE = """{known_participants}Besprechungsprotokoll:
+<<<
+{document}
+>>>"""
+
+
+def format_known_participants(participants, compact=False):
+    """Participant block for chunk prompts - chunks rarely contain the attendee list."""
+    if not participants:
+        return ""
+    lines = "\n".join(f"- {p['name']} <{p['email']}>" for p in participants)
+    if compact:
+        return f"Known participants:\n{lines}\n\n"
+    return f"""{BAR}
+KNOWN PARTICIPANTS (from the full document - use for assignee emails)
+{BAR}
+
+{lines}
+
+"""
+
+
+class PromptTemplate:
+    """A named, versioned system + user message pair."""
+
+    def __init__(self, name, version, system, user, language=None, compact=False):
+        self.name = name
+        self.version = version
+        self.system = system
+        self.user = user
+        self.language = language
+        self.compact = compact
+
+    @property
+    def id(self):
+        return f"{self.name}@{self.version}"
+
+    def render(self, text, participants=None):
+        """Chat messages for one document: static system message first, document last."""
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user.format(
+                known_participants=format_known_participants(participants, self.compact),
+                document=text[:DOCUMENT_CHAR_LIMIT]
+            )}
+        ]
+
+    def __repr__(self):
+        return f'<PromptTemplate {self.id}>'
+
+
+# family -> language -> template (None = language independent)
+TEMPLATES = {
+    "full": {
+        None: PromptTemplate("full", 2, FULL_SYSTEM, FULL_USER),
+    },
+    "compact": {
+        "en": PromptTemplate("compact-en", 1, COMPACT_SYSTEM_EN, COMPACT_USER_EN, language="en", compact=True),
+        "de": PromptTemplate("compact-de", 1, COMPACT_SYSTEM_DE, COMPACT_USER_DE, language="de", compact=True),
+    },
+}
+
+WORD = re.compile(r"[a-zäöüß]+")
+STOPWORDS = {
+    "de": {"und", "der", "die", "das", "nicht", "mit", "ist", "zu", "für", "auf", "wird", "bis", "ein",
+           "eine", "den", "von", "im", "sich", "des", "dem", "wir", "soll", "noch", "auch", "aufgaben"},
+    "en": {"the", "and", "to", "of", "will", "is", "for", "with", "by", "on", "be", "a", "that", "this",
+           "we", "in", "are", "should", "from", "was", "it", "as", "an", "next"},
+}
+
+
+def detect_language(text, sample_chars=5000):
+    """Stopword vote over the start of the document: 'de' or 'en' (default)."""
+    counts = {language: 0 for language in STOPWORDS}
+    for word in WORD.findall(text[:sample_chars].lower()):
+        for language, words in STOPWORDS.items():
+            if word in words:
+                counts[language] += 1
+    return "de" if counts["de"] > counts["en"] else "en"
+
+
+def select_template(text, name=None):
+    """Template for a document: configured family, language variant picked from the text."""
+    family = TEMPLATES.get(name or Config.PROMPT_TEMPLATE)
+    if family is None:
+        raise ValueError(f"Unknown prompt template '{name or Config.PROMPT_TEMPLATE}'. "
+                         f"Use one of: {', '.join(TEMPLATES)}")
+    if None in family:
+        return family[None]
+    return family.get(detect_language(text)) or next(iter(family.values()))
+
+
+def all_templates():
+    return [template for family in TEMPLATES.values() for template in family.values()]
+
+
+def token_report(document=""):
+    """Estimated prompt tokens per template (system, user overhead, total for document)."""
+    rows = []
+    for template in all_templates():
+        system, user = template.render(document)
+        empty_user = template.render("")[1]
+        rows.append({
+            "template": template.id,
+            "system_tokens": estimate_tokens(system["content"]),
+            "user_overhead_tokens": estimate_tokens(empty_user["content"]),
+            "total_tokens": estimate_tokens(system["content"]) + estimate_tokens(user["content"]),
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    document = ""
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding="utf-8") as f:
+            document = f.read()
+    print(f"Estimated prompt tokens (~{len(document)} document chars, "
+          f"detected language: {detect_language(document) if document else '-'})")
+    print(f"{'template':<16}{'system':>10}{'user':>10}{'total':>10}")
+    for row in token_report(document):
+        print(f"{row['template']:<16}{row['system_tokens']:>10}{row['user_overhead_tokens']:>10}{row['total_tokens']:>10}")
@@ -0,0 +1,322 @@
+"""Rule-based extraction - fast local pass for protocols that follow the usual templates
+
+Recognises the literal patterns the full prompt describes to the model ("Action: Name to
+do X by DATE", "Name will do X by DATE", "Ticket 70 X → Name", "Aufgaben zu nächster
+Woche", "Decision: ...", ...) in English and German. Produces the same data dict as the
+LLM, plus a coverage and confidence score that decide whether the LLM is still needed.
+"""
+import calendar
+import re
+from datetime import date, datetime, timedelta
+
+NAME = r"[A-ZÄÖÜ][a-zäöüß]+(?:[ -](?:[A-ZÄÖÜ][a-zäöüß]+|[A-ZÄÖÜ]\.))?"
+EMAIL = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
+ASSIGNEE = rf"(?P<assignee>{NAME})(?:\s*\((?P<email>{EMAIL})\))?"
+# Capitalised sentence subjects that are not a person ("We will ...", "Das Team soll ...")
+NON_NAME_SUBJECTS = {
+    "i", "we", "you", "he", "she", "it", "they", "this", "that", "these", "those", "there", "everyone",
+    "everybody", "someone", "somebody", "nobody", "anyone", "all", "team", "the", "our", "management",
+    "ich", "wir", "du", "ihr", "sie", "er", "es", "man", "das", "die", "der", "dies", "diese", "dieser",
+    "jemand", "niemand", "alle", "jeder", "unser", "unsere",
+}
+
+MONTHS = {
+    'january': 1, 'jan': 1, 'januar': 1, 'jänner': 1,
+    'february': 2, 'feb': 2, 'februar': 2,
+    'march': 3, 'mar': 3, 'märz': 3, 'maerz': 3, 'mär': 3,
+    'april': 4, 'apr': 4,
+    'may': 5, 'mai': 5,
+    'june': 6, 'jun': 6, 'juni': 6,
+    'july': 7, 'jul': 7, 'juli': 7,
+    'august': 8, 'aug': 8,
+    'september': 9, 'sep': 9, 'sept': 9,
+    'october': 10, 'oct': 10, 'oktober': 10, 'okt': 10,
+    'november': 11, 'nov': 11,
+    'december': 12, 'dec': 12, 'dezember': 12, 'dez': 12,
+}
+WEEKDAYS = {
+    'monday': 0, 'montag': 0, 'tuesday': 1, 'dienstag': 1, 'wednesday': 2, 'mittwoch': 2,
+    'thursday': 3, 'donnerstag': 3, 'friday': 4, 'freitag': 4, 'saturday': 5, 'samstag': 5,
+    'sunday': 6, 'sonntag': 6,
+}
+MONTH_NAMES = "|".join(sorted(MONTHS, key=len, reverse=True))
+WEEKDAY_NAMES = "|".join(WEEKDAYS)
+
+NUMERIC_DATE = re.compile(r"\b(\d{1,2})\.(\d{1,2})\.(\d{4}|\d{2})?(?!\d)")
+MONTH_DAY = re.compile(rf"\b({MONTH_NAMES})\.?\s+(\d{{1,2}})(?:st|nd|rd|th)?\b(?:,?\s+(\d{{4}}))?", re.I)
+DAY_MONTH = re.compile(rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\.?\s+(?:of\s+)?({MONTH_NAMES})\b\.?(?:\s+(\d{{4}}))?", re.I)
+END_OF_MONTH = re.compile(rf"\b(?:ende|end of)\s+({MONTH_NAMES})\b", re.I)
+END_OF_WEEK = re.compile(r"\b(?:end of (?:this |the )?week|ende der woche|diese woche)\b", re.I)
+WEEKDAY = re.compile(rf"\b({WEEKDAY_NAMES})\b", re.I)
+
+# Where the deadline starts in a task sentence
+DEADLINE_SPLIT = re.compile(
+    r"\s*(?:[–—-]\s*)?\b(?:by|until|till|before|due(?:\s+(?:by|on))?|no later than|"
+    r"bis(?:\s+(?:zum|zur|spätestens))?|spätestens(?:\s+(?:am|bis))?)\s+(?P<when>.+)$",
+    re.I
+)
+
+# Deadline put first: "Bis 01.07. erstellt Lena den Bericht", "By Friday, Lena will send the slides"
+DATE_PHRASE = (
+    rf"(?:\d{{1,2}}\.\d{{1,2}}\.(?:\d{{4}}|\d{{2}})?|(?:ende|end of)\s+(?:{MONTH_NAMES})|"
+    rf"(?:{MONTH_NAMES})\.?\s+\d{{1,2}}(?:st|nd|rd|th)?(?:,?\s+\d{{4}})?|"
+    rf"\d{{1,2}}(?:st|nd|rd|th)?\.?\s+(?:of\s+)?(?:{MONTH_NAMES})\.?(?:\s+\d{{4}})?|"
+    rf"end of (?:this |the )?week|ende der woche|(?:next\s+|nächste[nr]?\s+)?(?:{WEEKDAY_NAMES}))"
+)
+LEADING_DEADLINE = re.compile(
+    r"^(?:by|until|till|before|due(?:\s+(?:by|on))?|no later than|"
+    r"bis(?:\s+(?:zum|zur|spätestens))?|spätestens(?:\s+(?:am|bis))?)\s+"
+    rf"(?P<when>{DATE_PHRASE})\s*,?\s+(?P<rest>.+)$",
+    re.I
+)
+
+# German infinitive closing the clause after the deadline: "den Bericht bis 20.06. schreiben"
+LEADING_DATE = re.compile(DATE_PHRASE, re.I)
+CLAUSE_FINAL_VERB = re.compile(r"[a-zäöüß]+(?:en|ern|eln)")
+
+BULLET = re.compile(r"^\s*(?:[-*•·▪►→]+|\d{1,2}[.)](?!\d)|[a-z][.)])\s*")
+
+# (pattern, confidence) - tried in order, first match wins
+ACTION_RULES = [
+    (re.compile(rf"^(?:action(?:\s+item)?|todo|to-do|task|aufgabe|ai)\s*[:\-]\s*{ASSIGNEE}\s+(?:to|will|soll|wird|muss)\s+(?P<task>.+)$", re.I), 0.95),
+    (re.compile(rf"^(?:ticket\s*#?\s*(?P<ticket>\d+)\s*)(?P<task>.+?)\s*(?:→|->|=>)\s*{ASSIGNEE}\s*$", re.I), 0.9),
+    (re.compile(rf"^{ASSIGNEE}\s+(?:will|should|must|needs to|has to|agreed to|is going to|volunteered to|is responsible for|takes care of)\s+(?P<task>.+)$"), 0.85),
+    (re.compile(rf"^(?P<email>{EMAIL})\s+(?:will|should|must|needs to|has to)\s+(?P<task>.+)$"), 0.85),
+    (re.compile(rf"^{ASSIGNEE}\s+(?:wird|soll|muss|übernimmt|kümmert sich um|erstellt|schreibt|prüft)\s+(?P<task>.+)$"), 0.8),
+]
+# German verb-second order after a leading deadline: "<deadline> erstellt Lena den Bericht"
+INVERTED_ACTION_RULE = (re.compile(rf"^(?:wird|soll|muss|übernimmt|erstellt|schreibt|prüft)\s+{ASSIGNEE}\s+(?P<task>.+)$"), 0.8)
+# Only inside task sections ("Aufgaben zu nächster Woche", "Neue Tickets", "Action items", "Next steps")
+SECTION_ACTION_RULE = (re.compile(rf"^{ASSIGNEE}\s*(?::|\s[–-])\s*(?P<task>.+)$"), 0.75)
+TASK_SECTION = re.compile(
+    r"^\s*(?:aufgaben(?:\s+zu|\s+für)?(?:\s+nächste[rn]?\s+woche)?|neue tickets|action items?|actions|"
+    r"next steps|to-?dos?|standup|responsibilities|verantwortlichkeiten)\s*:?\s*$",
+    re.I
+)
+SECTION_HEADING = re.compile(r"^\s*(?:\d{1,2}[.)]\s+)?[A-ZÄÖÜ][^.:!?]{0,60}:?\s*$")
+
+PREFIX_RULES = {
+    "decisions": re.compile(r"^(?:decision|decided|entscheidung|beschluss|beschlossen)\s*[:\-]\s*(?P<text>.+)$", re.I),
+    "agreements": re.compile(r"^(?:agreement|agreed|vereinbarung|vereinbart)\s*[:\-]\s*(?P<text>.+)$", re.I),
+    "risks": re.compile(r"^(?:risks?|risiko|risiken|blockers?|impediments?|hindernis(?:se)?|probleme?|problems?|issues?)\s*[:\-]\s*(?P<text>.+)$", re.I),
+    "reminders": re.compile(r"^(?:reminder|erinnerung)\s*[:\-]\s*(?P<text>.+)$", re.I),
+    "questions": re.compile(r"^(?:open\s+)?(?:question|frage|offene frage)\s*[:\-]\s*(?P<text>.+)$", re.I),
+    "changes": re.compile(r"^(?:change|änderung)\s*[:\-]\s*(?P<text>.+)$", re.I),
+}
+MILESTONE_RULE = re.compile(r"^(?P<date>\d{1,2}\.\d{1,2}\.\d{4})\s*[:\-–]?\s*(?P<text>[A-Za-zÄÖÜäöü].{3,})$")
+
+# Lines that probably carry something an extractor should pick up
+SIGNAL = re.compile(
+    r"\b(?:action|todo|task|will|should|must|needs to|has to|agreed|decision|decided|deadline|due|"
+    r"risk|blocker|impediment|problem|issue|reminder|ticket|volunteered|responsible|"
+    r"wird|soll|muss|bis|entscheidung|beschluss|aufgabe|risiko|hindernis|erinnerung|vereinbart)\b|→|->",
+    re.I
+)
+MEETING_DATE = re.compile(rf"(?:date|datum)\s*:?\s*(.+)", re.I)
+
+
+def resolve_date(day, month, year, default_year):
+    if year is None:
+        year = default_year
+    elif year < 100:
+        year += 2000
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def parse_date(text, meeting_date=None):
+    """Parse the first recognisable date in text; returns 'DD.MM.YYYY' or None."""
+    if not text:
+        return None
+    default_year = meeting_date.year if meeting_date else datetime.now().year
+    found = None
+
+    match = NUMERIC_DATE.search(text)
+    if match:
+        day, month, year = match.groups()
+        found = resolve_date(int(day), int(month), int(year) if year else None, default_year)
+    if not found:
+        match = END_OF_MONTH.search(text)
+        if match:
+            month = MONTHS[match.group(1).lower()]
+            found = date(default_year, month, calendar.monthrange(default_year, month)[1])
+    if not found:
+        match = MONTH_DAY.search(text)
+        if match:
+            found = resolve_date(int(match.group(2)), MONTHS[match.group(1).lower()],
+                                 int(match.group(3)) if match.group(3) else None, default_year)
+    if not found:
+        match = DAY_MONTH.search(text)
+        if match:
+            found = resolve_date(int(match.group(1)), MONTHS[match.group(2).lower()],
+                                 int(match.group(3)) if match.group(3) else None, default_year)
+    if not found and meeting_date:
+        if END_OF_WEEK.search(text):
+            found = meeting_date + timedelta(days=(4 - meeting_date.weekday()) % 7)
+        else:
+            match = WEEKDAY.search(text)
+            if match:
+                days_ahead = (WEEKDAYS[match.group(1).lower()] - meeting_date.weekday()) % 7 or 7
+                found = meeting_date + timedelta(days=days_ahead)
+
+    return found.strftime('%d.%m.%Y') if found else None
+
+
+def find_meeting_date(lines):
+    """Date of the meeting from the header (used for weekday-relative deadlines)."""
+    for line in lines[:15]:
+        match = MEETING_DATE.match(line.strip())
+        candidate = match.group(1) if match else line
+        parsed = parse_date(candidate)
+        if parsed and (match or NUMERIC_DATE.search(line)):
+            return datetime.strptime(parsed, '%d.%m.%Y').date()
+    return None
+
+
+def clean_sentence(text):
+    text = text.strip().strip('.;,').strip()
+    return text[:1].upper() + text[1:] if text else text
+
+
+def split_deadline(task, meeting_date):
+    """'prepare benchmarks by next Tuesday (June 17)' -> ('Prepare benchmarks', '17.06.2026', had_date_text)"""
+    match = DEADLINE_SPLIT.search(task)
+    if not match:
+        return clean_sentence(task), None, False
+    description = task[:match.start()]
+    when = match.group('when')
+    date = LEADING_DATE.match(when)
+    if date:
+        rest = when[date.end():].strip().rstrip('.;,!')
+        if CLAUSE_FINAL_VERB.fullmatch(rest):
+            description = f"{description.rstrip()} {rest}"
+    return clean_sentence(description), parse_date(when, meeting_date), True
+
+
+def split_leading_deadline(line):
+    """'Bis 01.07. erstellt Lena den Bericht' -> ('erstellt Lena den Bericht', '01.07.')"""
+    match = LEADING_DEADLINE.match(line)
+    if not match:
+        return line, None
+    return match.group('rest'), match.group('when')
+
+
+def build_action_item(match, confidence, meeting_date, leading_when=None):
+    groups = match.groupdict()
+    if groups.get('assignee') and groups['assignee'].split()[0].lower() in NON_NAME_SUBJECTS:
+        # Left to the LLM - the line stays uncovered, so hybrid mode does not stop at the rules
+        return None
+    description, deadline, had_date_text = split_deadline(groups['task'], meeting_date)
+    if leading_when and not had_date_text:
+        deadline, had_date_text = parse_date(leading_when, meeting_date), True
+    if not description:
+        return None
+    if groups.get('ticket'):
+        description = f"{description} (Ticket {groups['ticket']})"
+    if had_date_text and not deadline:
+        # There is a deadline we could not resolve - the LLM would do better
+        confidence -= 0.25
+    high = re.search(r"\b(?:urgent|asap|critical|dringend|sofort|kritisch)\b", groups['task'], re.I)
+    return {
+        "description": description,
+        "assignee": groups.get('assignee') or (groups.get('email') or '').split('@')[0] or None,
+        "assignee_email": groups.get('email'),
+        "deadline": deadline,
+        "priority": "high" if high else "medium",
+        "confidence": round(confidence, 2),
+    }
+
+
+def join_wrapped_lines(text):
+    """Re-join lines that PDF extraction wrapped mid-sentence (next line starts lowercase)."""
+    lines = []
+    for line in text.replace('\r\n', '\n').split('\n'):
+        stripped = line.strip()
+        if lines and stripped[:1].islower() and lines[-1].strip() and lines[-1].rstrip()[-1] not in '.!?:':
+            lines[-1] = f"{lines[-1].rstrip()} {stripped}"
+        else:
+            lines.append(line)
+    return lines
+
+
+def extract_with_rules(text):
+    """Run the rule pass. Returns (data, report) with report = coverage/confidence/matches."""
+    lines = join_wrapped_lines(text)
+    meeting_date = find_meeting_date(lines)
+    data = {category: [] for category in ("action_items", *PREFIX_RULES, "milestones")}
+    confidences = []
+    signal_lines = 0
+    covered_lines = 0
+    in_task_section = False
+
+    for raw_line in lines:
+        if not raw_line.strip():
+            continue
+        stripped = raw_line.strip()
+        if TASK_SECTION.match(stripped):
+            in_task_section = True
+            continue
+        line = BULLET.sub('', stripped).strip()
+        if not line:
+            continue
+        is_bullet = line != stripped
+        if in_task_section and not is_bullet and SECTION_HEADING.match(stripped):
+            in_task_section = False
+
+        is_signal = bool(SIGNAL.search(line))
+        signal_lines += is_signal
+        matched = False
+
+        task_line, leading_when = split_leading_deadline(line)
+        rules = ACTION_RULES + ([INVERTED_ACTION_RULE] if leading_when else []) \
+            + ([SECTION_ACTION_RULE] if in_task_section else [])
+        for pattern, confidence in rules:
+            match = pattern.match(task_line)
+            if match:
+                item = build_action_item(match, confidence, meeting_date, leading_when)
+                if item:
+                    data["action_items"].append(item)
+                    confidences.append(item["confidence"])
+                    matched = True
+                break
+
+        if not matched:
+            for category, pattern in PREFIX_RULES.items():
+                match = pattern.match(line)
+                if not match:
+                    continue
+                value = clean_sentence(match.group('text'))
+                if category == "risks":
+                    value = {"description": value, "severity": "medium", "raised_by": None}
+                elif category == "reminders":
+                    value = {"reminder": value, "deadline": parse_date(value, meeting_date)}
+                elif category == "questions":
+                    value = {"question": value, "asked_by": None}
+                data[category].append(value)
+                confidences.append(0.9)
+                matched = True
+                break
+
+        if not matched:
+            match = MILESTONE_RULE.match(line)
+            if match:
+                data["milestones"].append({
+                    "event": clean_sentence(match.group('text')),
+                    "date": parse_date(match.group('date')),
+                    "owner": None
+                })
+                confidences.append(0.8)
+                matched = True
+
+        covered_lines += matched and is_signal
+
+    items = len(confidences)
+    report = {
+        "items": items,
+        "signal_lines": signal_lines,
+        "coverage": round(covered_lines / signal_lines, 3) if signal_lines else (1.0 if items else 0.0),
+        "confidence": round(sum(confidences) / items, 3) if items else 0.0,
+    }
+    return {category: values for category, values in data.items() if values}, report
@@ -0,0 +1,103 @@
+"""Incremental JSON parser for streamed LLM output
+
+Emits every entry of a top-level category array ("action_items", "decisions", ...)
+as soon as it is complete, without waiting for the rest of the document.
+"""
+import json
+
+from ai.json_repair import repair_fragment
+
+
+class IncrementalJSONParser:
+    """Feed text chunks, get back (category, entry) pairs for completed array entries.
+
+    Text before the first "{" (prose, code fences) is skipped. Entries that do not
+    parse are repaired if possible, otherwise dropped; everything is also kept in
+    self.text for a final full parse.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.pos = 0
+        self.started = False
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.last_key = None      # last string seen at depth 1 (object key candidate)
+        self.key = None           # key whose value is being read
+        self.array_key = None     # category of the array we are inside (depth 2)
+        self.element_start = None
+
+    def feed(self, chunk):
+        """Consume a chunk of text and return the newly completed entries."""
+        self.text += chunk
+        completed = []
+        text = self.text
+        while self.pos < len(text) and not self.finished:
+            ch = text[self.pos]
+
+            if not self.started:
+                if ch == '{':
+                    self.started = True
+                    self.depth = 1
+                self.pos += 1
+                continue
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    self.close_string(completed)
+                self.pos += 1
+                continue
+
+            if ch == '"':
+                self.in_string = True
+                self.string_start = self.pos
+            elif ch == ':' and self.depth == 1:
+                self.key = self.last_key
+            elif ch in '{[':
+                if self.depth == 1 and ch == '[':
+                    self.array_key = self.key
+                elif self.depth == 2 and self.array_key and self.element_start is None:
+                    self.element_start = self.pos
+                self.depth += 1
+            elif ch in '}]':
+                self.depth -= 1
+                if self.depth == 2 and self.element_start is not None:
+                    self.emit(completed, text[self.element_start:self.pos + 1])
+                    self.element_start = None
+                elif self.depth == 1 and ch == ']':
+                    self.array_key = None
+                elif self.depth == 0:
+                    self.finished = True
+            self.pos += 1
+        return completed
+
+    def close_string(self, completed):
+        raw = self.text[self.string_start:self.pos + 1]
+        if self.depth == 1:
+            try:
+                self.last_key = json.loads(raw)
+            except ValueError:
+                self.last_key = None
+        elif self.depth == 2 and self.array_key and self.element_start is None:
+            self.emit(completed, raw)
+
+    def emit(self, completed, raw):
+        try:
+            completed.append((self.array_key, json.loads(raw)))
+            return
+        except ValueError:
+            pass
+        entry, repairs = repair_fragment(raw)
+        if entry is None:
+            print(f"⚠️ Skipping unparsable streamed entry in {self.array_key}: {raw[:100]}")
+            return
+        print(f"🔧 Repaired streamed entry in {self.array_key}: {', '.join(repairs)}")
+        completed.append((self.array_key, entry))
@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify, session
 from flask_login import login_user, logout_user, login_required, current_user
-from integrations.google_auth import get_auth_url_with_user_info, exchange_code_for_credentials
+from integrations.google_auth import get_auth_url_with_user_info, exchange_code_for_credentials, credential_manager
 from database.models import db, User
 
 auth_bp = Blueprint('auth', __name__)
@@ -43,10 +43,12 @@ def google_callback():
             print(f"New user created: {email}")
         else:
             user.google_access_token = credentials.token
-            user.google_refresh_token = credentials.refresh_token
+            # Google only sends a refresh token with a fresh consent; keep the old one otherwise
+            user.google_refresh_token = credentials.refresh_token or user.google_refresh_token
             print(f"User tokens updated: {email}")
         
         db.session.commit()
+        credential_manager.remember(user.id, credentials)
         login_user(user)
         
         return """
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from integrations.google_calendar import add_events_to_calendar_for_user
+from database.models import db, CalendarSyncJob
+from utils.calendar_sync import enqueue_calendar_sync, CalendarQueueFull
 
 calendar_bp = Blueprint('calendar', __name__)
 
@@ -16,6 +17,8 @@ def add_to_calendar():
         "events": [...],
         "sendInvitations": true/false
     }
+    
+    Answers 202 once the events are queued; GET /calendar/sync/<job_id> has the outcome.
     """
     
     # Check if user has calendar access
@@ -40,32 +43,10 @@ def add_to_calendar():
     print("=" * 60)
     
     try:
-        # Call calendar integration
-        result = add_events_to_calendar_for_user(
-            access_token=current_user.google_access_token,
-            events_data=events_data,
-            organizer_email=current_user.email,
-            send_invitations=send_invitations
-        )
-        
-        # Build response
-        response_data = {
-            'status': 'success',
-            'created_count': len(result['created_events']),
-            'personal_tasks': result['personal_tasks'],
-            'invitations_sent': result['invitations_sent'],
-            'organizer': current_user.email,
-            'organizer_name': current_user.name
-        }
-        
-        print("✅ Calendar operation successful")
-        print(f"   Created: {response_data['created_count']}")
-        print(f"   Personal: {response_data['personal_tasks']}")
-        print(f"   Invitations: {response_data['invitations_sent']}")
-        print("=" * 60 + "\n")
-        
-        return jsonify(response_data)
-    
+        # Written by the calendar sync worker - the request does not wait for Google
+        job = enqueue_calendar_sync(current_user.id, events_data, send_invitations=send_invitations)
+    except CalendarQueueFull:
+        return jsonify({'error': 'Too many calendar updates queued, please retry later'}), 503
     except Exception as e:
         print(f"❌ Calendar error: {e}")
         import traceback
@@ -74,6 +55,26 @@ def add_to_calendar():
         return jsonify({
             'error': f'Failed to add events to calendar: {str(e)}'
         }), 500
+    
+    print(f"📥 Queued calendar sync job {job.id}")
+    return jsonify({
+        'status': 'queued',
+        'job_id': job.id,
+        'status_url': f'/calendar/sync/{job.id}',
+        'event_count': job.event_count,
+        'organizer': current_user.email,
+        'organizer_name': current_user.name
+    }), 202
+
+
+@calendar_bp.route('/sync/<job_id>', methods=['GET'])
+@login_required
+def get_sync_job(job_id):
+    """Status of a queued calendar write; when done, result has the created/updated/unchanged/failed counts"""
+    job = db.session.get(CalendarSyncJob, job_id)
+    if not job or job.user_id != current_user.id:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
 
 
 @calendar_bp.route('/preview', methods=['POST'])
@@ -1,46 +1,333 @@
-from flask import Blueprint, request, jsonify
-from flask_login import login_required
-from documents.handlers import extract_text_from_file, extract_text_from_url
-from ai.parser import extract_insights
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from flask_login import login_required, current_user
+from werkzeug.exceptions import RequestEntityTooLarge
+from config import Config
+from utils.fastjson import dumps
+from documents.handlers import extract_text_from_file, extract_text_from_url, extract_documents_from_zip
+from documents.uploads import SpooledDocument, UploadTooLarge, format_size, spool_upload
+from ai.parser import analyze_text, stream_insights, resolve_mode
+from ai.participants import current_scope
 from integrations.rabbitmq import send_to_queue
+from database.models import db, ParseJob
+from utils.parse_jobs import submit_job, cancel_job, JobQueueFull
 
 parse_bp = Blueprint('parse', __name__)
 
+
+def parse_flag(value):
+    """'1'/'true' -> True, '0'/'false' -> False, missing -> None (let the parser decide)."""
+    if value is None or value == '':
+        return None
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def get_request_source():
+    """Return ('file', FileStorage) or ('url', url) for the current request, or None."""
+    if 'file' in request.files:
+        return ('file', request.files['file'])
+    if 'url' in request.form:
+        return ('url', request.form['url'])
+    return None
+
+
+def extract_source_text(source):
+    """Extract text from a ('file', FileStorage) or ('url', url) source."""
+    kind, value = source
+    if kind == 'file':
+        return extract_text_from_file(value)
+    return extract_text_from_url(value)
+
+
+def detach_source(source):
+    """Spool an uploaded file out of the request so a background job can still read it."""
+    kind, value = source
+    if kind != 'file':
+        return source
+    return kind, spool_upload(value)
+
+
+def close_sources(sources):
+    """Delete the spooled files of detached ('file', SpooledDocument) sources."""
+    for kind, value in sources:
+        if kind == 'file' and isinstance(value, SpooledDocument):
+            value.close()
+
+
+def too_large(error):
+    """413 for an upload over the request, document or page limit."""
+    if isinstance(error, UploadTooLarge):
+        message = str(error)
+    else:
+        message = f"Request is larger than {format_size(current_app.config['MAX_CONTENT_LENGTH'])}"
+    return jsonify({"error": message}), 413
+
+
+def sse_message(event, data):
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+
+def get_batch_sources():
+    """Collect (name, source) pairs from 'files'/'file' uploads, zip archives and 'urls'/'url' fields."""
+    sources = []
+    try:
+        for file in request.files.getlist('files') + request.files.getlist('file'):
+            if not file or file.filename == '':
+                continue
+            if file.filename.lower().endswith('.zip'):
+                for document in extract_documents_from_zip(file, Config.BATCH_MAX_DOCUMENTS,
+                                                           Config.BATCH_MAX_ZIP_MEMBER_BYTES):
+                    sources.append((f"{file.filename}/{document.filename}", ('file', document)))
+            else:
+                sources.append((file.filename, detach_source(('file', file))))
+            if len(sources) > Config.BATCH_MAX_DOCUMENTS:
+                raise ValueError(f"A batch can contain at most {Config.BATCH_MAX_DOCUMENTS} documents")
+    except BaseException:
+        close_sources(source for _, source in sources)
+        raise
+
+    for url in request.form.getlist('urls') + request.form.getlist('url'):
+        url = url.strip()
+        if url:
+            sources.append((url, ('url', url)))
+    if len(sources) > Config.BATCH_MAX_DOCUMENTS:
+        close_sources(source for _, source in sources)
+        raise ValueError(f"A batch can contain at most {Config.BATCH_MAX_DOCUMENTS} documents")
+    return sources
+
+
+def analyze_source(app, source, chunked, mode, scope):
+    """Extraction + rules/LLM for one document of a batch (no RabbitMQ publish). Returns (events, info)."""
+    content = extract_source_text(source)
+    if not content or len(content.strip()) == 0:
+        raise ValueError("Could not extract text from document")
+    # App context for the participant directory (batch documents run on pool threads)
+    with app.app_context():
+        raw_events, info = analyze_text(content, chunked=chunked, mode=mode, scope=scope)
+    if not raw_events:
+        raise ValueError("No events could be extracted")
+    return raw_events, info
+
+
+def run_parse_job(job, source, chunked, mode, scope):
+    """Background version of /parse: extraction -> LLM -> RabbitMQ, with per-stage progress."""
+    job.stage('extracting')
+    try:
+        content = extract_source_text(source)
+    finally:
+        # Free the spool file early; submit_job's cleanup covers jobs that never get here
+        close_sources([source])
+    if not content or len(content.strip()) == 0:
+        raise ValueError("Could not extract text from document")
+
+    job.stage('analyzing')
+    raw_events, info = analyze_text(content, chunked=chunked, mode=mode, scope=scope)
+    job.update(extraction_path=info['path'], prompt_version=info['prompt_version'])
+    if not raw_events:
+        raise ValueError("No events could be extracted")
+
+    job.stage('publishing')
+    try:
+        send_to_queue(raw_events)
+    except Exception as e:
+        print(f"RabbitMQ error (non-critical): {e}")
+    return raw_events
+
+
 @parse_bp.route('/parse', methods=['POST'])
 @login_required
 def parse():
     try:
         content = None
-        
-        if 'file' in request.files:
-            file = request.files['file']
-            content = extract_text_from_file(file)
-        elif 'url' in request.form:
-            url = request.form['url']
-            content = extract_text_from_url(url)
-        else:
+
+        source = get_request_source()
+        if source is None:
             return jsonify({"error": "No file or URL provided"}), 400
-        
+
+        chunked = parse_flag(request.values.get('chunked'))
+        mode = resolve_mode(request.values.get('mode'))
+
+        if parse_flag(request.args.get('async')):
+            if source[0] == 'file' and source[1].filename == '':
+                return jsonify({"error": "No file selected"}), 400
+            detached = detach_source(source)
+            try:
+                job_id = submit_job(current_app._get_current_object(), current_user.id,
+                                    run_parse_job, detached, chunked, mode, current_scope(),
+                                    cleanup=lambda: close_sources([detached]))
+            except JobQueueFull:
+                close_sources([detached])
+                return jsonify({"error": "Too many parse jobs queued, please retry later"}), 503
+            return jsonify({
+                "job_id": job_id,
+                "status": "queued",
+                "status_url": f"/parse/jobs/{job_id}"
+            }), 202
+
+        content = extract_source_text(source)
+
         if not content or len(content.strip()) == 0:
             return jsonify({"error": "Could not extract text from document"}), 400
-        
-        print("Extracting insights from document...")
-        raw_events = extract_insights(content)
-        
+
+        print(f"Extracting insights from document (mode: {mode})...")
+        raw_events, info = analyze_text(content, chunked=chunked, mode=mode)
+
         if not raw_events:
             return jsonify({"error": "No events could be extracted"}), 500
-        
+
         try:
             send_to_queue(raw_events)
         except Exception as e:
             print(f"RabbitMQ error (non-critical): {e}")
-        
-        return jsonify(raw_events), 200
 
+        # Body stays a plain event list; the answering path and prompt version go into headers
+        headers = {'X-Extraction-Path': info['path']}
+        if info['prompt_version']:
+            headers['X-Prompt-Version'] = info['prompt_version']
+        return jsonify(raw_events), 200, headers
+
+    except (UploadTooLarge, RequestEntityTooLarge) as e:
+        return too_large(e)
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error in /parse endpoint: {e}")
         import traceback
         traceback.print_exc()
-        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+
+@parse_bp.route('/parse/stream', methods=['POST'])
+@login_required
+def parse_stream():
+    """Like /parse, but pushes each event as an SSE message as soon as the model has produced it"""
+    try:
+        source = get_request_source()
+        if source is None:
+            return jsonify({"error": "No file or URL provided"}), 400
+        mode = resolve_mode(request.values.get('mode'))
+        content = extract_source_text(source)
+    except (UploadTooLarge, RequestEntityTooLarge) as e:
+        return too_large(e)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not content or len(content.strip()) == 0:
+        return jsonify({"error": "Could not extract text from document"}), 400
+
+    def generate():
+        events = []
+        info = {}
+        try:
+            for event in stream_insights(content, mode=mode, info=info):
+                events.append(event)
+                yield sse_message('event', event)
+        except Exception as e:
+            print(f"Error in /parse/stream: {e}")
+            yield sse_message('error', {"error": f"Streaming failed: {str(e)}"})
+            return
+
+        if not events:
+            yield sse_message('error', {"error": "No events could be extracted"})
+            return
+
+        try:
+            send_to_queue(events)
+        except Exception as e:
+            print(f"RabbitMQ error (non-critical): {e}")
+        yield sse_message('done', {"count": len(events), "path": info.get('path'),
+                                   "prompt_version": info.get('prompt_version')})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@parse_bp.route('/parse/batch', methods=['POST'])
+@login_required
+def parse_batch():
+    """Parse many documents concurrently and stream one NDJSON line per document as it finishes"""
+    try:
+        mode = resolve_mode(request.values.get('mode'))
+        sources = get_batch_sources()
+    except (UploadTooLarge, RequestEntityTooLarge) as e:
+        return too_large(e)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not sources:
+        return jsonify({"error": "No files or URLs provided"}), 400
+
+    chunked = parse_flag(request.values.get('chunked'))
+    app = current_app._get_current_object()
+    # Pool threads have no request - the uploader's directory scope is passed along
+    scope = current_scope()
+    parallelism = max(1, min(Config.BATCH_PARALLELISM, len(sources)))
+    print(f"📦 Batch of {len(sources)} documents, {parallelism} in parallel")
+
+    def generate():
+        all_events = []
+        failed = 0
+        with ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="parse-batch") as pool:
+            futures = {
+                pool.submit(analyze_source, app, source, chunked, mode, scope): (index, name)
+                for index, (name, source) in enumerate(sources)
+            }
+            # One failing document only produces an error line - the rest of the batch continues
+            for future in as_completed(futures):
+                index, name = futures[future]
+                try:
+                    events, info = future.result()
+                    all_events.extend(events)
+                    line = {"index": index, "source": name, "status": "ok", "path": info['path'],
+                            "prompt_version": info['prompt_version'], "events": events}
+                except Exception as e:
+                    failed += 1
+                    print(f"❌ Batch document {name} failed: {e}")
+                    line = {"index": index, "source": name, "status": "error", "error": str(e)}
+                yield dumps(line) + "\n"
+
+        # Publish the whole batch over a single RabbitMQ connection
+        published = False
+        if all_events:
+            try:
+                send_to_queue(all_events)
+                published = True
+            except Exception as e:
+                print(f"RabbitMQ error (non-critical): {e}")
+
+        yield dumps({"summary": {
+            "documents": len(sources),
+            "succeeded": len(sources) - failed,
+            "failed": failed,
+            "events": len(all_events),
+            "published": published
+        }}) + "\n"
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs once the stream is finished or abandoned (the pool has been joined by then)
+    response.call_on_close(lambda: close_sources(source for _, source in sources))
+    return response
+
+
+@parse_bp.route('/parse/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_parse_job(job_id):
+    """Status, per-stage progress and (when done) the extracted events of a background job"""
+    job = db.session.get(ParseJob, job_id)
+    if not job or job.user_id != current_user.id:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+
+@parse_bp.route('/parse/jobs/<job_id>', methods=['DELETE'])
+@login_required
+def cancel_parse_job(job_id):
+    """Cancel a queued or running background job"""
+    job = db.session.get(ParseJob, job_id)
+    if not job or job.user_id != current_user.id:
+        return jsonify({"error": "Job not found"}), 404
+    if not cancel_job(job_id):
+        db.session.refresh(job)
+        return jsonify({"error": f"Job already {job.status}", "job": job.to_dict()}), 409
+    db.session.refresh(job)
+    return jsonify(job.to_dict())
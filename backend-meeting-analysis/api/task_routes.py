@@ -1,25 +1,56 @@
 """Routes for task acceptance/decline"""
 from flask import Blueprint
-from database.models import db, User
-from integrations.google_calendar import add_events_to_calendar_for_user
-from sqlalchemy import text
+from database.models import db, PendingTask, User
+from config import Config
+from utils.calendar_sync import enqueue_calendar_sync, CalendarQueueFull
+from utils.task_tokens import (ExpiredTaskToken, InvalidTaskToken, consumed_tokens, is_signed_token,
+                               verify_task_token)
 
 task_bp = Blueprint('tasks', __name__)
 
+NOT_FOUND = ("❌ Task not found or already processed", 404)
+
+
+def find_pending_task(token):
+    """Return (task, None) or (None, error response).
+
+    Forged, expired and already used signed links are answered without a query.
+    """
+    if is_signed_token(token):
+        try:
+            claims = verify_task_token(token)
+        except ExpiredTaskToken:
+            return None, ("⌛ This task link has expired", 410)
+        except InvalidTaskToken:
+            return None, NOT_FOUND
+    elif not Config.TASK_TOKEN_ACCEPT_LEGACY:
+        return None, NOT_FOUND
+    else:
+        claims = None
+    
+    consumed_tokens.ensure_loaded()
+    if consumed_tokens.might_contain(token):
+        return None, NOT_FOUND
+    
+    if claims:
+        task = db.session.get(PendingTask, claims['task_id'])
+        if task is None or task.token != token or task.status != 'pending':
+            return None, NOT_FOUND
+    else:
+        task = PendingTask.query.filter_by(token=token, status='pending').first()
+        if not task:
+            return None, NOT_FOUND
+    return task, None
+
 @task_bp.route('/accept/<token>')
 def accept_task(token):
     """Accept task and add to calendar"""
     try:
-        # Get task from database
-        result = db.session.execute(
-            text("SELECT * FROM pending_tasks WHERE token = :token AND status = 'pending'"),
-            {"token": token}
-        ).fetchone()
-        
-        if not result:
-            return "❌ Task not found or already processed", 404
+        task, error = find_pending_task(token)
+        if error:
+            return error
         
-        task_id, description, email, deadline, priority, _, status, _ = result
+        description, email, deadline, priority = task.description, task.assignee_email, task.deadline, task.priority
         
         # Find user by email
         user = User.query.filter_by(email=email).first()
@@ -44,24 +75,30 @@ def accept_task(token):
             </div></body></html>
             """
         
-        # Create event
+        # Create event - assigned to the accepting user, so it lands in their calendar without an invitation
         events = [{
             "type": "action_item",
             "message": description,
+            "description": description,
             "deadline": deadline,
-            "priority": priority
+            "priority": priority,
+            "assignee_email": email
         }]
         
-        # Add to calendar
-        count = add_events_to_calendar_for_user(user, events)
+        # Claim the task so a second click does not queue it again; the sync worker
+        # marks it accepted once the event is in the calendar (or pending again if it failed)
+        claimed = PendingTask.query.filter_by(token=token, status='pending').update(
+            {'status': 'syncing'}, synchronize_session=False)
+        db.session.commit()
         
-        if count > 0:
-            # Mark as accepted
-            db.session.execute(
-                text("UPDATE pending_tasks SET status = 'accepted' WHERE token = :token"),
-                {"token": token}
-            )
-            db.session.commit()
+        if claimed:
+            try:
+                enqueue_calendar_sync(user.id, events, task_token=token)
+            except Exception:
+                db.session.rollback()
+                PendingTask.query.filter_by(token=token).update({'status': 'pending'}, synchronize_session=False)
+                db.session.commit()
+                raise
             
             return f"""
             <html>
@@ -79,7 +116,7 @@ def accept_task(token):
             <body><div class="box">
                 <div class="icon">✅</div>
                 <h1 style="color: #28a745;">Task Accepted!</h1>
-                <p>The task has been added to your Google Calendar.</p>
+                <p>The task is being added to your Google Calendar.</p>
                 <div class="details">
                     <p><strong>Task:</strong> {description}</p>
                     <p><strong>Deadline:</strong> {deadline}</p>
@@ -93,8 +130,10 @@ def accept_task(token):
             </div></body></html>
             """
         else:
-            return "❌ Failed to add to calendar", 500
+            return "❌ Task not found or already processed", 404
             
+    except CalendarQueueFull:
+        return "⏳ Too many calendar updates queued, please try the link again later", 503
     except Exception as e:
         print(f"❌ Error accepting task: {e}")
         return f"Error: {str(e)}", 500
@@ -103,23 +142,19 @@ def accept_task(token):
 def decline_task(token):
     """Decline task"""
     try:
-        # Get task from database
-        result = db.session.execute(
-            text("SELECT * FROM pending_tasks WHERE token = :token AND status = 'pending'"),
-            {"token": token}
-        ).fetchone()
-        
-        if not result:
-            return "❌ Task not found or already processed", 404
+        task, error = find_pending_task(token)
+        if error:
+            return error
         
-        task_id, description, email, deadline, priority, _, status, _ = result
+        description, email, deadline, priority = task.description, task.assignee_email, task.deadline, task.priority
         
-        # Mark as declined
-        db.session.execute(
-            text("UPDATE pending_tasks SET status = 'declined' WHERE token = :token"),
-            {"token": token}
-        )
+        # Mark as declined - conditional, a concurrent accept or decline may have answered it meanwhile
+        declined = PendingTask.query.filter_by(token=token, status='pending').update(
+            {'status': 'declined'}, synchronize_session=False)
         db.session.commit()
+        if not declined:
+            return NOT_FOUND
+        consumed_tokens.add(token)
         
         return f"""
         <html>
@@ -1,6 +1,7 @@
 """Meeting Analysis Backend v2.0 - Multi-User"""
 import os
-from flask import Flask, jsonify
+import time
+from flask import Flask, Response, abort, g, jsonify, request
 from flask_cors import CORS
 from flask_login import LoginManager
 
@@ -13,16 +14,33 @@ from api.task_routes import task_bp
 from api.notification_routes import notification_bp
 
 from integrations.email_service import init_mail
+from ai.cache import insights_cache
+from documents.text_cache import text_cache
+from integrations.calendar_service import calendar_services
+from integrations.google_auth import credential_manager
+from utils.calendar_sync import calendar_sync
+from utils.mail_outbox import ensure_outbox_columns, mail_outbox
+from utils.pending_tasks import ensure_pending_task_indexes, task_sweeper
+from utils.notification_digest import digest_flusher, ensure_digest_columns
+from utils.task_tokens import check_signing_key, consumed_tokens
+from ai.llm_client import llm_client
+from documents.uploads import format_size
+from utils.fastjson import FastJSONProvider, dumps
+from utils.metrics import registry, http_requests_in_flight, http_request_seconds
 def create_app():
     """Application factory"""
     app = Flask(__name__)
     app.config.from_object(Config)
+    # Same encoder for jsonify, SSE/NDJSON, RabbitMQ and the JSON columns
+    app.json = FastJSONProvider(app)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'json_serializer': dumps}
     
     CORS(app,
          supports_credentials=True,
          origins=Config.CORS_ORIGINS,
          allow_headers=["Content-Type"],
-         methods=["GET", "POST", "OPTIONS"])
+         expose_headers=["X-Extraction-Path", "X-Prompt-Version"],
+         methods=["GET", "POST", "DELETE", "OPTIONS"])
     
     db.init_app(app)
     
@@ -40,6 +58,38 @@ def create_app():
     app.register_blueprint(calendar_bp, url_prefix='/calendar')
     app.register_blueprint(task_bp, url_prefix='/tasks')  
     app.register_blueprint(notification_bp, url_prefix='/notifications')
+
+    @app.before_request
+    def track_request_start():
+        g.metrics_endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        g.metrics_start = time.perf_counter()
+        http_requests_in_flight.inc(endpoint=g.metrics_endpoint)
+
+    # Reject by Content-Length before anything reads the body (chunked bodies hit the limit while parsing)
+    @app.before_request
+    def reject_oversized_request():
+        limit = app.config.get('MAX_CONTENT_LENGTH')
+        if limit and request.content_length and request.content_length > limit:
+            abort(413)
+
+    @app.errorhandler(413)
+    def request_too_large(error):
+        return jsonify({"error": f"Request is larger than {format_size(app.config['MAX_CONTENT_LENGTH'])}"}), 413
+
+    # Teardown runs after a streamed body is finished, so SSE/NDJSON responses count until closed
+    @app.teardown_request
+    def track_request_end(error=None):
+        if 'metrics_start' not in g:
+            return
+        http_requests_in_flight.dec(endpoint=g.metrics_endpoint)
+        http_request_seconds.observe(time.perf_counter() - g.metrics_start,
+                                     endpoint=g.metrics_endpoint, method=request.method)
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        """Prometheus text exposition"""
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
     @app.route("/", methods=["GET"])
     def home():
         return jsonify({
@@ -49,12 +99,19 @@ def create_app():
             "endpoints": {
                 "/": "GET - Service info",
                 "/health": "GET - Health check",
+                "/metrics": "GET - Prometheus metrics",
                 "/auth/google": "GET - Sign in with Google",
                 "/auth/google/callback": "GET - OAuth callback",
                 "/auth/me": "GET - Get current user",
                 "/auth/logout": "POST - Logout",
-                "/parse": "POST - Parse meeting documents",
-                "/calendar/add": "POST - Add events to calendar"
+                "/parse": "POST - Parse meeting documents (?async=1 for a background job, mode=rules|llm|hybrid)",
+                "/parse/stream": "POST - Parse with Server-Sent Events per extracted item",
+                "/parse/batch": "POST - Parse many files/URLs/zip archives (NDJSON stream)",
+                "/parse/jobs/<id>": "GET - Job status / DELETE - Cancel job",
+                "/calendar/add": "POST - Queue events for the calendar (202)",
+                "/calendar/sync/<id>": "GET - Calendar sync job status",
+                "/notifications/send": "POST - Queue task emails to assignees (202)",
+                "/notifications/outbox/<id>": "GET - Email delivery status"
             }
         })
     
@@ -64,7 +121,17 @@ def create_app():
             "status": "healthy",
             "rabbitmq_configured": bool(Config.CLOUDAMQP_URL),
             "openrouter_configured": bool(Config.OPENROUTER_API_KEY),
-            "mock_mode": Config.MOCK_MODE
+            "mock_mode": Config.MOCK_MODE,
+            "insights_cache": insights_cache.get_stats(),
+            "text_cache": text_cache.get_stats() if text_cache is not None else {"enabled": False},
+            "openrouter_client": llm_client.get_stats(),
+            "calendar_services": calendar_services.get_stats(),
+            "google_credentials": credential_manager.get_stats(),
+            "calendar_sync": calendar_sync.get_stats(),
+            "mail_outbox": mail_outbox.get_stats(),
+            "pending_task_sweeper": task_sweeper.get_stats(),
+            "notification_digest": digest_flusher.get_stats(),
+            "consumed_task_links": consumed_tokens.get_stats()
         })
         
     
@@ -85,12 +152,26 @@ def create_app():
 
 
 if __name__ == "__main__":
+    check_signing_key()
     app = create_app()
     
     with app.app_context():
         db.create_all()
+        # create_all skips tables that exist - pending_tasks may predate its indexes,
+        # outbox_messages and notification_digest_items their user_id
+        ensure_pending_task_indexes()
+        ensure_outbox_columns()
+        ensure_digest_columns()
+        consumed_tokens.load()
         print(" Database initialized")
     
+    # Picks up calendar writes and emails still queued from before the restart
+    if Config.CALENDAR_SYNC_WORKER:
+        calendar_sync.start(app)
+    mail_outbox.start(app)
+    task_sweeper.start(app)
+    digest_flusher.start(app)
+    
     print("=" * 70)
     print("🚀 Meeting Analysis Backend v2.0 - Multi-User")
     print("=" * 70)
@@ -98,10 +179,13 @@ if __name__ == "__main__":
     print(f"\n Available Endpoints:")
     print(f"   GET  /              → Service info")
     print(f"   GET  /health        → Health check")
+    print(f"   GET  /metrics       → Prometheus metrics")
     print(f"   GET  /auth/google   → Sign in with Google")
     print(f"   GET  /auth/me       → Current user info")
     print(f"   POST /parse         → Parse meeting documents")
-    print(f"   POST /calendar/add  → Add events to calendar")
+    print(f"   GET  /parse/jobs/<id> → Background parse job status")
+    print(f"   POST /calendar/add  → Queue events for the calendar")
+    print(f"   GET  /calendar/sync/<id> → Calendar sync job status")
     print(f"   POST /auth/logout   → Logout")
     print(f"\n Configuration:")
     print(f"   MOCK_MODE:  {Config.MOCK_MODE}")
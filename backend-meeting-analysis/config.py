@@ -2,6 +2,9 @@
 import os
 import secrets
 from datetime import timedelta
+from dotenv import load_dotenv
+
+load_dotenv()  # Config is imported first, so read .env before the class body runs
 
 class Config:
     """Application configuration"""
@@ -21,11 +24,155 @@ class Config:
     GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
     GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET')
     REDIRECT_URI = 'http://localhost:8080/auth/google/callback'
+    GOOGLE_CLIENT_SECRET_FILE = os.getenv('GOOGLE_CLIENT_SECRET_FILE', 'client_secret.json')
+    # Access tokens are refreshed this many seconds before they expire
+    GOOGLE_TOKEN_REFRESH_MARGIN = int(os.getenv('GOOGLE_TOKEN_REFRESH_MARGIN', '300'))
+    GOOGLE_HTTP_POOL_SIZE = int(os.getenv('GOOGLE_HTTP_POOL_SIZE', '10'))
+    GOOGLE_HTTP_TIMEOUT = float(os.getenv('GOOGLE_HTTP_TIMEOUT', '15'))
     
     # AI
     OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
     MOCK_MODE = os.getenv('MOCK_MODE', 'false').lower() == 'true'
-    
+
+    # OpenRouter client (ai/llm_client.py)
+    LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', 5))
+    LLM_READ_TIMEOUT = float(os.getenv('LLM_READ_TIMEOUT', 120))
+    LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 3))
+    LLM_BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', 1.0))
+    LLM_BACKOFF_MAX = float(os.getenv('LLM_BACKOFF_MAX', 20))
+    LLM_RETRY_AFTER_MAX = float(os.getenv('LLM_RETRY_AFTER_MAX', 60))
+    LLM_POOL_SIZE = int(os.getenv('LLM_POOL_SIZE', 10))
+    LLM_CIRCUIT_FAILURES = int(os.getenv('LLM_CIRCUIT_FAILURES', 5))
+    LLM_CIRCUIT_RESET = float(os.getenv('LLM_CIRCUIT_RESET', 30))
+
+    # Extraction path: rules (local only), llm, or hybrid (rules first, LLM if not conclusive)
+    EXTRACTION_MODE = os.getenv('EXTRACTION_MODE', 'hybrid').lower()
+    RULES_MIN_COVERAGE = float(os.getenv('RULES_MIN_COVERAGE', 0.8))
+    RULES_MIN_CONFIDENCE = float(os.getenv('RULES_MIN_CONFIDENCE', 0.8))
+
+    # Prompt family from ai/prompts.py: full, or compact (English/German variant picked per document)
+    PROMPT_TEMPLATE = os.getenv('PROMPT_TEMPLATE', 'full').lower()
+
+    # Participant directory for assignee -> email mapping, one per uploader's company domain
+    # (accounts on a free-mail domain get a directory of their own)
+    PARTICIPANT_DIRECTORY_ENABLED = os.getenv('PARTICIPANT_DIRECTORY_ENABLED', 'true').lower() == 'true'
+    PARTICIPANT_FREE_MAIL_DOMAINS = {d.strip().lower() for d in os.getenv(
+        'PARTICIPANT_FREE_MAIL_DOMAINS',
+        'gmail.com,googlemail.com,outlook.com,hotmail.com,live.com,msn.com,yahoo.com,icloud.com,me.com,'
+        'aol.com,gmx.de,gmx.net,web.de,t-online.de,freenet.de,proton.me,protonmail.com,mail.com,yandex.com'
+    ).split(',') if d.strip()}
+    PARTICIPANT_DIRECTORY_TTL = int(os.getenv('PARTICIPANT_DIRECTORY_TTL', 300))
+    PARTICIPANT_MAX_EDIT_DISTANCE = int(os.getenv('PARTICIPANT_MAX_EDIT_DISTANCE', 2))
+
+    # Uploads (documents/uploads.py): whole request, per document, and when to spool to disk
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 100 * 1024 * 1024))
+    UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', 25 * 1024 * 1024))
+    UPLOAD_SPOOL_BYTES = int(os.getenv('UPLOAD_SPOOL_BYTES', 1024 * 1024))
+    UPLOAD_TMP_DIR = os.getenv('UPLOAD_TMP_DIR') or None
+    UPLOAD_MAX_PAGES = int(os.getenv('UPLOAD_MAX_PAGES', 2000))
+
+    # URL documents (documents/fetcher.py); the cache keeps extracted text for conditional GETs
+    URL_FETCH_CONNECT_TIMEOUT = float(os.getenv('URL_FETCH_CONNECT_TIMEOUT', 5))
+    URL_FETCH_READ_TIMEOUT = float(os.getenv('URL_FETCH_READ_TIMEOUT', 10))
+    URL_FETCH_MAX_BYTES = int(os.getenv('URL_FETCH_MAX_BYTES', UPLOAD_MAX_BYTES))
+    URL_FETCH_PER_HOST = int(os.getenv('URL_FETCH_PER_HOST', 4))
+    URL_FETCH_POOL_SIZE = int(os.getenv('URL_FETCH_POOL_SIZE', 10))
+    URL_CACHE_PATH = os.getenv('URL_CACHE_PATH', 'instance/url_cache.sqlite')
+    URL_CACHE_TTL = int(os.getenv('URL_CACHE_TTL', 7 * 24 * 3600))
+    URL_CACHE_MAX_ENTRIES = int(os.getenv('URL_CACHE_MAX_ENTRIES', 1000))
+
+    # PDF extraction (documents/pdf.py); budgets of 0 mean unlimited
+    PDF_MAX_PAGES = int(os.getenv('PDF_MAX_PAGES', 500))
+    PDF_MAX_CHARS = int(os.getenv('PDF_MAX_CHARS', 1_000_000))
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', 40))
+    PDF_PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', 10))
+    PDF_WORKERS = int(os.getenv('PDF_WORKERS', min(4, os.cpu_count() or 1)))
+
+    # Extracted-text cache for PDF/DOCX uploads, keyed by content hash (documents/text_cache.py)
+    TEXT_CACHE_ENABLED = os.getenv('TEXT_CACHE_ENABLED', 'true').lower() == 'true'
+    TEXT_CACHE_PATH = os.getenv('TEXT_CACHE_PATH', 'instance/text_cache.sqlite')
+    TEXT_CACHE_MAX_BYTES = int(os.getenv('TEXT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+    TEXT_CACHE_COMPRESSION_LEVEL = int(os.getenv('TEXT_CACHE_COMPRESSION_LEVEL', 6))
+
+    # AI result cache
+    INSIGHTS_CACHE_ENABLED = os.getenv('INSIGHTS_CACHE_ENABLED', 'true').lower() == 'true'
+    INSIGHTS_CACHE_PATH = os.getenv('INSIGHTS_CACHE_PATH', 'instance/insights_cache.sqlite')
+    INSIGHTS_CACHE_TTL = int(os.getenv('INSIGHTS_CACHE_TTL', 7 * 24 * 3600))
+    INSIGHTS_CACHE_MAX_ENTRIES = int(os.getenv('INSIGHTS_CACHE_MAX_ENTRIES', 512))
+    INSIGHTS_CACHE_MAX_BYTES = int(os.getenv('INSIGHTS_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    INSIGHTS_CACHE_DISK_MAX_ENTRIES = int(os.getenv('INSIGHTS_CACHE_DISK_MAX_ENTRIES', 20000))
+
+    # Chunked extraction for long documents (a single prompt only sends the first 4500 chars)
+    CHUNK_THRESHOLD_CHARS = int(os.getenv('CHUNK_THRESHOLD_CHARS', 4500))
+    CHUNK_MAX_TOKENS = int(os.getenv('CHUNK_MAX_TOKENS', 1000))
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 4))
+
+    # Background /parse jobs (POST /parse?async=1)
+    PARSE_JOB_WORKERS = int(os.getenv('PARSE_JOB_WORKERS', 4))
+    PARSE_JOB_QUEUE_LIMIT = int(os.getenv('PARSE_JOB_QUEUE_LIMIT', 32))
+
+    # Batch parsing (POST /parse/batch)
+    BATCH_PARALLELISM = int(os.getenv('BATCH_PARALLELISM', 4))
+    BATCH_MAX_DOCUMENTS = int(os.getenv('BATCH_MAX_DOCUMENTS', 50))
+    BATCH_MAX_ZIP_MEMBER_BYTES = int(os.getenv('BATCH_MAX_ZIP_MEMBER_BYTES', 20 * 1024 * 1024))
+
+    # Google Calendar inserts (batch requests of up to 50 calls)
+    CALENDAR_BATCH_SIZE = int(os.getenv('CALENDAR_BATCH_SIZE', 50))
+    CALENDAR_BATCH_RETRIES = int(os.getenv('CALENDAR_BATCH_RETRIES', 3))
+    CALENDAR_BACKOFF_BASE = float(os.getenv('CALENDAR_BACKOFF_BASE', 1.0))
+    # Authorised Calendar service objects cached per user (integrations/calendar_service.py)
+    CALENDAR_SERVICE_CACHE_SIZE = int(os.getenv('CALENDAR_SERVICE_CACHE_SIZE', 256))
+    CALENDAR_SERVICE_TTL = int(os.getenv('CALENDAR_SERVICE_TTL', 1800))
+    # Background calendar sync (utils/calendar_sync.py); quotas are Google API calls per second
+    CALENDAR_SYNC_WORKER = os.getenv('CALENDAR_SYNC_WORKER', 'true').lower() == 'true'
+    CALENDAR_SYNC_POLL_INTERVAL = float(os.getenv('CALENDAR_SYNC_POLL_INTERVAL', 2.0))
+    CALENDAR_SYNC_LEASE_SECONDS = int(os.getenv('CALENDAR_SYNC_LEASE_SECONDS', 600))
+    CALENDAR_SYNC_MAX_ATTEMPTS = int(os.getenv('CALENDAR_SYNC_MAX_ATTEMPTS', 6))
+    CALENDAR_SYNC_BACKOFF_BASE = float(os.getenv('CALENDAR_SYNC_BACKOFF_BASE', 30.0))
+    CALENDAR_SYNC_QUEUE_LIMIT = int(os.getenv('CALENDAR_SYNC_QUEUE_LIMIT', 1000))
+    CALENDAR_QUOTA_RATE = float(os.getenv('CALENDAR_QUOTA_RATE', 10.0))
+    CALENDAR_QUOTA_BURST = int(os.getenv('CALENDAR_QUOTA_BURST', 100))
+    CALENDAR_USER_QUOTA_RATE = float(os.getenv('CALENDAR_USER_QUOTA_RATE', 5.0))
+    CALENDAR_USER_QUOTA_BURST = int(os.getenv('CALENDAR_USER_QUOTA_BURST', 50))
+
+    # Notification emails - outbox delivered by SMTP workers (utils/mail_outbox.py)
+    MAIL_WORKERS = int(os.getenv('MAIL_WORKERS', 4))
+    MAIL_POLL_INTERVAL = float(os.getenv('MAIL_POLL_INTERVAL', 2.0))
+    MAIL_MAX_ATTEMPTS = int(os.getenv('MAIL_MAX_ATTEMPTS', 5))
+    MAIL_BACKOFF_BASE = float(os.getenv('MAIL_BACKOFF_BASE', 30.0))
+    MAIL_LEASE_SECONDS = int(os.getenv('MAIL_LEASE_SECONDS', 300))
+    # An SMTP connection is reused for this many messages, and closed after this long unused
+    MAIL_MESSAGES_PER_CONNECTION = int(os.getenv('MAIL_MESSAGES_PER_CONNECTION', 100))
+    MAIL_IDLE_SECONDS = float(os.getenv('MAIL_IDLE_SECONDS', 60))
+    MAIL_TIMEOUT = float(os.getenv('MAIL_TIMEOUT', 30))
+
+    # Digest mode: a recipient's tasks are collected for this many seconds and sent as one email
+    NOTIFICATION_DIGEST_ENABLED = os.getenv('NOTIFICATION_DIGEST_ENABLED', 'false').lower() == 'true'
+    NOTIFICATION_DIGEST_WINDOW = int(os.getenv('NOTIFICATION_DIGEST_WINDOW', 900))
+    # High-priority tasks are sent right away (together with anything already collected)
+    NOTIFICATION_DIGEST_HIGH_PRIORITY_BYPASS = os.getenv('NOTIFICATION_DIGEST_HIGH_PRIORITY_BYPASS', 'true').lower() == 'true'
+
+    # Emailed tasks older than this are archived (or deleted) in batches by the expiry sweep
+    PENDING_TASK_TTL_DAYS = int(os.getenv('PENDING_TASK_TTL_DAYS', 30))
+    PENDING_TASK_ARCHIVE = os.getenv('PENDING_TASK_ARCHIVE', 'true').lower() == 'true'
+    PENDING_TASK_SWEEP_BATCH = int(os.getenv('PENDING_TASK_SWEEP_BATCH', 1000))
+    PENDING_TASK_SWEEP_INTERVAL = int(os.getenv('PENDING_TASK_SWEEP_INTERVAL', 3600))
+
+    # Accept/decline links are HMAC-signed (task id, assignee, expiry) and checked before any
+    # database access. Set TASK_TOKEN_SECRET to the same value on every instance. Without it a
+    # key is generated once and kept at TASK_TOKEN_KEY_PATH, which must then be on a persistent
+    # volume shared by all replicas - otherwise emailed links break on redeploy or on another
+    # instance. Outside DEBUG the server refuses to start without the secret.
+    TASK_TOKEN_SECRET = os.getenv('TASK_TOKEN_SECRET')
+    TASK_TOKEN_REQUIRE_SECRET = os.getenv('TASK_TOKEN_REQUIRE_SECRET', str(not DEBUG)).lower() == 'true'
+    TASK_TOKEN_KEY_PATH = os.getenv('TASK_TOKEN_KEY_PATH', 'instance/task_token.key')
+    TASK_TOKEN_TTL_DAYS = int(os.getenv('TASK_TOKEN_TTL_DAYS', PENDING_TASK_TTL_DAYS))
+    # Unsigned links sent before signing was introduced are still looked up in the database
+    TASK_TOKEN_ACCEPT_LEGACY = os.getenv('TASK_TOKEN_ACCEPT_LEGACY', 'true').lower() == 'true'
+    # Bloom filter of used links: replays are answered without a query
+    CONSUMED_TOKEN_FILTER_CAPACITY = int(os.getenv('CONSUMED_TOKEN_FILTER_CAPACITY', 1000000))
+    CONSUMED_TOKEN_FILTER_ERROR_RATE = float(os.getenv('CONSUMED_TOKEN_FILTER_ERROR_RATE', 0.000001))
+
     # RabbitMQ
     CLOUDAMQP_URL = os.getenv('CLOUDAMQP_URL')
     
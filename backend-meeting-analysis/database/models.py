@@ -24,4 +24,211 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def __repr__(self):
-        return f'<User {self.email}>'
\ No newline at end of file
+        return f'<User {self.email}>'
+
+# People seen in past meetings - feeds the per-organisation participant directory (ai/participants.py)
+class Participant(db.Model):
+    __tablename__ = 'participants'
+    __table_args__ = (db.UniqueConstraint('organisation', 'email', 'name'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Directory scope of the uploader: company domain ("company.com"), or "user:<id>" on free mail
+    organisation = db.Column(db.String(120), nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(120), nullable=False)
+    last_seen = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Participant {self.name} <{self.email}>>'
+
+# Google Calendar events created per user, by fingerprint - repeated submissions patch or skip instead of
+# inserting duplicates (integrations/calendar_index.py)
+class CalendarEventIndex(db.Model):
+    __tablename__ = 'calendar_event_index'
+    # The unique constraint doubles as the (user_id, fingerprint) index for IN lookups
+    __table_args__ = (db.UniqueConstraint('user_id', 'fingerprint'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # sha256 of (type, description, date, assignee)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    google_event_id = db.Column(db.String(255), nullable=False)
+    # sha256 of the last body written - unchanged bodies are not sent again
+    body_hash = db.Column(db.String(64), nullable=False)
+    kind = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<CalendarEventIndex {self.user_id} {self.google_event_id}>'
+
+# Background /parse jobs - stored in the DB so every worker process can answer status queries
+class ParseJob(db.Model):
+    __tablename__ = 'parse_jobs'
+
+    id = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
+    # queued -> running -> done | failed | cancelled
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    stage = db.Column(db.String(30))
+    # Which extraction path answered: rules | llm
+    extraction_path = db.Column(db.String(10))
+    prompt_version = db.Column(db.String(40))
+    # [{"stage": "extracting", "started_at": "...", "seconds": 1.2}, ...]
+    progress = db.Column(db.JSON, default=list)
+    events = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': self.progress or [],
+            'extraction_path': self.extraction_path,
+            'prompt_version': self.prompt_version,
+            'events': self.events,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() + 'Z' if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() + 'Z' if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<ParseJob {self.id} {self.status}>'
+
+# Tasks sent to assignees by email, answered through the Accept/Decline links (api/task_routes.py)
+class PendingTask(db.Model):
+    __tablename__ = 'pending_tasks'
+    __table_args__ = (
+        # "Tasks of this assignee in this state", and the expiry sweep (utils/pending_tasks.py)
+        db.Index('ix_pending_tasks_assignee_status', 'assignee_email', 'status'),
+        db.Index('ix_pending_tasks_status_created', 'status', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    description = db.Column(db.Text)
+    assignee_email = db.Column(db.String(120), nullable=False)
+    deadline = db.Column(db.String(50))
+    priority = db.Column(db.String(20), default='medium')
+    # Secret part of the Accept/Decline links
+    token = db.Column(db.String(100), nullable=False, unique=True, index=True)
+    # pending -> syncing (accepted, calendar write queued) -> accepted | declined
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<PendingTask {self.id} {self.assignee_email} {self.status}>'
+
+# Pending tasks moved out of pending_tasks by the expiry sweep
+class PendingTaskArchive(db.Model):
+    __tablename__ = 'pending_tasks_archive'
+
+    id = db.Column(db.Integer, primary_key=True)
+    description = db.Column(db.Text)
+    assignee_email = db.Column(db.String(120), nullable=False, index=True)
+    deadline = db.Column(db.String(50))
+    priority = db.Column(db.String(20))
+    token = db.Column(db.String(100), nullable=False)
+    # Status when archived; 'pending' ones expired unanswered
+    status = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Queued Google Calendar writes (POST /calendar/add, task acceptance) - drained by utils/calendar_sync.py
+class CalendarSyncJob(db.Model):
+    __tablename__ = 'calendar_sync_jobs'
+    # The worker looks for queued jobs that are due, earliest deadline first
+    __table_args__ = (db.Index('ix_calendar_sync_jobs_next', 'status', 'not_before'),)
+
+    id = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    # queued -> running -> done | failed (running jobs go back to queued on a rate limit)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    events = db.Column(db.JSON, nullable=False)
+    event_count = db.Column(db.Integer, nullable=False, default=0)
+    send_invitations = db.Column(db.Boolean, nullable=False, default=True)
+    # pending_tasks token for a task accepted from an email link
+    task_token = db.Column(db.String(100))
+    # 0 = high, 1 = medium, 2 = low (highest priority among the events)
+    priority = db.Column(db.Integer, nullable=False, default=1)
+    # Earliest deadline among the events
+    due_at = db.Column(db.DateTime)
+    # Not picked up before this time (backoff after a rate limit)
+    not_before = db.Column(db.DateTime, default=datetime.utcnow)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'event_count': self.event_count,
+            'attempts': self.attempts,
+            'result': self.result,
+            'error': self.error,
+            'not_before': self.not_before.isoformat() + 'Z' if self.not_before and self.status == 'queued' else None,
+            'created_at': self.created_at.isoformat() + 'Z' if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() + 'Z' if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<CalendarSyncJob {self.id} {self.status}>'
+
+# Tasks waiting for the next digest email of their assignee (utils/notification_digest.py)
+class DigestItem(db.Model):
+    __tablename__ = 'notification_digest_items'
+    # All items of a recipient, and the age of their oldest one, come from this index
+    __table_args__ = (db.Index('ix_digest_items_recipient_created', 'recipient', 'created_at'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(120), nullable=False)
+    # The event as sent to /notifications/send, and its pending_tasks link token
+    task = db.Column(db.JSON, nullable=False)
+    token = db.Column(db.String(100), nullable=False)
+    # Who sent the tasks - the digest's outbox message belongs to them
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<DigestItem {self.id} {self.recipient}>'
+
+# Outgoing email - written by the request, delivered by the SMTP workers in utils/mail_outbox.py
+class OutboxMessage(db.Model):
+    __tablename__ = 'outbox_messages'
+    __table_args__ = (db.Index('ix_outbox_messages_next', 'status', 'not_before'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Sender - only they can read the delivery status; digests (several senders) have none
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
+    recipient = db.Column(db.String(120), nullable=False, index=True)
+    subject = db.Column(db.String(255), nullable=False)
+    html = db.Column(db.Text, nullable=False)
+    # queued -> sending -> sent | failed (sending goes back to queued after a temporary error)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    # Not picked up before this time (backoff after a temporary error)
+    not_before = db.Column(db.DateTime, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'recipient': self.recipient,
+            'subject': self.subject,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() + 'Z' if self.created_at else None,
+            'sent_at': self.sent_at.isoformat() + 'Z' if self.sent_at else None
+        }
+
+    def __repr__(self):
+        return f'<OutboxMessage {self.id} {self.recipient} {self.status}>'
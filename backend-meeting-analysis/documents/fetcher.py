@@ -0,0 +1,238 @@
+"""URL fetcher - pooled session, capped streamed downloads, conditional GET against a local cache
+
+Responses are streamed into a SpooledDocument (the same size cap and temp-file spooling
+as uploads) and turned into text by the caller's extractor. The text is cached per URL
+together with the ETag / Last-Modified validators, so fetching an unchanged document
+again costs a 304 and no re-extraction. A per-host semaphore keeps a batch of URLs on
+the same server from opening more than URL_FETCH_PER_HOST connections at once.
+"""
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+from documents.uploads import UploadTooLarge, format_size, spool_stream
+from utils.metrics import cache_requests_total
+
+USER_AGENT = "MeetingAnalysisService/2.0 (+document fetcher)"
+
+
+def content_type_of(header):
+    """'text/html; charset=ISO-8859-1' -> ('text/html', 'ISO-8859-1'); charset None if not given."""
+    media_type, *params = (header or "").split(";")
+    charset = None
+    for param in params:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset":
+            charset = value.strip().strip("\"'") or None
+    return media_type.strip().lower(), charset
+
+
+class FetchError(ValueError):
+    """The URL could not be fetched (bad URL, HTTP error, host busy)."""
+
+
+class HostLimiter:
+    """At most max_per_host concurrent requests per host."""
+
+    def __init__(self, max_per_host, wait_timeout):
+        self.max_per_host = max_per_host
+        self.wait_timeout = wait_timeout
+        self.semaphores = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def limit(self, host):
+        with self._lock:
+            semaphore = self.semaphores.get(host)
+            if semaphore is None:
+                semaphore = self.semaphores[host] = threading.BoundedSemaphore(self.max_per_host)
+        if not semaphore.acquire(timeout=self.wait_timeout):
+            raise FetchError(f"Too many concurrent downloads from {host}")
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+class ResponseCache:
+    """Extracted text per URL with its HTTP validators (SQLite, one connection per thread)."""
+
+    def __init__(self, path, ttl_seconds, max_entries):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS url_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_type TEXT,
+                text TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_url_cache_fetched ON url_cache (fetched_at)")
+        conn.commit()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, url):
+        row = self._connection().execute(
+            "SELECT etag, last_modified, content_type, text, fetched_at FROM url_cache WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None or row[4] + self.ttl_seconds < time.time():
+            return None
+        return {"etag": row[0], "last_modified": row[1], "content_type": row[2], "text": row[3]}
+
+    def put(self, url, etag, last_modified, content_type, text):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO url_cache (url, etag, last_modified, content_type, text, fetched_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (url, etag, last_modified, content_type, text, time.time())
+        )
+        conn.commit()
+        self._writes += 1
+        if self._writes % 50 == 0:
+            self.prune()
+
+    def touch(self, url):
+        """A 304 confirmed the entry - it counts as fetched now."""
+        conn = self._connection()
+        conn.execute("UPDATE url_cache SET fetched_at = ? WHERE url = ?", (time.time(), url))
+        conn.commit()
+
+    def prune(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM url_cache WHERE fetched_at < ?", (time.time() - self.ttl_seconds,))
+        conn.execute(
+            "DELETE FROM url_cache WHERE url NOT IN "
+            "(SELECT url FROM url_cache ORDER BY fetched_at DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+        conn.commit()
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM url_cache")
+        conn.commit()
+
+
+class UrlFetcher:
+    def __init__(self, cache, connect_timeout, read_timeout, max_bytes, max_per_host, pool_size):
+        self.cache = cache
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_bytes = max_bytes
+        self.hosts = HostLimiter(max_per_host, wait_timeout=read_timeout)
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        # One keep-alive pool per host, large enough for URL_FETCH_PER_HOST parallel downloads
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=max(pool_size, max_per_host),
+                              max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def cached(self, url):
+        if self.cache is None:
+            return None
+        try:
+            return self.cache.get(url)
+        except sqlite3.Error as e:
+            print(f"⚠️ URL cache read failed: {e}")
+            return None
+
+    def store(self, url, response, content_type, text):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        # Without validators the entry could never be confirmed by a 304
+        if self.cache is None or not (etag or last_modified):
+            return
+        try:
+            self.cache.put(url, etag, last_modified, content_type, text)
+        except sqlite3.Error as e:
+            print(f"⚠️ URL cache write failed: {e}")
+
+    def fetch_text(self, url, extract):
+        """Text of the document at url.
+
+        extract(document, content_type, charset) turns the downloaded SpooledDocument into
+        text and is only called when the server sent a new version.
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise FetchError(f"Unsupported URL: {url}")
+
+        cached = self.cached(url)
+        headers = {}
+        if cached:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        with self.hosts.limit(parts.hostname):
+            with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304 and cached:
+                    cache_requests_total.inc(cache='url', result='not_modified')
+                    try:
+                        self.cache.touch(url)
+                    except sqlite3.Error as e:
+                        print(f"⚠️ URL cache write failed: {e}")
+                    return cached["text"]
+                response.raise_for_status()
+                cache_requests_total.inc(cache='url', result='miss')
+
+                length = response.headers.get("Content-Length")
+                if length and length.isdigit() and self.max_bytes and int(length) > self.max_bytes:
+                    raise UploadTooLarge(f"{url} is larger than {format_size(self.max_bytes)}")
+                # requests would default text/* to ISO-8859-1; only a declared charset is passed on
+                content_type, charset = content_type_of(response.headers.get("Content-Type"))
+                # Content-Encoding (gzip, ...) is decoded while streaming; the cap applies to the decoded size
+                response.raw.decode_content = True
+                name = parts.path.rsplit("/", 1)[-1] or parts.hostname
+                document = spool_stream(response.raw, name, content_type, max_bytes=self.max_bytes)
+
+        with document:
+            text = extract(document, content_type, charset)
+        if text:
+            self.store(url, response, content_type, text)
+        return text
+
+
+def create_url_fetcher():
+    """Build the fetcher from Config; the response cache is skipped if the path is empty."""
+    cache = None
+    if Config.URL_CACHE_PATH:
+        try:
+            cache = ResponseCache(Config.URL_CACHE_PATH, Config.URL_CACHE_TTL, Config.URL_CACHE_MAX_ENTRIES)
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️ URL response cache disabled: {e}")
+    return UrlFetcher(
+        cache,
+        connect_timeout=Config.URL_FETCH_CONNECT_TIMEOUT,
+        read_timeout=Config.URL_FETCH_READ_TIMEOUT,
+        max_bytes=Config.URL_FETCH_MAX_BYTES,
+        max_per_host=Config.URL_FETCH_PER_HOST,
+        pool_size=Config.URL_FETCH_POOL_SIZE
+    )
+
+
+url_fetcher = create_url_fetcher()
@@ -1,27 +1,46 @@
 """Document processing - Extract text from PDF, DOCX, TXT files"""
-from PyPDF2 import PdfReader
+import time
 from docx import Document
 from io import BytesIO
-import requests
+import zipfile
 
+from config import Config
+from documents.fetcher import url_fetcher
+from documents.html_text import html_to_text
+from documents.pdf import extract_pdf_text
+from documents.text_cache import text_cache, text_cache_key
+from documents.uploads import UploadTooLarge, spool_stream, spool_upload
+from utils.metrics import document_extraction_seconds, errors_total
 
-def extract_text_from_pdf(file_content):
-    """Extract text from PDF file."""
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt')
+# Worth caching - decoding a TXT file is cheaper than a cache lookup
+CACHED_FILE_TYPES = ('pdf', 'docx')
+# Content-Type of a fetched URL -> extractor; unknown types go by the URL's extension
+URL_CONTENT_TYPES = {
+    'application/pdf': 'pdf',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'docx',
+    'text/html': 'html',
+    'application/xhtml+xml': 'html',
+    'text/plain': 'txt',
+    'text/markdown': 'txt',
+}
+
+
+def extract_text_from_pdf(source):
+    """Extract text from PDF file (bytes or path, up to the configured page / character budget)."""
     try:
-        pdf_reader = PdfReader(BytesIO(file_content))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        return extract_pdf_text(source, Config.PDF_MAX_PAGES, Config.PDF_MAX_CHARS, Config.UPLOAD_MAX_PAGES)
+    except UploadTooLarge:
+        raise
     except Exception as e:
         print(f"❌ Error extracting PDF: {e}")
         return None
 
 
-def extract_text_from_docx(file_content):
-    """Extract text from DOCX file."""
+def extract_text_from_docx(source):
+    """Extract text from DOCX file (bytes or path)."""
     try:
-        doc = Document(BytesIO(file_content))
+        doc = Document(source if isinstance(source, str) else BytesIO(source))
         text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
         return text
     except Exception as e:
@@ -29,39 +48,131 @@ def extract_text_from_docx(file_content):
         return None
 
 
-def extract_text_from_txt(file_content):
-    """Extract text from TXT file."""
+def extract_text_from_txt(source):
+    """Extract text from TXT file (bytes or path)."""
     try:
-        return file_content.decode('utf-8')
+        if isinstance(source, str):
+            with open(source, encoding='utf-8') as f:
+                return f.read()
+        return source.decode('utf-8')
     except Exception as e:
         print(f"❌ Error extracting TXT: {e}")
         return None
 
 
+def decode_text(source, charset=None):
+    """Bytes (or a spooled file) -> str in the declared charset, UTF-8 otherwise."""
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            source = f.read()
+    try:
+        return source.decode(charset or 'utf-8', errors='replace')
+    except LookupError:
+        return source.decode('utf-8', errors='replace')
+
+
+def extract_fetched_document(document, content_type, charset):
+    """Text of a downloaded URL document, by Content-Type (or extension for generic types)."""
+    file_type = URL_CONTENT_TYPES.get(content_type)
+    if file_type is None:
+        extension = document.filename.lower().rsplit('.', 1)[-1]
+        if extension in ('pdf', 'docx', 'txt'):
+            file_type = extension
+        elif extension in ('html', 'htm'):
+            file_type = 'html'
+        elif content_type.startswith('text/') or content_type.endswith(('json', 'xml')):
+            file_type = 'txt'
+        else:
+            raise ValueError(f"Unsupported content type: {content_type or 'unknown'}")
+
+    if file_type == 'pdf':
+        return extract_text_from_pdf(document.source)
+    if file_type == 'docx':
+        return extract_text_from_docx(document.source)
+    text = decode_text(document.source, charset)
+    return html_to_text(text) if file_type == 'html' else text
+
+
 def extract_text_from_url(url):
-    """Extract text from URL."""
+    """Extract text from URL (cached; an unchanged document costs a conditional GET)."""
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        return response.text
+        with document_extraction_seconds.time(file_type='url'):
+            return url_fetcher.fetch_text(url, extract_fetched_document)
+    except UploadTooLarge:
+        raise
     except Exception as e:
+        errors_total.inc(component='extraction')
         print(f"❌ Error fetching URL: {e}")
         return None
 
 
 def extract_text_from_file(file):
-    """Main function to extract text from uploaded file."""
+    """Main function to extract text from an uploaded file (FileStorage or SpooledDocument)."""
     if not file or file.filename == '':
         raise ValueError("No file selected")
     
     filename = file.filename.lower()
-    file_content = file.read()
-    
-    if filename.endswith('.pdf'):
-        return extract_text_from_pdf(file_content)
-    elif filename.endswith('.docx'):
-        return extract_text_from_docx(file_content)
-    elif filename.endswith('.txt'):
-        return extract_text_from_txt(file_content)
-    else:
-        raise ValueError("Unsupported file type. Use PDF, DOCX, or TXT")
\ No newline at end of file
+    extractors = {'pdf': extract_text_from_pdf, 'docx': extract_text_from_docx, 'txt': extract_text_from_txt}
+    file_type = filename.rsplit('.', 1)[-1]
+    if '.' not in filename or file_type not in extractors:
+        raise ValueError("Unsupported file type. Use PDF, DOCX, or TXT")
+
+    # An upload is spooled for this call only; a SpooledDocument belongs to the caller
+    document = spool_upload(file)
+    try:
+        key = None
+        if text_cache is not None and file_type in CACHED_FILE_TYPES and document.sha256:
+            key = text_cache_key(document.sha256, file_type)
+            text = text_cache.get(key)
+            if text is not None:
+                print(f"⚡ Extracted-text cache hit ({file.filename})")
+                return text
+
+        start = time.perf_counter()
+        with document_extraction_seconds.time(file_type=file_type):
+            text = extractors[file_type](document.source)
+        if key and text:
+            text_cache.put(key, text, document.size, time.perf_counter() - start)
+    finally:
+        if document is not file:
+            document.close()
+    if text is None:
+        errors_total.inc(component='extraction')
+    return text
+
+
+def extract_documents_from_zip(file, max_documents, max_member_bytes):
+    """Return the supported documents in an uploaded zip archive as SpooledDocuments (caller closes them)."""
+    try:
+        archive = zipfile.ZipFile(file.stream)
+    except zipfile.BadZipFile:
+        raise ValueError(f"{file.filename} is not a valid zip archive")
+
+    with archive:
+        members = []
+        for member in archive.infolist():
+            name = member.filename
+            basename = name.rsplit('/', 1)[-1]
+            if member.is_dir() or basename.startswith('.') or name.startswith('__MACOSX/'):
+                continue
+            if not basename.lower().endswith(SUPPORTED_EXTENSIONS):
+                print(f"⚠️ Skipping unsupported file in zip: {name}")
+                continue
+            # file_size comes from the archive header - checked before decompressing anything
+            if member.file_size > max_member_bytes:
+                raise UploadTooLarge(f"{name} in {file.filename} is too large")
+            if len(members) >= max_documents:
+                raise ValueError(f"{file.filename} contains more than {max_documents} documents")
+            members.append((member, basename))
+
+        documents = []
+        try:
+            for member, basename in members:
+                with archive.open(member) as stream:
+                    # The header size can lie - the limit is enforced again while decompressing
+                    documents.append(spool_stream(stream, basename, max_bytes=max_member_bytes))
+        except BaseException:
+            for document in documents:
+                document.close()
+            raise
+    return documents
@@ -0,0 +1,73 @@
+"""HTML -> plain text for the LLM prompt
+
+Keeps the readable text of a page with one line per block element and drops markup,
+scripts, styles and navigation chrome, which otherwise fill most of the prompt.
+"""
+import re
+from html.parser import HTMLParser
+
+# Content of these elements is never text
+SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg", "head", "iframe", "object", "canvas"}
+# Page chrome; skipped unless the page has nothing else
+CHROME_TAGS = {"nav", "header", "footer", "aside", "form", "button"}
+BLOCK_TAGS = {"p", "div", "section", "article", "main", "br", "hr", "li", "ul", "ol", "dl", "dt", "dd",
+              "table", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote", "title"}
+CELL_TAGS = {"td", "th"}
+VOID_TAGS = {"br", "hr", "img", "input", "meta", "link", "area", "base", "col", "embed", "source", "wbr"}
+SPACES = re.compile(r"[ \t\r\f\v\xa0]+")
+BLANK_LINES = re.compile(r"\n\s*\n\s*\n+")
+
+
+class HTMLTextExtractor(HTMLParser):
+    def __init__(self, skip_chrome=True):
+        super().__init__(convert_charrefs=True)
+        self.skipped = SKIPPED_TAGS | CHROME_TAGS if skip_chrome else SKIPPED_TAGS
+        self.skip_depth = 0
+        self.parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.skipped:
+            if tag not in VOID_TAGS:
+                self.skip_depth += 1
+            return
+        if self.skip_depth:
+            return
+        if tag in BLOCK_TAGS:
+            self.parts.append("\n")
+        elif tag in CELL_TAGS:
+            self.parts.append(" | ")
+        if tag == "li":
+            self.parts.append("- ")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS and not self.skip_depth:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.skipped:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in BLOCK_TAGS and not self.skip_depth:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.parts.append(data)
+
+    def text(self):
+        lines = (SPACES.sub(" ", line).strip(" |") for line in "".join(self.parts).split("\n"))
+        return BLANK_LINES.sub("\n\n", "\n".join(line.strip() for line in lines)).strip()
+
+
+def html_to_text(html):
+    """Readable text of an HTML document."""
+    parser = HTMLTextExtractor()
+    parser.feed(html)
+    parser.close()
+    text = parser.text()
+    if not text:
+        # Pages that keep everything in <header>/<form> (e.g. simple wikis)
+        parser = HTMLTextExtractor(skip_chrome=False)
+        parser.feed(html)
+        parser.close()
+        text = parser.text()
+    return text
@@ -0,0 +1,128 @@
+"""PDF text extraction - pages as a generator, large documents spread over a process pool
+
+Pages come out in document order whichever way they were extracted. Callers stop
+consuming once they have enough text; pending page ranges are cancelled then, so a
+page or character budget also bounds the work done.
+
+A source is the PDF as bytes or the path of a spooled upload; files are memory-mapped,
+and pool workers get the path rather than a pickled copy of the content.
+"""
+import mmap
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+from io import BytesIO
+
+from PyPDF2 import PdfReader
+
+from config import Config
+from documents.uploads import UploadTooLarge
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def page_text(page):
+    # extract_text() returns None for pages without a text layer
+    return page.extract_text() or ""
+
+
+def open_pdf(source):
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            # The map stays valid after the file is closed; the reader reads pages from it lazily
+            return PdfReader(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    return PdfReader(BytesIO(source))
+
+
+def extract_page_range(source, start, stop):
+    """Text of pages [start, stop). Runs in a pool process, which opens its own reader."""
+    reader = open_pdf(source)
+    return [page_text(reader.pages[i]) for i in range(start, stop)]
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the parent runs request and worker threads
+            _pool = ProcessPoolExecutor(max_workers=Config.PDF_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_pages_parallel(source, count):
+    """Pages [0, count) from the process pool, in order, with a bounded number of ranges in flight."""
+    pool = get_pool()
+    step = max(1, Config.PDF_PAGES_PER_TASK)
+    ranges = iter([(start, min(start + step, count)) for start in range(0, count, step)])
+    pending = deque()
+    try:
+        for _ in range(Config.PDF_WORKERS * 2):
+            page_range = next(ranges, None)
+            if page_range is None:
+                break
+            pending.append(pool.submit(extract_page_range, source, *page_range))
+        while pending:
+            pages = pending.popleft().result()
+            page_range = next(ranges, None)
+            if page_range is not None:
+                pending.append(pool.submit(extract_page_range, source, *page_range))
+            yield from pages
+    finally:
+        # Also runs when the consumer stops early (budget reached)
+        for future in pending:
+            future.cancel()
+
+
+def iter_pdf_pages(source, max_pages=None, page_limit=None):
+    """Yield the text of each page in order, at most max_pages pages.
+
+    Documents with more than page_limit pages are rejected (UploadTooLarge) before any extraction.
+    """
+    reader = open_pdf(source)
+    count = len(reader.pages)
+    if page_limit and count > page_limit:
+        raise UploadTooLarge(f"PDF has {count} pages, the limit is {page_limit}")
+    if max_pages:
+        count = min(count, max_pages)
+
+    done = 0
+    if Config.PDF_WORKERS > 1 and count >= Config.PDF_PARALLEL_MIN_PAGES:
+        try:
+            for text in iter_pages_parallel(source, count):
+                done += 1
+                yield text
+            return
+        except (BrokenProcessPool, OSError) as e:
+            print(f"⚠️ PDF process pool unavailable, continuing sequentially: {e}")
+            shutdown_pool()
+
+    for i in range(done, count):
+        yield page_text(reader.pages[i])
+
+
+def extract_pdf_text(source, max_pages=None, max_chars=None, page_limit=None):
+    """Page texts joined with newlines, cut off at the page / character budget."""
+    parts = []
+    total = 0
+    with closing(iter_pdf_pages(source, max_pages, page_limit)) as pages:
+        for text in pages:
+            if max_chars and total + len(text) >= max_chars:
+                parts.append(text[:max_chars - total])
+                print(f"✂️ PDF text cut at {max_chars} characters (page {len(parts)})")
+                break
+            parts.append(text)
+            total += len(text) + 1
+    return "\n".join(parts) + "\n" if parts else ""
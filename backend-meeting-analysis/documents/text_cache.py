@@ -0,0 +1,168 @@
+"""Extracted-text cache keyed by the document's content hash
+
+Uploading the same PDF or DOCX again (other analysis options, a retried job, the
+same protocol in a batch) skips PyPDF2 / python-docx entirely. Texts are stored
+zlib-compressed in SQLite, shared by all worker processes, and the least recently
+used entries are evicted once the compressed total passes TEXT_CACHE_MAX_BYTES.
+"""
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from config import Config
+from utils.metrics import cache_requests_total, errors_total
+
+# Bump when an extractor's output changes so old entries stop matching
+EXTRACTOR_VERSION = 1
+
+
+def text_cache_key(sha256, file_type):
+    """Cache key for a document; PDF keys include the page limit and budgets, which change the outcome."""
+    extra = f"{Config.UPLOAD_MAX_PAGES}:{Config.PDF_MAX_PAGES}:{Config.PDF_MAX_CHARS}" if file_type == 'pdf' else ""
+    return f"{file_type}:{EXTRACTOR_VERSION}:{extra}:{sha256}"
+
+
+class TextCache:
+    """Compressed text per key with LRU eviction by total stored bytes."""
+
+    def __init__(self, path, max_bytes, compression_level=6):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compression_level = compression_level
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "errors": 0,
+            "bytes_saved": 0,
+            "parse_seconds_saved": 0.0,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS text_cache (
+                key TEXT PRIMARY KEY,
+                text BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                document_bytes INTEGER NOT NULL,
+                parse_seconds REAL NOT NULL DEFAULT 0,
+                last_used REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_text_cache_last_used ON text_cache (last_used)")
+        conn.commit()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self.stats[name] += delta
+        if "hits" in deltas:
+            cache_requests_total.inc(cache="text", result="hit")
+        if "misses" in deltas:
+            cache_requests_total.inc(cache="text", result="miss")
+        if "errors" in deltas:
+            errors_total.inc(component="text_cache")
+
+    def get(self, key):
+        """Cached text for key, or None."""
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT text, document_bytes, parse_seconds FROM text_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE text_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Text cache read error: {e}")
+            self._count(errors=1)
+            return None
+        if row is None:
+            self._count(misses=1)
+            return None
+        self._count(hits=1, bytes_saved=row[1], parse_seconds_saved=row[2])
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def put(self, key, text, document_bytes, parse_seconds=0.0):
+        compressed = zlib.compress(text.encode("utf-8"), self.compression_level)
+        if len(compressed) > self.max_bytes:
+            return
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO text_cache (key, text, size, document_bytes, parse_seconds, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, compressed, len(compressed), document_bytes, parse_seconds, time.time())
+            )
+            conn.commit()
+            self.evict()
+        except sqlite3.Error as e:
+            print(f"⚠️ Text cache write error: {e}")
+            self._count(errors=1)
+            return
+        self._count(stores=1)
+
+    def evict(self):
+        """Drop least recently used entries until the total fits max_bytes."""
+        conn = self._connection()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM text_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM text_cache ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM text_cache WHERE key = ?", victims)
+        conn.commit()
+        self._count(evictions=len(victims))
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM text_cache")
+        conn.commit()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["parse_seconds_saved"] = round(stats["parse_seconds_saved"], 2)
+        try:
+            entries, stored = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM text_cache").fetchone()
+            stats["entries"] = entries
+            stats["stored_bytes"] = stored
+        except sqlite3.Error:
+            pass
+        stats["max_bytes"] = self.max_bytes
+        return stats
+
+
+def create_text_cache():
+    """Build the cache from Config; None if disabled or the database cannot be opened."""
+    if not Config.TEXT_CACHE_ENABLED or not Config.TEXT_CACHE_PATH:
+        return None
+    try:
+        return TextCache(Config.TEXT_CACHE_PATH, Config.TEXT_CACHE_MAX_BYTES, Config.TEXT_CACHE_COMPRESSION_LEVEL)
+    except (sqlite3.Error, OSError) as e:
+        print(f"⚠️ Text cache disabled: {e}")
+        return None
+
+
+text_cache = create_text_cache()
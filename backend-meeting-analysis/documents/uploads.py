@@ -0,0 +1,110 @@
+"""Uploaded documents kept in memory when small and spooled to a temp file when large
+
+The request body is copied in fixed-size chunks, so an upload is never held as one
+bytes object. Small documents stay in memory; anything above UPLOAD_SPOOL_BYTES goes
+to a temp file that the parsers read through mmap (PDF) or the file itself (DOCX, TXT).
+Spooled documents outlive the request, so background jobs can use them, and are
+deleted on close().
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from config import Config
+
+CHUNK_BYTES = 64 * 1024
+
+
+def format_size(size):
+    if size >= 1024 * 1024:
+        return f"{round(size / (1024 * 1024), 1):g} MB"
+    return f"{round(size / 1024, 1):g} KB"
+
+
+class UploadTooLarge(ValueError):
+    """Document over the size or page limit - answered with 413."""
+
+
+class SpooledDocument:
+    """An uploaded document: bytes in memory, or a path to a temp file."""
+
+    def __init__(self, filename, content_type=None, data=None, path=None, size=0, sha256=None):
+        self.filename = filename
+        self.content_type = content_type
+        self.data = data
+        self.path = path
+        self.size = size
+        # Content hash, computed while spooling (key of the extracted-text cache)
+        self.sha256 = sha256
+
+    @property
+    def source(self):
+        """What the extractors read: the temp file path, or the bytes."""
+        return self.path if self.path else self.data
+
+    def open(self):
+        """A fresh binary stream over the content."""
+        return open(self.path, 'rb') if self.path else BytesIO(self.data)
+
+    def close(self):
+        if self.path:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+        self.data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def spool_stream(stream, filename, content_type=None, max_bytes=None, threshold=None):
+    """Copy a stream into a SpooledDocument, raising UploadTooLarge once it passes max_bytes."""
+    max_bytes = Config.UPLOAD_MAX_BYTES if max_bytes is None else max_bytes
+    threshold = Config.UPLOAD_SPOOL_BYTES if threshold is None else threshold
+
+    buffer = BytesIO()
+    spooled = None
+    size = 0
+    digest = hashlib.sha256()
+    try:
+        while True:
+            chunk = stream.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            digest.update(chunk)
+            if max_bytes and size > max_bytes:
+                raise UploadTooLarge(f"{filename} is larger than {format_size(max_bytes)}")
+            if spooled is None and size > threshold:
+                suffix = os.path.splitext(filename or '')[1]
+                spooled = tempfile.NamedTemporaryFile(prefix='upload-', suffix=suffix,
+                                                      dir=Config.UPLOAD_TMP_DIR, delete=False)
+                buffer.seek(0)
+                shutil.copyfileobj(buffer, spooled)
+                buffer = None
+            (spooled or buffer).write(chunk)
+    except BaseException:
+        if spooled is not None:
+            spooled.close()
+            os.unlink(spooled.name)
+        raise
+
+    if spooled is None:
+        return SpooledDocument(filename, content_type, data=buffer.getvalue(), size=size,
+                               sha256=digest.hexdigest())
+    spooled.close()
+    return SpooledDocument(filename, content_type, path=spooled.name, size=size, sha256=digest.hexdigest())
+
+
+def spool_upload(file, max_bytes=None):
+    """SpooledDocument for an uploaded FileStorage (returned as is if it already is one)."""
+    if isinstance(file, SpooledDocument):
+        return file
+    return spool_stream(file.stream, file.filename, file.content_type, max_bytes)
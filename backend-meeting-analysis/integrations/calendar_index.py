@@ -0,0 +1,62 @@
+"""Fingerprint index of the Google Calendar events created for each user
+
+A fingerprint identifies an event by what it is about - (user, type, description,
+date, assignee) - so "Add to calendar" pressed twice, or the same task accepted
+from two emails, finds the event created the first time. The body hash of the last
+write decides between skipping the event (unchanged) and patching it.
+"""
+import hashlib
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from database.models import db, CalendarEventIndex
+from utils.fastjson import dumps_bytes
+
+# SQLite allows 999 bound parameters per statement
+LOOKUP_CHUNK = 500
+
+
+def normalize(value):
+    return " ".join(str(value or "").lower().split())
+
+
+def event_fingerprint(user_id, kind, description, date, assignee):
+    raw = "\x1f".join([str(user_id), kind, normalize(description), date or "", normalize(assignee)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def body_hash(body, send_updates):
+    return hashlib.sha256(dumps_bytes({"body": body, "send_updates": send_updates}, sort_keys=True)).hexdigest()
+
+
+def lookup_events(user_id, fingerprints):
+    """{fingerprint: CalendarEventIndex} for the fingerprints already written for this user."""
+    found = {}
+    fingerprints = list(dict.fromkeys(fingerprints))
+    for offset in range(0, len(fingerprints), LOOKUP_CHUNK):
+        chunk = fingerprints[offset:offset + LOOKUP_CHUNK]
+        rows = CalendarEventIndex.query.filter(
+            CalendarEventIndex.user_id == user_id,
+            CalendarEventIndex.fingerprint.in_(chunk)
+        ).all()
+        found.update((row.fingerprint, row) for row in rows)
+    return found
+
+
+def record_events(user_id, written, known):
+    """Store (fingerprint, google_event_id, body_hash, kind) tuples; rows in known are updated."""
+    if not written:
+        return
+    try:
+        for fingerprint, event_id, hashed, kind in written:
+            row = known.get(fingerprint)
+            if row is None:
+                row = known[fingerprint] = CalendarEventIndex(user_id=user_id, fingerprint=fingerprint, kind=kind)
+                db.session.add(row)
+            row.google_event_id = event_id
+            row.body_hash = hashed
+        db.session.commit()
+    except SQLAlchemyError as e:
+        # A concurrent request of the same user recorded the same fingerprint first
+        db.session.rollback()
+        print(f"⚠️ Could not update calendar event index: {e}")
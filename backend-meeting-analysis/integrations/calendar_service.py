@@ -0,0 +1,127 @@
+"""Google Calendar service objects - static discovery document, one authorised service per user
+
+build('calendar', 'v3') looks up and parses the discovery document and creates a new
+HTTP transport on every call. The document is read and parsed once from the copy bundled
+with google-api-python-client, and each user's service (with its keep-alive transport) is
+kept for CALENDAR_SERVICE_TTL seconds, least recently used evicted first. A changed
+access token builds a new service. Service objects are not thread-safe, so a service
+in use by another request of the same user is not shared - that call gets its own.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from google.oauth2.credentials import Credentials
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build, build_from_document
+
+from config import Config
+
+
+def load_discovery_document():
+    """Calendar v3 discovery document bundled with the client library, parsed, or None."""
+    try:
+        document = json.loads(discovery_cache.get_static_doc('calendar', 'v3'))
+        # build_from_document fills in method parameters of the dict it is given the first
+        # time each resource is used. Doing that once here means later builds (possibly
+        # concurrent) only rewrite existing keys and can share the dict.
+        service = build_from_document(document, credentials=Credentials(token=None))
+        for resource in document.get('resources', {}):
+            getattr(service, resource)()
+        return document
+    except Exception as e:
+        print(f"⚠️ No bundled Calendar discovery document: {e}")
+        return None
+
+
+DISCOVERY_DOCUMENT = load_discovery_document()
+
+
+def build_service(credentials):
+    if DISCOVERY_DOCUMENT is None:
+        return build('calendar', 'v3', credentials=credentials)
+    return build_from_document(DISCOVERY_DOCUMENT, credentials=credentials)
+
+
+def as_credentials(credentials):
+    """A bare access token (str) or refreshable Credentials -> Credentials."""
+    if isinstance(credentials, str) or credentials is None:
+        return Credentials(token=credentials)
+    return credentials
+
+
+class CalendarServiceCache:
+    """Per-user Calendar services with TTL and LRU eviction."""
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()   # user key -> {'token', 'service', 'created', 'lock'}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "rebuilds": 0, "evictions": 0, "busy": 0}
+
+    def _entry(self, user_key, credentials):
+        with self._lock:
+            entry = self.entries.get(user_key)
+            if entry is not None:
+                if entry['token'] == credentials.token and time.monotonic() - entry['created'] < self.ttl_seconds:
+                    self.entries.move_to_end(user_key)
+                    self.stats["hits"] += 1
+                    return entry
+                # New token or expired: replaced below (users of the old entry keep their reference)
+                self.stats["rebuilds"] += 1
+            else:
+                self.stats["misses"] += 1
+
+        service = build_service(credentials)
+        entry = {'token': credentials.token, 'service': service, 'created': time.monotonic(),
+                 'lock': threading.Lock()}
+        with self._lock:
+            self.entries[user_key] = entry
+            self.entries.move_to_end(user_key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return entry
+
+    @contextmanager
+    def service(self, user_key, credentials):
+        """Authorised Calendar service for a user, for the duration of the block.
+
+        credentials is an access token or the user's Credentials (which the service
+        then refreshes itself on a 401).
+        """
+        credentials = as_credentials(credentials)
+        if not user_key or self.max_entries <= 0:
+            yield build_service(credentials)
+            return
+        entry = self._entry(user_key, credentials)
+        if not entry['lock'].acquire(blocking=False):
+            with self._lock:
+                self.stats["busy"] += 1
+            yield build_service(credentials)
+            return
+        try:
+            yield entry['service']
+        finally:
+            entry['lock'].release()
+
+    def invalidate(self, user_key):
+        with self._lock:
+            self.entries.pop(user_key, None)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self.entries)
+        stats["static_discovery"] = DISCOVERY_DOCUMENT is not None
+        return stats
+
+
+calendar_services = CalendarServiceCache(Config.CALENDAR_SERVICE_CACHE_SIZE, Config.CALENDAR_SERVICE_TTL)
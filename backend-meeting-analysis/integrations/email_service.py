@@ -1,6 +1,8 @@
 """Email notification service"""
 from flask_mail import Mail, Message
 import os
+import smtplib
+import time
 
 mail = Mail()
 
@@ -17,4 +19,179 @@ def init_mail(app):
     if app.config['MAIL_USERNAME']:
         print(f"✅ Email service initialized with {app.config['MAIL_USERNAME']}")
     else:
-        print(" Email service not configured (no EMAIL_USERNAME)")
\ No newline at end of file
+        print(" Email service not configured (no EMAIL_USERNAME)")
+
+
+def render_task_email(task_data):
+    """Subject and HTML of the email with Accept/Decline buttons for [{'task', 'token'}, ...]"""
+    tasks = [item['task'] for item in task_data]
+    
+    # Get assignee name
+    assignee_name = tasks[0].get('assignee', 'Team Member')
+    
+    # Build email HTML
+    high_priority = len([t for t in tasks if t.get('priority') == 'high'])
+    
+    cards = []
+    for item in task_data:
+        task = item['task']
+        token = item['token']
+        priority = task.get('priority', 'medium')
+        description = task.get('description', task.get('message', 'No description'))
+        deadline = task.get('deadline', 'No deadline')
+        
+        priority_color = '#dc3545' if priority == 'high' else '#ffc107' if priority == 'medium' else '#28a745'
+        
+        cards.append(f"""
+            <div style="background: white; padding: 15px; margin: 10px 0; 
+                        border-left: 4px solid {priority_color}; border-radius: 5px;">
+                <p style="margin: 0 0 5px 0;">
+                    <span style="display: inline-block; padding: 3px 8px; border-radius: 3px; 
+                                 font-size: 12px; font-weight: bold; color: white; background: {priority_color}">
+                        {priority.upper()}
+                    </span>
+                </p>
+                <p style="margin: 5px 0; font-weight: bold;">{description}</p>
+                <p style="margin: 5px 0; color: #666;">
+                    📅 Deadline: <strong>{deadline}</strong>
+                </p>
+                <div style="margin-top: 15px;">
+                    <a href="http://localhost:8080/tasks/accept/{token}"
+                       style="display: inline-block; padding: 10px 20px; background: #28a745; 
+                              color: white; text-decoration: none; border-radius: 5px; margin-right: 10px;">
+                        ✅ Accept & Add to Calendar
+                    </a>
+                    <a href="http://localhost:8080/tasks/decline/{token}"
+                       style="display: inline-block; padding: 10px 20px; background: #dc3545; 
+                              color: white; text-decoration: none; border-radius: 5px;">
+                        ❌ Decline
+                    </a>
+                </div>
+            </div>
+        """)
+    tasks_html = "".join(cards)
+    
+    html_body = f"""
+    <html>
+    <head>
+        <style>
+            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+            .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+                      color: white; padding: 20px; border-radius: 10px 10px 0 0; }}
+            .content {{ padding: 20px; background: #f9f9f9; }}
+            .footer {{ padding: 20px; text-align: center; color: #666; font-size: 12px; }}
+        </style>
+    </head>
+    <body>
+        <div class="header">
+            <h2>📋 New Tasks Assigned</h2>
+            <p>Hi {assignee_name},</p>
+        </div>
+        
+        <div class="content">
+            <p>You have been assigned <strong>{len(tasks)}</strong> task(s) from a recent meeting:</p>
+            
+            {f'<p style="color: #dc3545;">⚠️ <strong>{high_priority}</strong> high priority task(s) require immediate attention!</p>' if high_priority > 0 else ''}
+            
+            {tasks_html}
+        </div>
+        
+        <div class="footer">
+            <p>This is an automated notification from Meeting Analysis Service</p>
+            <p>Click "Accept" to add the task to your Google Calendar, or "Decline" to reject it.</p>
+        </div>
+    </body>
+    </html>
+    """
+    
+    return f"🎯 You have {len(tasks)} new task(s) assigned", html_body
+
+
+class SMTPConnection:
+    """One authenticated SMTP session reused for many messages (not thread-safe - one per worker).
+
+    mail.send opens, TLS-handshakes and logs in for every message; this keeps the session
+    until max_messages were sent over it or it was unused for idle_seconds.
+    """
+
+    def __init__(self, host, port, use_tls=False, use_ssl=False, username=None, password=None,
+                 timeout=30, max_messages=100, idle_seconds=60, suppress=False):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.use_ssl = use_ssl
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self.idle_seconds = idle_seconds
+        # MAIL_SUPPRESS_SEND / TESTING, as with mail.send
+        self.suppress = suppress
+        self.smtp = None
+        self.sent = 0
+        self.last_used = 0.0
+        self.opened = 0
+
+    @classmethod
+    def from_app(cls, app, **limits):
+        """Connection with the Flask-Mail settings of app."""
+        state = app.extensions['mail']
+        return cls(state.server, state.port, use_tls=state.use_tls, use_ssl=state.use_ssl,
+                   username=state.username, password=state.password, suppress=state.suppress, **limits)
+
+    def open(self):
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.use_tls:
+                smtp.starttls()
+                smtp.ehlo()
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self.smtp = smtp
+        self.sent = 0
+        self.opened += 1
+        self.last_used = time.monotonic()
+
+    def send(self, sender, recipients, data):
+        """Send one message, opening (or reopening) the session as needed."""
+        if self.suppress:
+            return
+        if self.smtp is not None and (self.sent >= self.max_messages or self.is_idle()):
+            self.close()
+        reused = self.smtp is not None
+        if not reused:
+            self.open()
+        try:
+            self.smtp.sendmail(sender, recipients, data)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped a kept-alive session - once more on a new one
+            self.close()
+            if not reused:
+                raise
+            self.open()
+            self.smtp.sendmail(sender, recipients, data)
+        self.sent += 1
+        self.last_used = time.monotonic()
+
+    def is_idle(self):
+        return time.monotonic() - self.last_used > self.idle_seconds
+
+    def close_if_idle(self):
+        if self.smtp is not None and self.is_idle():
+            self.close()
+
+    def close(self):
+        if self.smtp is None:
+            return
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self.smtp.close()
+        self.smtp = None
@@ -1,24 +1,177 @@
-"""Google OAuth authentication"""
+"""Google OAuth authentication and per-user credentials
+
+The OAuth client config is parsed once. Calendar calls get refreshable Credentials
+built from the stored refresh token; they are refreshed GOOGLE_TOKEN_REFRESH_MARGIN
+seconds before they expire (once per user at a time - concurrent requests wait for
+that refresh instead of starting their own), and the new access token is written
+back to the user. Token, userinfo and OAuth code exchanges share one pooled session.
+"""
+import json
+import os
+import threading
+from datetime import timedelta
+
+import google.auth.transport.requests
+import requests
+from google.auth import _helpers
+from google.auth.exceptions import RefreshError
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
-import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
 
-CLIENT_SECRET_FILE = 'client_secret.json'
 SCOPES = [
     'https://www.googleapis.com/auth/calendar',
     'https://www.googleapis.com/auth/userinfo.email',
     'https://www.googleapis.com/auth/userinfo.profile',
     'openid'
 ]
+USERINFO_URL = 'https://www.googleapis.com/oauth2/v2/userinfo'
+TOKEN_URI = 'https://oauth2.googleapis.com/token'
+
+
+class CalendarAuthError(Exception):
+    """The user's Google access cannot be used (no tokens, or the refresh token was revoked)."""
+
+
+class CredentialManager:
+    def __init__(self, client_secret_file, refresh_margin, pool_size, timeout):
+        self.client_secret_file = client_secret_file
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        self.timeout = timeout
+        self._client_config = None
+        self.credentials = {}     # user id -> Credentials
+        self.locks = {}           # user id -> refresh lock
+        self._lock = threading.Lock()
+        self.stats = {"refreshes": 0, "refresh_failures": 0}
+
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.auth_request = google.auth.transport.requests.Request(session=self.session)
+
+    def client_config(self):
+        """OAuth client config - client_secret.json, or GOOGLE_CLIENT_ID/SECRET if the file is missing."""
+        with self._lock:
+            if self._client_config is None:
+                if os.path.exists(self.client_secret_file):
+                    with open(self.client_secret_file) as f:
+                        self._client_config = json.load(f)
+                elif Config.GOOGLE_CLIENT_ID and Config.GOOGLE_CLIENT_SECRET:
+                    self._client_config = {"web": {
+                        "client_id": Config.GOOGLE_CLIENT_ID,
+                        "client_secret": Config.GOOGLE_CLIENT_SECRET,
+                        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+                        "token_uri": TOKEN_URI,
+                    }}
+                else:
+                    raise FileNotFoundError(f"{self.client_secret_file} not found and no GOOGLE_CLIENT_ID set")
+            return self._client_config
+
+    def client_info(self):
+        config = self.client_config()
+        return config.get("web") or config.get("installed") or {}
+
+    def flow(self):
+        flow = Flow.from_client_config(self.client_config(), scopes=SCOPES, redirect_uri=Config.REDIRECT_URI)
+        # Code exchanges go through the shared connection pool
+        flow.oauth2session.mount("https://", self.adapter)
+        return flow
+
+    def user_lock(self, user_id):
+        with self._lock:
+            lock = self.locks.get(user_id)
+            if lock is None:
+                lock = self.locks[user_id] = threading.Lock()
+            return lock
+
+    def remember(self, user_id, credentials):
+        """Keep the credentials of a fresh login (their expiry is known)."""
+        with self._lock:
+            self.credentials[user_id] = credentials
+
+    def forget(self, user_id):
+        with self._lock:
+            self.credentials.pop(user_id, None)
+
+    def build(self, user, info):
+        return Credentials(
+            token=user.google_access_token,
+            refresh_token=user.google_refresh_token,
+            token_uri=info.get("token_uri", TOKEN_URI),
+            client_id=info.get("client_id"),
+            client_secret=info.get("client_secret"),
+            scopes=SCOPES
+        )
+
+    def needs_refresh(self, credentials):
+        if not credentials.refresh_token:
+            return False
+        if not credentials.token or credentials.expiry is None:
+            # Expiry is not stored - unknown after a restart, so refresh once to learn it
+            return True
+        return credentials.expiry - self.refresh_margin <= _helpers.utcnow()
+
+    def credentials_for(self, user):
+        """Valid Credentials for a user, refreshed (and saved) when they are about to expire."""
+        if not user.google_access_token and not user.google_refresh_token:
+            raise CalendarAuthError("Calendar not connected")
+        # Without a refresh token the stored access token is used as it is
+        info = self.client_info() if user.google_refresh_token else {}
+        with self._lock:
+            credentials = self.credentials.get(user.id)
+            if credentials is None or credentials.refresh_token != user.google_refresh_token or \
+                    (not credentials.refresh_token and credentials.token != user.google_access_token):
+                credentials = self.credentials[user.id] = self.build(user, info)
+        if not self.needs_refresh(credentials):
+            return credentials
+
+        with self.user_lock(user.id):
+            # Another request may have refreshed while this one waited
+            with self._lock:
+                credentials = self.credentials.get(user.id, credentials)
+            if not self.needs_refresh(credentials):
+                return credentials
+            try:
+                credentials.refresh(self.auth_request)
+            except RefreshError as e:
+                with self._lock:
+                    self.stats["refresh_failures"] += 1
+                self.forget(user.id)
+                raise CalendarAuthError(f"Google access expired, please sign in again ({e})")
+            with self._lock:
+                self.stats["refreshes"] += 1
+            self.save_token(user, credentials)
+        return credentials
+
+    def save_token(self, user, credentials):
+        from database.models import db
+        try:
+            user.google_access_token = credentials.token
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ Could not store refreshed token for {user.email}: {e}")
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["users"] = len(self.credentials)
+        return stats
+
+
+credential_manager = CredentialManager(
+    Config.GOOGLE_CLIENT_SECRET_FILE,
+    refresh_margin=Config.GOOGLE_TOKEN_REFRESH_MARGIN,
+    pool_size=Config.GOOGLE_HTTP_POOL_SIZE,
+    timeout=Config.GOOGLE_HTTP_TIMEOUT
+)
 
 
 def get_auth_url_with_user_info():
     """Generate Google OAuth URL with user info scope"""
-    flow = Flow.from_client_secrets_file(
-        CLIENT_SECRET_FILE,
-        scopes=SCOPES,
-        redirect_uri='http://localhost:8080/auth/google/callback'
-    )
+    flow = credential_manager.flow()
     auth_url, state = flow.authorization_url(
         access_type='offline',
         prompt='consent'
@@ -28,20 +181,17 @@ def get_auth_url_with_user_info():
 
 def exchange_code_for_credentials(code):
     """Exchange auth code for credentials and user info"""
-    flow = Flow.from_client_secrets_file(
-        CLIENT_SECRET_FILE,
-        scopes=SCOPES,
-        redirect_uri='http://localhost:8080/auth/google/callback'
-    )
+    flow = credential_manager.flow()
     flow.fetch_token(code=code)
     credentials = flow.credentials
-    
+
     # Get user info from Google
-    user_info_response = requests.get(
-        'https://www.googleapis.com/oauth2/v2/userinfo',
-        headers={'Authorization': f'Bearer {credentials.token}'}
+    user_info_response = credential_manager.session.get(
+        USERINFO_URL,
+        headers={'Authorization': f'Bearer {credentials.token}'},
+        timeout=credential_manager.timeout
     )
     user_info = user_info_response.json()
     print(f"✅ Got user info: {user_info.get('email')}")
-    
-    return credentials, user_info
\ No newline at end of file
+
+    return credentials, user_info
@@ -1,6 +1,19 @@
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+import random
 import re
+import time
+
+from config import Config
+from integrations.calendar_index import body_hash, event_fingerprint, lookup_events, record_events
+from integrations.calendar_service import calendar_services
+from utils.metrics import calendar_insert_seconds, errors_total
+
+# Google allows at most 50 calls in one batch request
+MAX_BATCH_SIZE = 50
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# A patched event that the user deleted in Google - it is inserted again
+GONE_STATUSES = {404, 410}
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
 
 
 def convert_date(date_str):
@@ -19,25 +32,241 @@ def convert_date(date_str):
         return None
 
 
-def add_events_to_calendar_for_user(access_token, events_data, organizer_email=None, send_invitations=True):
+def build_task_event(item, organizer_email, send_invitations):
+    """Calendar body for an action item, or None if it has no usable deadline.
+
+    Returns (insert, personal, invited) where insert is {'kind', 'label', 'body', 'send_updates'}.
+    """
+    date = convert_date(item['deadline'])
+    
+    if not date:
+        print(f"⚠️ Skipping task - invalid date: {item.get('deadline')}")
+        return None
+    
+    assignee = item.get('assignee', 'Unassigned')
+    assignee_email = item.get('assignee_email')
+    description = item.get('description', 'No description')
+    priority = item.get('priority', 'medium')
+    
+    # Build basic event
+    event = {
+        'summary': f"{description}",
+        'description': f"""Task Assignment
+
+Assignee: {assignee}
+Priority: {priority.upper()}
+Deadline: {date}
+
+This task was extracted from a meeting protocol.""",
+        
+        'start': {'date': date},
+        'end': {'date': date},
+        
+        'reminders': {
+            'useDefault': False,
+            'overrides': [
+                {'method': 'email', 'minutes': 1440},   # 24h before
+                {'method': 'popup', 'minutes': 1440}
+            ]
+        }
+    }
+    
+    # ============ SMART ATTENDEE LOGIC ============
+    should_invite = False
+    personal = False
+    
+    if assignee_email and send_invitations:
+        # Check if assignee is the same as organizer
+        if organizer_email and assignee_email.lower() == organizer_email.lower():
+            # DON'T add as attendee - it's the user's own task
+            print(f"📝 Personal task: {description} (assigned to you)")
+            event['description'] += f"\n\n✓ Your personal task"
+            personal = True
+        else:
+            # DIFFERENT person - add as attendee
+            event['attendees'] = [
+                {
+                    'email': assignee_email,
+                    'displayName': assignee,
+                    'responseStatus': 'needsAction',
+                    'comment': f'Task assigned with {priority} priority'
+                }
+            ]
+            should_invite = True
+            print(f"📧 Task with invitation: {description} → {assignee_email}")
+            event['description'] += f"\n\n✉️ Invitation sent to {assignee}"
+    
+    # Color code by priority
+    if priority == 'high':
+        event['colorId'] = '11'  # Red
+    elif priority == 'medium':
+        event['colorId'] = '5'   # Yellow
+    else:
+        event['colorId'] = '2'   # Green
+    
+    insert = {'kind': 'task', 'label': event['summary'], 'body': event,
+              'send_updates': 'all' if should_invite else 'none',
+              'identity': (description, date, assignee_email or assignee)}
+    return insert, personal, should_invite
+
+
+def build_milestone_event(item, organizer_email, send_invitations):
+    """Calendar body for a milestone, or None if it has no usable date (same return as build_task_event)."""
+    date = convert_date(item['date'])
+    
+    if not date:
+        print(f"⚠️ Skipping milestone - invalid date: {item.get('date')}")
+        return None
+    
+    event_name = item.get('event', 'Milestone')
+    owner = item.get('owner')
+    owner_email = item.get('owner_email')
+    
+    event = {
+        'summary': f"📍 {event_name}",
+        'description': f"Milestone event\n\nOwner: {owner or 'Team'}",
+        'start': {'date': date},
+        'end': {'date': date},
+        'colorId': '9',  # Blue
+        'reminders': {
+            'useDefault': False,
+            'overrides': [
+                {'method': 'email', 'minutes': 2880},  # 2 days before
+                {'method': 'popup', 'minutes': 1440}
+            ]
+        }
+    }
+    
+    # Add owner as attendee if different person
+    should_invite_milestone = False
+    if owner_email and send_invitations:
+        if organizer_email and owner_email.lower() != organizer_email.lower():
+            event['attendees'] = [
+                {
+                    'email': owner_email,
+                    'displayName': owner,
+                    'responseStatus': 'needsAction'
+                }
+            ]
+            should_invite_milestone = True
+    
+    insert = {'kind': 'milestone', 'label': event_name, 'body': event,
+              'send_updates': 'all' if should_invite_milestone else 'none',
+              'identity': (event_name, date, owner_email or owner)}
+    return insert, False, should_invite_milestone
+
+
+def is_retryable(error):
+    """Rate limits, server errors and transport errors are retried; 4xx answers are final."""
+    if not isinstance(error, HttpError):
+        return True
+    status = error.resp.status
+    if status in RETRY_STATUSES:
+        return True
+    return status == 403 and any(reason in str(error.content) for reason in RATE_LIMIT_REASONS)
+
+
+def rate_limit_scope(error):
+    """'user' or 'global' if Google refused the call for quota reasons, else None."""
+    if not isinstance(error, HttpError) or error.resp.status not in (403, 429):
+        return None
+    content = str(error.content)
+    if 'userRateLimitExceeded' in content:
+        return 'user'
+    if error.resp.status == 429 or 'rateLimitExceeded' in content:
+        return 'global'
+    return None
+
+
+def is_gone(error):
+    return isinstance(error, HttpError) and error.resp.status in GONE_STATUSES
+
+
+def calendar_request(service, insert):
+    """events().patch for an event already in the calendar ('event_id'), else events().insert."""
+    if insert.get('event_id'):
+        return service.events().patch(calendarId='primary', eventId=insert['event_id'], body=insert['body'],
+                                      sendUpdates=insert['send_updates'])
+    return service.events().insert(calendarId='primary', body=insert['body'], sendUpdates=insert['send_updates'])
+
+
+def execute_batch(service, inserts, indexes):
+    """Send inserts[i] for i in indexes as one batch request. Returns {index: (result, error)}."""
+    outcomes = {}
+
+    def on_response(request_id, response, exception):
+        outcomes[int(request_id)] = (response, exception)
+
+    batch = service.new_batch_http_request(callback=on_response)
+    for i in indexes:
+        batch.add(calendar_request(service, inserts[i]), request_id=str(i))
+    start = time.perf_counter()
+    try:
+        batch.execute()
+        error = RuntimeError("No response for this call in the batch")
+    except Exception as e:
+        # The batch itself failed (network, auth)
+        error = e
+    # Calls without an answer count as failed
+    for i in indexes:
+        outcomes.setdefault(i, (None, error))
+    failed = sum(1 for i in indexes if outcomes[i][1] is not None)
+    outcome = 'ok' if not failed else ('error' if failed == len(indexes) else 'partial')
+    calendar_insert_seconds.observe(time.perf_counter() - start, kind='batch', outcome=outcome)
+    return outcomes
+
+
+def insert_calendar_events(service, inserts, batch_size=None, max_retries=None):
+    """Insert (or patch) events with batch requests. Returns one (result, error) per insert, in input order.
+
+    Only sub-requests that failed with a retryable error are sent again, with exponential backoff.
+    """
+    batch_size = min(batch_size or Config.CALENDAR_BATCH_SIZE, MAX_BATCH_SIZE)
+    max_retries = Config.CALENDAR_BATCH_RETRIES if max_retries is None else max_retries
+    outcomes = [(None, None)] * len(inserts)
+    pending = list(range(len(inserts)))
+
+    for attempt in range(max_retries + 1):
+        if attempt:
+            delay = min(Config.CALENDAR_BACKOFF_BASE * (2 ** (attempt - 1)), 30)
+            print(f"🔁 Retrying {len(pending)} calendar inserts in {delay:.1f}s")
+            time.sleep(delay + random.uniform(0, delay / 4))
+        for offset in range(0, len(pending), batch_size):
+            indexes = pending[offset:offset + batch_size]
+            for i, outcome in execute_batch(service, inserts, indexes).items():
+                outcomes[i] = outcome
+        retry = []
+        for i in pending:
+            error = outcomes[i][1]
+            if error is not None and inserts[i].get('event_id') and is_gone(error):
+                inserts[i].pop('event_id')
+                retry.append(i)
+            elif error is not None and is_retryable(error):
+                retry.append(i)
+        pending = retry
+        if not pending:
+            break
+    return outcomes
+
+
+def add_events_to_calendar_for_user(access_token, events_data, organizer_email=None, send_invitations=True,
+                                    user_id=None):
     """
     Add events to Google Calendar with smart attendee handling
     
     Args:
-        access_token: User's OAuth token
+        access_token: User's OAuth token, or their refreshable Credentials
         events_data: List of events to add
         organizer_email: Email of logged-in user creating events
         send_invitations: Whether to send email invitations to attendees
+        user_id: Calendar owner; with it, events already added before are patched or skipped
     
     Returns:
         dict with created_events, personal_tasks, invitations_sent
+        (and updated_events, unchanged_events, failed_events, and rate_limited - the
+        quota scopes, 'user' / 'global', that refused any of the failed calls)
     """
-    credentials = Credentials(token=access_token)
-    service = build('calendar', 'v3', credentials=credentials)
-    
-    created_events = []
     personal_tasks = 0
-    invitations_sent = 0
     
     print("=" * 60)
     print(f"📅 Calendar Integration - Adding Events")
@@ -45,149 +274,81 @@ def add_events_to_calendar_for_user(access_token, events_data, organizer_email=N
     print(f"📧 Send invitations: {send_invitations}")
     print("=" * 60)
     
+    inserts = []
     for item in events_data:
         event_type = item.get('type')
         
-        # ==================== ACTION ITEMS (TASKS) ====================
         if event_type == 'action_item' and item.get('deadline'):
-            date = convert_date(item['deadline'])
-            
-            if not date:
-                print(f"⚠️ Skipping task - invalid date: {item.get('deadline')}")
-                continue
-            
-            assignee = item.get('assignee', 'Unassigned')
-            assignee_email = item.get('assignee_email')
-            description = item.get('description', 'No description')
-            priority = item.get('priority', 'medium')
-            
-            # Build basic event
-            event = {
-                'summary': f"{description}",
-                'description': f"""Task Assignment
-
-Assignee: {assignee}
-Priority: {priority.upper()}
-Deadline: {date}
-
-This task was extracted from a meeting protocol.""",
-                
-                'start': {'date': date},
-                'end': {'date': date},
-                
-                'reminders': {
-                    'useDefault': False,
-                    'overrides': [
-                        {'method': 'email', 'minutes': 1440},   # 24h before
-                        {'method': 'popup', 'minutes': 1440}
-                    ]
-                }
-            }
-            
-            # ============ SMART ATTENDEE LOGIC ============
-            should_invite = False
-            
-            if assignee_email and send_invitations:
-                # Check if assignee is the same as organizer
-                if organizer_email and assignee_email.lower() == organizer_email.lower():
-                    # DON'T add as attendee - it's the user's own task
-                    print(f"📝 Personal task: {description} (assigned to you)")
-                    event['description'] += f"\n\n✓ Your personal task"
-                    personal_tasks += 1
-                else:
-                    # DIFFERENT person - add as attendee
-                    event['attendees'] = [
-                        {
-                            'email': assignee_email,
-                            'displayName': assignee,
-                            'responseStatus': 'needsAction',
-                            'comment': f'Task assigned with {priority} priority'
-                        }
-                    ]
-                    should_invite = True
-                    invitations_sent += 1
-                    print(f"📧 Task with invitation: {description} → {assignee_email}")
-                    event['description'] += f"\n\n✉️ Invitation sent to {assignee}"
-            
-            # Color code by priority
-            if priority == 'high':
-                event['colorId'] = '11'  # Red
-            elif priority == 'medium':
-                event['colorId'] = '5'   # Yellow
-            else:
-                event['colorId'] = '2'   # Green
-            
-            try:
-                # Insert event
-                result = service.events().insert(
-                    calendarId='primary',
-                    body=event,
-                    sendUpdates='all' if should_invite else 'none'
-                ).execute()
-                
-                created_events.append(result)
-                print(f"  ✅ Created: {event['summary']}")
-                
-            except Exception as e:
-                print(f"  ❌ Failed: {e}")
-        
-        # ==================== MILESTONES ====================
+            built = build_task_event(item, organizer_email, send_invitations)
         elif event_type == 'milestone' and item.get('date'):
-            date = convert_date(item['date'])
-            
-            if not date:
-                print(f"⚠️ Skipping milestone - invalid date: {item.get('date')}")
+            built = build_milestone_event(item, organizer_email, send_invitations)
+        else:
+            continue
+        if built is None:
+            continue
+        insert, personal, invited = built
+        personal_tasks += personal
+        insert['invited'] = invited
+        inserts.append(insert)
+    
+    # Events written before: unchanged ones are skipped, changed ones patched
+    unchanged_events = []
+    known = {}
+    if user_id is not None and inserts:
+        for insert in inserts:
+            insert['fingerprint'] = event_fingerprint(user_id, insert['kind'], *insert['identity'])
+            insert['body_hash'] = body_hash(insert['body'], insert['send_updates'])
+        known = lookup_events(user_id, [insert['fingerprint'] for insert in inserts])
+        pending = []
+        seen = set()
+        for insert in inserts:
+            row = known.get(insert['fingerprint'])
+            if insert['fingerprint'] in seen or (row is not None and row.body_hash == insert['body_hash']):
+                # Already in the calendar as it is (or twice in this list)
+                unchanged_events.append({'id': row.google_event_id if row else None,
+                                         'summary': insert['body']['summary']})
+                print(f"  ⏭️ Unchanged {insert['kind']}: {insert['label']}")
                 continue
-            
-            event_name = item.get('event', 'Milestone')
-            owner = item.get('owner')
-            owner_email = item.get('owner_email')
-            
-            event = {
-                'summary': f"📍 {event_name}",
-                'description': f"Milestone event\n\nOwner: {owner or 'Team'}",
-                'start': {'date': date},
-                'end': {'date': date},
-                'colorId': '9',  # Blue
-                'reminders': {
-                    'useDefault': False,
-                    'overrides': [
-                        {'method': 'email', 'minutes': 2880},  # 2 days before
-                        {'method': 'popup', 'minutes': 1440}
-                    ]
-                }
-            }
-            
-            # Add owner as attendee if different person
-            should_invite_milestone = False
-            if owner_email and send_invitations:
-                if organizer_email and owner_email.lower() != organizer_email.lower():
-                    event['attendees'] = [
-                        {
-                            'email': owner_email,
-                            'displayName': owner,
-                            'responseStatus': 'needsAction'
-                        }
-                    ]
-                    should_invite_milestone = True
-                    invitations_sent += 1
-            
-            try:
-                result = service.events().insert(
-                    calendarId='primary',
-                    body=event,
-                    sendUpdates='all' if should_invite_milestone else 'none'
-                ).execute()
-                
-                created_events.append(result)
-                print(f"   Created milestone: {event_name}")
-                
-            except Exception as e:
-                print(f"   Failed: {e}")
+            seen.add(insert['fingerprint'])
+            if row is not None:
+                insert['event_id'] = row.google_event_id
+            pending.append(insert)
+        inserts = pending
+    
+    created_events = []
+    updated_events = []
+    failed_events = []
+    rate_limited = set()
+    written = []
+    # As before: counted for every event sent with an invitation, whatever its outcome
+    invitations_sent = sum(insert['invited'] for insert in inserts)
+    if inserts:
+        print(f"📦 Writing {len(inserts)} events in batches of up to {min(Config.CALENDAR_BATCH_SIZE, MAX_BATCH_SIZE)}")
+        # Cached per user (keyed by the organizer's email) together with its HTTP transport
+        with calendar_services.service(organizer_email, access_token) as service:
+            outcomes = insert_calendar_events(service, inserts)
+        if any(isinstance(error, HttpError) and error.resp.status == 401 for _, error in outcomes):
+            calendar_services.invalidate(organizer_email)
+        for insert, (result, error) in zip(inserts, outcomes):
+            if error is None:
+                (updated_events if insert.get('event_id') else created_events).append(result)
+                if 'fingerprint' in insert and result and result.get('id'):
+                    written.append((insert['fingerprint'], result['id'], insert['body_hash'], insert['kind']))
+                print(f"  ✅ {'Updated' if insert.get('event_id') else 'Created'} {insert['kind']}: {insert['label']}")
+            else:
+                errors_total.inc(component='calendar')
+                failed_events.append({'summary': insert['body']['summary'], 'error': str(error)})
+                if rate_limit_scope(error):
+                    rate_limited.add(rate_limit_scope(error))
+                print(f"  ❌ Failed {insert['kind']}: {insert['label']} - {error}")
+    record_events(user_id, written, known)
     
     print("=" * 60)
     print(f" Summary:")
     print(f"   Total created: {len(created_events)}")
+    print(f"   Updated: {len(updated_events)}")
+    print(f"   Unchanged: {len(unchanged_events)}")
+    print(f"   Failed: {len(failed_events)}")
     print(f"   Personal tasks: {personal_tasks}")
     print(f"   Invitations sent: {invitations_sent}")
     print("=" * 60)
@@ -195,5 +356,9 @@ This task was extracted from a meeting protocol.""",
     return {
         'created_events': created_events,
         'personal_tasks': personal_tasks,
-        'invitations_sent': invitations_sent
-    }
\ No newline at end of file
+        'invitations_sent': invitations_sent,
+        'updated_events': updated_events,
+        'unchanged_events': unchanged_events,
+        'failed_events': failed_events,
+        'rate_limited': sorted(rate_limited)
+    }
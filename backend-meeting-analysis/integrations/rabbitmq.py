@@ -1,12 +1,16 @@
 import pika
-import json
 import os
+import time
+
+from utils.fastjson import dumps_bytes
+from utils.metrics import rabbitmq_publish_seconds, errors_total
 
 def send_to_queue(events):
     cloudamqp_url = os.getenv("CLOUDAMQP_URL")
     if not cloudamqp_url:
         print("No CLOUDAMQP_URL configured")
         return
+    start = time.perf_counter()
     try:
         params = pika.URLParameters(cloudamqp_url)
         connection = pika.BlockingConnection(params)
@@ -20,10 +24,13 @@ def send_to_queue(events):
             channel.basic_publish(
                 exchange='notification',
                 routing_key='analysis.meeting-notes',
-                body=json.dumps(event),
+                body=dumps_bytes(event),
                 properties=pika.BasicProperties(delivery_mode=2)
             )
         connection.close()
+        rabbitmq_publish_seconds.observe(time.perf_counter() - start, outcome="ok")
         print(f"Sent {len(events)} events to queue")
     except Exception as e:
+        rabbitmq_publish_seconds.observe(time.perf_counter() - start, outcome="error")
+        errors_total.inc(component="rabbitmq")
         print(f"Error sending to queue: {e}")
\ No newline at end of file
@@ -0,0 +1,122 @@
+import sys
+import os
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from datetime import datetime
+
+import pytest
+from flask import Flask
+
+from database.models import db, CalendarSyncJob, PendingTask, User
+from utils import calendar_sync
+from utils.calendar_sync import CalendarSyncWorker, QuotaLimiter, TokenBucket, enqueue_calendar_sync
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(calendar_sync.Config, "CALENDAR_SYNC_WORKER", False)
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, google_id="g1", email="lena@acme.com", google_access_token="t"))
+        db.session.add(User(id=2, google_id="g2", email="omar@acme.com", google_access_token="t"))
+        db.session.commit()
+        yield app
+
+
+def task(description, deadline, priority="medium"):
+    return {"type": "action_item", "description": description, "deadline": deadline, "priority": priority}
+
+
+def calendar_result(created=0, failed=0, rate_limited=()):
+    return {"created_events": [{"id": f"g{i}"} for i in range(created)], "updated_events": [],
+            "unchanged_events": [], "failed_events": [{"summary": "x", "error": "429"}] * failed,
+            "personal_tasks": 0, "invitations_sent": 0, "rate_limited": list(rate_limited)}
+
+
+def worker(limiter=None):
+    return CalendarSyncWorker(limiter or QuotaLimiter(100, 100, 100, 100), poll_interval=0.1,
+                              lease_seconds=60, max_attempts=3, backoff_base=30)
+
+
+def test_token_bucket_waits_for_refill_and_pause():
+    bucket = TokenBucket(rate=10, capacity=5)
+    now = bucket.updated
+    assert bucket.wait_time(5, now) == 0
+    bucket.take(5)
+    assert bucket.wait_time(2, now) == pytest.approx(0.2)
+    bucket.pause(30, now)
+    assert bucket.wait_time(1, now) == pytest.approx(30)
+    # Empty when the pause ends
+    assert bucket.wait_time(1, now + 30) == pytest.approx(0.1)
+
+
+def test_user_bucket_does_not_hold_up_other_users():
+    limiter = QuotaLimiter(rate=100, burst=100, user_rate=1, user_burst=10)
+    assert limiter.acquire(1, 10) == 0
+    assert limiter.acquire(1, 5) > 0
+    assert limiter.acquire(2, 10) == 0
+    limiter.backoff(1, ['global'], 60)
+    assert limiter.acquire(2, 1) >= 59
+
+
+def test_job_claimed_elsewhere_costs_no_quota(app, monkeypatch):
+    sync = worker(QuotaLimiter(rate=0.001, burst=5, user_rate=0.001, user_burst=5))
+    enqueue_calendar_sync(1, [task(f"t{i}", "01.07.2025") for i in range(5)])
+    # Another process wins the conditional UPDATE
+    monkeypatch.setattr(sync, "claim", lambda job: False)
+    sync.run_next()
+    assert sync.limiter.acquire(1, 5) == 0
+
+
+def test_jobs_run_earliest_deadline_then_priority(app):
+    enqueue_calendar_sync(1, [task("later", "20.07.2025", "high")])
+    enqueue_calendar_sync(1, [task("soon low", "01.07.2025", "low")])
+    enqueue_calendar_sync(1, [task("soon high", "01.07.2025", "high")])
+    enqueue_calendar_sync(1, [{"type": "action_item", "description": "no date"}])
+
+    order = [job.events[0]["description"] for job in worker().candidates()]
+    assert order == ["soon high", "soon low", "later", "no date"]
+
+
+def test_rate_limited_job_is_requeued_with_backoff_then_done(app, monkeypatch):
+    db.session.add(PendingTask(assignee_email="lena@acme.com", token="tok", status="syncing"))
+    db.session.commit()
+    results = [calendar_result(created=1, failed=1, rate_limited=['user']), calendar_result(created=1)]
+    monkeypatch.setattr(calendar_sync.credential_manager, "credentials_for", lambda user: "token")
+    monkeypatch.setattr(calendar_sync, "add_events_to_calendar_for_user", lambda **kwargs: results.pop(0))
+    sync = worker()
+    job_id = enqueue_calendar_sync(1, [task("a", "01.07.2025"), task("b", "01.07.2025")], task_token="tok").id
+
+    assert sync.run_next() == 0
+    job = db.session.get(CalendarSyncJob, job_id)
+    db.session.refresh(job)
+    assert job.status == "queued" and job.attempts == 1
+    assert job.not_before > datetime.utcnow()
+    # The user's quota is paused, and the job is not due yet
+    assert sync.limiter.acquire(1, 1) > 0
+    assert sync.run_next() > 0
+
+    CalendarSyncJob.query.filter_by(id=job_id).update({"not_before": datetime.utcnow()})
+    db.session.commit()
+    sync.limiter = QuotaLimiter(100, 100, 100, 100)
+    assert sync.run_next() == 0
+    db.session.refresh(job)
+    assert job.status == "done" and job.attempts == 2
+    assert job.result["created_count"] == 2 and job.result["failed_count"] == 0
+    assert PendingTask.query.filter_by(token="tok").one().status == "accepted"
+
+
+def test_failed_job_gives_the_task_back(app, monkeypatch):
+    db.session.add(PendingTask(assignee_email="lena@acme.com", token="tok", status="syncing"))
+    db.session.commit()
+    monkeypatch.setattr(calendar_sync.credential_manager, "credentials_for", lambda user: "token")
+    monkeypatch.setattr(calendar_sync, "add_events_to_calendar_for_user",
+                        lambda **kwargs: calendar_result(failed=1))
+    job_id = enqueue_calendar_sync(1, [task("a", "01.07.2025")], task_token="tok").id
+
+    worker().run_next()
+    assert db.session.get(CalendarSyncJob, job_id).status == "failed"
+    assert PendingTask.query.filter_by(token="tok").one().status == "pending"
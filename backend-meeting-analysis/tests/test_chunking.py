@@ -0,0 +1,30 @@
+import sys
+import os
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from ai.chunking import split_into_chunks, merge_insights_data
+
+
+def test_chunks_respect_size_and_section_boundaries():
+    sections = [f"{i}. Section {i}\n" + ("Lena will review the budget. " * 20) for i in range(1, 9)]
+    text = "\n".join(sections)
+    chunks = split_into_chunks(text, max_tokens=300)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 300 * 4 for chunk in chunks)
+    assert all(chunk.lstrip()[0].isdigit() for chunk in chunks)
+    assert "".join(chunks).count("Lena will review") == 160
+
+
+def test_merge_deduplicates_across_chunks_and_fills_missing_fields():
+    merged = merge_insights_data([
+        {"decisions": ["Beta postponed to August 5."],
+         "action_items": [{"description": "Prepare benchmarks", "assignee": "Thomas", "deadline": None}]},
+        {"decisions": ["beta postponed to august 5", "Remove experimental toggle"],
+         "action_items": [{"description": "Prepare benchmarks!", "assignee": "thomas", "deadline": "17.06.2026"},
+                          {"description": "Update docs", "assignee": "Imen"}]},
+    ])
+
+    assert merged["decisions"] == ["Beta postponed to August 5.", "Remove experimental toggle"]
+    assert len(merged["action_items"]) == 2
+    assert merged["action_items"][0]["deadline"] == "17.06.2026"
@@ -0,0 +1,38 @@
+import sys
+import os
+import json
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from ai.events import ActionItemEvent, QuestionEvent, RiskEvent
+from utils.fastjson import dumps
+
+
+def test_events_keep_the_old_json_layout():
+    task = ActionItemEvent.decode({"description": "Fix crawler", "assignee": "Lena", "priority": "High"}, 0, "T")
+    assert task.to_dict() == {
+        "type": "action_item",
+        "message": "Action Item 1: Fix crawler (Assigned to: Lena)",
+        "description": "Fix crawler",
+        "timestamp": "T",
+        "priority": "high",
+        "assignee": "Lena",
+    }
+    assert QuestionEvent.decode("Who owns the demo?", 1, "T").to_dict() == {
+        "type": "question", "message": "Question 2: Who owns the demo?",
+        "timestamp": "T", "priority": "medium", "status": "open",
+    }
+
+
+def test_decoding_validates_llm_values():
+    risk = RiskEvent.decode({"description": None, "severity": "HIGH", "raised_by": 42}, 0, "T")
+    assert risk.description == "No description"
+    assert risk.priority == "high"
+    assert risk.raised_by == "42"
+    assert not hasattr(risk, "__dict__")
+
+
+def test_encoder_serialises_event_structs():
+    events = [ActionItemEvent.decode("Prepare benchmarks", 0, "T")]
+    decoded = json.loads(dumps({"events": events, "name": "Müller"}))
+    assert decoded["events"][0]["message"] == "Action Item 1: Prepare benchmarks"
+    assert "Müller" in dumps("Müller")
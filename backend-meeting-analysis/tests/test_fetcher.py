@@ -0,0 +1,81 @@
+import sys
+import os
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from documents.fetcher import ResponseCache, UrlFetcher
+from documents.handlers import extract_fetched_document
+from documents.html_text import html_to_text
+from documents.uploads import UploadTooLarge
+
+PAGE = """<html><head><title>Protokoll</title><style>p { color: red }</style></head>
+<body><nav><a href="/">Home</a> | <a href="/docs">Docs</a></nav>
+<h1>Weekly&nbsp;Sync</h1><p>Decision: we ship on <b>Friday</b>.</p>
+<ul><li>Lena &amp; Jonas prepare the release</li></ul>
+<script>track();</script><footer>© ACME</footer></body></html>"""
+
+
+def test_html_to_text_keeps_content_only():
+    assert html_to_text(PAGE) == ("Weekly Sync\n\nDecision: we ship on Friday.\n\n"
+                                  "- Lena & Jonas prepare the release")
+
+
+@pytest.fixture
+def server():
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append((self.path, self.headers.get("If-None-Match")))
+            if self.path == "/big.txt":
+                body = b"x" * 50000
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = PAGE.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", '"v1"')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}", requests_seen
+    httpd.shutdown()
+
+
+def test_conditional_get_reuses_cached_text(server, tmp_path):
+    base, requests_seen = server
+    cache = ResponseCache(str(tmp_path / "url_cache.sqlite"), ttl_seconds=3600, max_entries=10)
+    fetcher = UrlFetcher(cache, connect_timeout=2, read_timeout=5, max_bytes=10000, max_per_host=2, pool_size=2)
+    extracted = []
+
+    def extract(document, content_type, charset):
+        extracted.append(content_type)
+        return extract_fetched_document(document, content_type, charset)
+
+    first = fetcher.fetch_text(base + "/protokoll.html", extract)
+    second = fetcher.fetch_text(base + "/protokoll.html", extract)
+
+    assert first == second == html_to_text(PAGE)
+    assert requests_seen == [("/protokoll.html", None), ("/protokoll.html", '"v1"')]
+    assert extracted == ["text/html"]
+
+    with pytest.raises(UploadTooLarge):
+        fetcher.fetch_text(base + "/big.txt", extract)
@@ -0,0 +1,114 @@
+import sys
+import os
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from google.auth.exceptions import RefreshError
+from google.oauth2.credentials import Credentials
+
+from database.models import db, User
+from integrations.google_auth import CalendarAuthError, CredentialManager
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+
+
+@pytest.fixture
+def manager(tmp_path):
+    secret = tmp_path / "client_secret.json"
+    secret.write_text(json.dumps({"web": {"client_id": "cid", "client_secret": "csecret",
+                                          "token_uri": "https://oauth2.googleapis.com/token"}}))
+    return CredentialManager(str(secret), refresh_margin=300, pool_size=2, timeout=5)
+
+
+def add_user(access_token="old-token", refresh_token="refresh"):
+    user = User(google_id="g1", email="lena@acme.com", name="Lena",
+                google_access_token=access_token, google_refresh_token=refresh_token)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def fake_refresh(calls, delay=0.0, expires_in=3600):
+    def refresh(self, request):
+        calls.append(self.refresh_token)
+        time.sleep(delay)
+        self.token = f"new-token-{len(calls)}"
+        self.expiry = datetime.utcnow() + timedelta(seconds=expires_in)
+    return refresh
+
+
+def test_client_config_is_read_once(manager, tmp_path):
+    assert manager.client_info()["client_id"] == "cid"
+    os.remove(manager.client_secret_file)
+    assert manager.client_info()["client_secret"] == "csecret"
+
+
+def test_refreshes_once_and_writes_the_token_back(app, manager, monkeypatch):
+    calls = []
+    monkeypatch.setattr(Credentials, "refresh", fake_refresh(calls))
+    user = add_user()
+
+    credentials = manager.credentials_for(user)
+    assert credentials.token == "new-token-1"
+    assert credentials.client_id == "cid"
+    assert db.session.get(User, user.id).google_access_token == "new-token-1"
+
+    # Expiry is now known and far away - no further refresh
+    assert manager.credentials_for(user) is credentials
+    assert calls == ["refresh"]
+
+
+def test_concurrent_requests_share_one_refresh(app, manager, monkeypatch):
+    calls = []
+    monkeypatch.setattr(Credentials, "refresh", fake_refresh(calls, delay=0.05))
+    monkeypatch.setattr(manager, "save_token", lambda user, credentials: None)
+    user = add_user()
+    user.google_access_token, user.google_refresh_token  # load before the threads use it
+
+    tokens = []
+    threads = [threading.Thread(target=lambda: tokens.append(manager.credentials_for(user).token))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert tokens == ["new-token-1"] * 8
+
+
+def test_token_close_to_expiry_is_refreshed_early(app, manager, monkeypatch):
+    calls = []
+    monkeypatch.setattr(Credentials, "refresh", fake_refresh(calls, expires_in=120))
+    user = add_user()
+
+    manager.credentials_for(user)
+    # 120 s left is inside the 300 s margin
+    manager.credentials_for(user)
+    assert len(calls) == 2
+
+
+def test_revoked_refresh_token_raises_auth_error(app, manager, monkeypatch):
+    def refresh(self, request):
+        raise RefreshError("invalid_grant")
+    monkeypatch.setattr(Credentials, "refresh", refresh)
+    user = add_user()
+
+    with pytest.raises(CalendarAuthError):
+        manager.credentials_for(user)
+    assert manager.get_stats()["refresh_failures"] == 1
+    assert manager.get_stats()["users"] == 0
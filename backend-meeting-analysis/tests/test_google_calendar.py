@@ -0,0 +1,144 @@
+import sys
+import os
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from types import SimpleNamespace
+
+from flask import Flask
+from google.oauth2.credentials import Credentials
+from googleapiclient.errors import HttpError
+
+from integrations import calendar_service, google_calendar
+from integrations.calendar_service import CalendarServiceCache
+
+
+def http_error(status, reason=""):
+    return HttpError(SimpleNamespace(status=status, reason=reason), reason.encode())
+
+
+class FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.calls = []
+
+    def add(self, request, request_id):
+        self.calls.append((request_id, request))
+
+    def execute(self):
+        self.service.batches.append([body["summary"] for _, body in self.calls])
+        for request_id, body in self.calls:
+            self.service.requests.append(body)
+            error = self.service.failures.get(body["summary"], [None]).pop(0) \
+                if self.service.failures.get(body["summary"]) else None
+            self.callback(request_id, None if error else {"id": body.get("_patch", "g-" + body["summary"])}, error)
+
+
+class FakeService:
+    def __init__(self, failures=None):
+        self.failures = failures or {}
+        self.batches = []
+        self.requests = []
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+    def events(self):
+        return SimpleNamespace(insert=lambda calendarId, body, sendUpdates: body,
+                               patch=lambda calendarId, eventId, body, sendUpdates: dict(body, _patch=eventId))
+
+
+def task(i):
+    return {"type": "action_item", "description": f"Task {i}", "deadline": "01.07.2025",
+            "assignee": "Lena", "assignee_email": "lena@acme.com"}
+
+
+def test_batches_and_retries_only_failed_inserts(monkeypatch):
+    service = FakeService({"Task 3": [http_error(503)], "Task 7": [http_error(400, "invalid")]})
+    monkeypatch.setattr(calendar_service, "build_service", lambda credentials: service)
+    monkeypatch.setattr(google_calendar, "calendar_services", CalendarServiceCache(10, 60))
+    monkeypatch.setattr(google_calendar.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(google_calendar.Config, "CALENDAR_BATCH_SIZE", 4)
+
+    events = [task(i) for i in range(10)] + [{"type": "decision", "message": "ignored"}]
+    result = google_calendar.add_events_to_calendar_for_user("token", events, "me@acme.com")
+
+    assert [len(batch) for batch in service.batches] == [4, 4, 2, 1]
+    assert service.batches[-1] == ["Task 3"]
+    assert [e["id"] for e in result["created_events"]] == [f"g-Task {i}" for i in range(10) if i != 7]
+    assert result["failed_events"] == [{"summary": "Task 7", "error": str(http_error(400, "invalid"))}]
+    assert result["invitations_sent"] == 10
+    assert result["personal_tasks"] == 0
+
+
+def test_service_cache_per_user_with_token_change_and_lru(monkeypatch):
+    built = []
+    monkeypatch.setattr(calendar_service, "build_service",
+                        lambda credentials: built.append(credentials.token) or object())
+    cache = CalendarServiceCache(max_entries=2, ttl_seconds=60)
+
+    with cache.service("a@acme.com", "t1") as first:
+        # Same user in a concurrent request gets its own service, not the one in use
+        with cache.service("a@acme.com", "t1") as concurrent:
+            assert concurrent is not first
+    with cache.service("a@acme.com", "t1") as again:
+        assert again is first
+    with cache.service("a@acme.com", "t2") as refreshed:
+        assert refreshed is not first
+    with cache.service("b@acme.com", "t1"), cache.service("c@acme.com", "t1"):
+        pass
+    with cache.service("a@acme.com", "t2"):
+        pass
+
+    assert built == ["t1", "t1", "t2", "t1", "t1", "t2"]
+    stats = cache.get_stats()
+    assert stats["entries"] == 2 and stats["evictions"] == 2 and stats["busy"] == 1
+
+
+def test_repeated_submissions_skip_or_patch(monkeypatch):
+    from database.models import db, User
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    service = FakeService()
+    monkeypatch.setattr(calendar_service, "build_service", lambda credentials: service)
+    monkeypatch.setattr(google_calendar, "calendar_services", CalendarServiceCache(10, 60))
+    monkeypatch.setattr(google_calendar.time, "sleep", lambda seconds: None)
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, google_id="g1", email="me@acme.com"))
+        db.session.commit()
+
+        def add(events):
+            service.requests.clear()
+            return google_calendar.add_events_to_calendar_for_user("token", events, "me@acme.com", user_id=1)
+
+        first = add([task(1), task(2)])
+        assert len(first["created_events"]) == 2
+
+        again = add([task(1), task(2), task(2)])
+        assert service.requests == []
+        assert [e["id"] for e in again["unchanged_events"]] == ["g-Task 1", "g-Task 2", "g-Task 2"]
+
+        changed = dict(task(2), priority="high")
+        patched = add([task(1), changed])
+        assert [r.get("_patch") for r in service.requests] == ["g-Task 2"]
+        assert len(patched["updated_events"]) == 1 and len(patched["unchanged_events"]) == 1
+
+        # Deleted in Google since: the patch fails with 404 and the event is inserted again
+        service.failures["Task 1"] = [http_error(404)]
+        recreated = add([dict(task(1), priority="low")])
+        assert [r.get("_patch") for r in service.requests] == ["g-Task 1", None]
+        assert len(recreated["created_events"]) == 1
+        assert add([dict(task(1), priority="low")])["unchanged_events"][0]["id"] == "g-Task 1"
+
+
+def test_discovery_document_is_parsed_once(monkeypatch):
+    assert isinstance(calendar_service.DISCOVERY_DOCUMENT, dict)
+    loads = []
+    monkeypatch.setattr(calendar_service.json, "loads", lambda *args, **kwargs: loads.append(args))
+    service = calendar_service.build_service(Credentials(token="t"))
+    service.events().list(calendarId="primary")
+    assert loads == []
@@ -0,0 +1,59 @@
+import sys
+import os
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from ai.cache import InsightsCache, MemoryTier, SQLiteTier, make_cache_key
+
+
+def test_cache_key_ignores_whitespace_but_not_model_or_prompt():
+    key = make_cache_key("Decision:  ship it\r\n\r\n\r\nAction: Lena", "m1", "v1")
+    assert key == make_cache_key("Decision: ship it\n\nAction: Lena  ", "m1", "v1")
+    assert key != make_cache_key("Decision: ship it\n\nAction: Lena", "m2", "v1")
+    assert key != make_cache_key("Decision: ship it\n\nAction: Lena", "m1", "v2")
+
+
+def test_memory_tier_evicts_lru_and_expired_entries():
+    tier = MemoryTier(max_entries=2, max_bytes=1000, ttl_seconds=60)
+    tier.put("a", {"data": 1}, 10)
+    tier.put("b", {"data": 2}, 10)
+    tier.get("a")
+    tier.put("c", {"data": 3}, 10)
+    assert tier.get("b") is None
+    assert tier.get("a") == {"data": 1}
+
+    tier = MemoryTier(max_entries=10, max_bytes=1000, ttl_seconds=-1)
+    tier.put("a", {"data": 1}, 10)
+    assert tier.get("a") is None
+
+
+def test_disk_tier_survives_new_cache_instance_and_counts_savings(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    data = {"decisions": ["Ship beta on 05.08.2026"]}
+
+    first = InsightsCache(MemoryTier(10, 10000, 60), SQLiteTier(path, 60, 100))
+    assert first.get("k") is None
+    first.put("k", data, llm_seconds=12.5, tokens=3000)
+
+    second = InsightsCache(MemoryTier(10, 10000, 60), SQLiteTier(path, 60, 100))
+    assert second.get("k") == data
+    assert second.get("k") == data
+
+    stats = second.get_stats()
+    assert stats["disk_hits"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["tokens_saved"] == 6000
+    assert stats["llm_seconds_saved"] == 25.0
+
+
+def test_promoted_entry_keeps_its_disk_expiry(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite")
+    clock = [1000.0]
+    monkeypatch.setattr("ai.cache.time.time", lambda: clock[0])
+    InsightsCache(MemoryTier(10, 10000, 600), SQLiteTier(path, 60, 100)).put("k", {"decisions": ["a"]})
+
+    clock[0] += 50
+    cache = InsightsCache(MemoryTier(10, 10000, 600), SQLiteTier(path, 60, 100))
+    assert cache.get("k") == {"decisions": ["a"]}
+    clock[0] += 20
+    # 70s after it was written: past the disk TTL, even though the memory TTL is 600s
+    assert cache.get("k") is None
@@ -0,0 +1,68 @@
+import sys
+import os
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from ai.json_repair import repair_json
+from ai.stream_parser import IncrementalJSONParser
+
+
+def test_clean_json_takes_the_fast_path():
+    assert repair_json('{"decisions": ["Ship beta"]}') == ({"decisions": ["Ship beta"]}, [])
+    assert repair_json("Sorry, I cannot help with that.") == (None, [])
+
+
+def test_common_syntax_faults_are_repaired_and_reported():
+    text = """Here is the extracted data:
+```json
+{
+  'decisions': ['Ship beta', 'Drop toggle',],   // final
+  "risks": [{"description": "Jonas is "unreliable"", "raised_by": None}]
+  "changes": ["Line one
+line two"],
+}
+```"""
+    data, repairs = repair_json(text)
+    assert data["decisions"] == ["Ship beta", "Drop toggle"]
+    assert data["changes"] == ["Line one\nline two"]
+    assert data["risks"] == [{"description": 'Jonas is "unreliable"', "raised_by": None}]
+    for repair in ("skipped leading text", "converted single quotes", "removed trailing commas",
+                   "removed comments", "inserted missing commas", "converted Python literals",
+                   "escaped inner quotes"):
+        assert repair in repairs
+
+
+def test_unquoted_dates_stay_one_value():
+    text = '{"action_items": [{"description": "Report", "deadline": 2025-07-01, "priority": high},\n' \
+           '{"description": "Slides", "deadline": 01.07.2025\n"priority": "low"}]}'
+    data, repairs = repair_json(text)
+    assert data["action_items"] == [
+        {"description": "Report", "deadline": "2025-07-01", "priority": "high"},
+        {"description": "Slides", "deadline": "01.07.2025", "priority": "low"},
+    ]
+    assert "quoted bare values" in repairs
+
+
+def test_braces_in_leading_prose_are_not_the_answer():
+    assert repair_json('I think {x} is nice. {"decisions": ["a"]}') == ({"decisions": ["a"]}, ["skipped leading text"])
+
+    data, repairs = repair_json('Fill in {name} and {date}. {"action_items": [{"description": "A"}, {"desc')
+    assert data == {"action_items": [{"description": "A"}]}
+    assert "salvaged truncated output (1 complete entries)" in repairs
+
+
+def test_truncated_output_keeps_complete_entries():
+    text = ('{"participants": [{"name": "Lena", "email": "lena@company.com"}],'
+            ' "action_items": [{"description": "Fix crawler", "assignee": "Lena"},'
+            ' {"description": "Prepare bench')
+    data, repairs = repair_json(text)
+    assert data == {
+        "participants": [{"name": "Lena", "email": "lena@company.com"}],
+        "action_items": [{"description": "Fix crawler", "assignee": "Lena"}],
+    }
+    assert repairs == ["salvaged truncated output (2 complete entries)"]
+
+
+def test_stream_parser_repairs_broken_entries():
+    parser = IncrementalJSONParser()
+    emitted = parser.feed('{"decisions": ["Ship"], "risks": [{"description": "Late",}]}')
+    assert emitted == [("decisions", "Ship"), ("risks", {"description": "Late"})]
@@ -0,0 +1,81 @@
+import sys
+import os
+import pytest
+from unittest.mock import MagicMock, patch
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from ai.llm_client import OpenRouterClient, CircuitBreaker, CircuitOpenError, LLMRequestError
+
+
+def make_client(max_retries=3, failure_threshold=5):
+    return OpenRouterClient("https://example.invalid/chat", "key", 1, 1, max_retries,
+                            backoff_base=0.01, backoff_max=0.01, pool_size=2,
+                            breaker=CircuitBreaker(failure_threshold, reset_timeout=60))
+
+
+def response(status, headers=None, body=None):
+    resp = MagicMock(status_code=status, headers=headers or {}, text="")
+    resp.json.return_value = body or {}
+    return resp
+
+
+@patch("ai.llm_client.time.sleep")
+def test_retries_429_and_honours_retry_after(mock_sleep):
+    client = make_client()
+    client.session.post = MagicMock(side_effect=[
+        response(429, {"Retry-After": "2"}),
+        response(503),
+        response(200, body={"choices": []}),
+    ])
+
+    assert client.chat({"model": "m"}) == {"choices": []}
+    assert mock_sleep.call_args_list[0].args[0] >= 2
+    stats = client.get_stats()
+    assert stats["retries"] == 2
+    assert stats["last_retries"] == 2
+    assert stats["circuit_state"] == "closed"
+
+
+@patch("ai.llm_client.time.sleep")
+def test_client_errors_are_not_retried(mock_sleep):
+    client = make_client()
+    client.session.post = MagicMock(return_value=response(401))
+
+    with pytest.raises(LLMRequestError) as exc:
+        client.chat({"model": "m"})
+    assert exc.value.status_code == 401
+    assert client.session.post.call_count == 1
+
+
+@patch("ai.llm_client.time.sleep")
+def test_circuit_opens_and_fails_fast(mock_sleep):
+    client = make_client(max_retries=5, failure_threshold=2)
+    client.session.post = MagicMock(return_value=response(502))
+
+    with pytest.raises(LLMRequestError):
+        client.chat({"model": "m"})
+    assert client.session.post.call_count == 2
+
+    with pytest.raises(CircuitOpenError):
+        client.chat({"model": "m"})
+    assert client.session.post.call_count == 2
+    assert client.get_stats()["circuit_rejections"] == 1
+
+
+@patch("ai.llm_client.time.sleep")
+def test_unexpected_error_in_trial_call_does_not_wedge_the_breaker(mock_sleep):
+    client = make_client(max_retries=0, failure_threshold=1)
+    client.breaker.reset_timeout = 0
+    client.session.post = MagicMock(return_value=response(502))
+    with pytest.raises(LLMRequestError):
+        client.chat({"model": "m"})
+    assert client.breaker.state == 'half_open'
+
+    client.session.post = MagicMock(side_effect=UnicodeDecodeError("utf-8", b"\xff", 0, 1, "bad byte"))
+    with pytest.raises(UnicodeDecodeError):
+        client.chat({"model": "m"})
+    assert not client.breaker.trial_running
+
+    client.session.post = MagicMock(return_value=response(200))
+    client.chat({"model": "m"})
+    assert client.breaker.state == 'closed'
@@ -0,0 +1,177 @@
+import sys
+import os
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import socketserver
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from sqlalchemy import inspect, text
+
+from database.models import db, OutboxMessage
+from integrations.email_service import SMTPConnection, mail
+from utils.mail_outbox import MailOutbox, enqueue_email, ensure_outbox_columns
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 stand-in ESMTP")
+        recipient = None
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 stand-in")
+            elif verb == "RCPT":
+                recipient = command.split("<", 1)[1].split(">", 1)[0]
+                with server.lock:
+                    planned = server.rcpt_replies.get(recipient)
+                    self.reply(planned.pop(0) if planned else "250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = b""
+                while not data.endswith(b"\r\n.\r\n"):
+                    data += self.rfile.readline()
+                with server.lock:
+                    server.messages.append((recipient, data))
+                self.reply("250 Queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            elif verb in ("MAIL", "RSET", "NOOP"):
+                self.reply("250 OK")
+            else:
+                self.reply("502 Not implemented")
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = []
+        self.rcpt_replies = {}
+
+
+@pytest.fixture
+def smtp_server():
+    server = SMTPStandIn()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def app(smtp_server, tmp_path):
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'outbox.db'}",
+        MAIL_SERVER="127.0.0.1",
+        MAIL_PORT=smtp_server.server_address[1],
+        MAIL_USE_TLS=False,
+        MAIL_DEFAULT_SENDER="tasks@acme.com"
+    )
+    db.init_app(app)
+    mail.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+
+
+def outbox(workers=1):
+    return MailOutbox(workers, poll_interval=0.05, max_attempts=3, backoff_base=30, lease_seconds=60)
+
+
+def queue(count, prefix="user"):
+    messages = [enqueue_email(f"{prefix}{i}@acme.com", "New tasks", f"<p>Task {i}</p>") for i in range(count)]
+    db.session.commit()
+    return [message.id for message in messages]
+
+
+def test_workers_reuse_smtp_sessions(app, smtp_server):
+    ids = queue(12)
+    pool = outbox(workers=3)
+    pool.wake(app)
+    deadline = time.monotonic() + 10
+    while OutboxMessage.query.filter_by(status='sent').count() < 12 and time.monotonic() < deadline:
+        time.sleep(0.05)
+        db.session.expire_all()
+    pool.stop()
+
+    assert OutboxMessage.query.filter_by(status='sent').count() == 12
+    assert sorted(recipient for recipient, _ in smtp_server.messages) == sorted(f"user{i}@acme.com" for i in range(12))
+    # One session per worker at most, not one per message
+    assert smtp_server.connections <= 3
+    assert b"Task 3" in dict(smtp_server.messages)["user3@acme.com"]
+    assert pool.get_stats()["sent"] == 12
+    assert ids == sorted(ids)
+
+
+def test_temporary_failure_is_retried_with_backoff(app, smtp_server):
+    smtp_server.rcpt_replies["user0@acme.com"] = ["451 Try again later"]
+    [message_id] = queue(1)
+    pool = outbox()
+    connection = SMTPConnection.from_app(app)
+
+    assert pool.deliver_next(connection)
+    message = db.session.get(OutboxMessage, message_id)
+    assert message.status == 'queued' and message.attempts == 1
+    assert message.not_before > datetime.utcnow()
+    assert "451" in message.last_error
+    # Not due yet
+    assert not pool.deliver_next(connection)
+
+    message.not_before = datetime.utcnow()
+    db.session.commit()
+    assert pool.deliver_next(connection)
+    db.session.refresh(message)
+    assert message.status == 'sent' and message.attempts == 2 and message.sent_at
+    connection.close()
+
+
+def test_permanent_failure_keeps_the_session(app, smtp_server):
+    smtp_server.rcpt_replies["bad0@acme.com"] = ["550 No such user"]
+    [bad_id] = queue(1, prefix="bad")
+    [good_id] = queue(1, prefix="good")
+    pool = outbox()
+    connection = SMTPConnection.from_app(app)
+
+    assert pool.deliver_next(connection)
+    assert pool.deliver_next(connection)
+    assert db.session.get(OutboxMessage, bad_id).status == 'failed'
+    assert db.session.get(OutboxMessage, good_id).status == 'sent'
+    assert smtp_server.connections == 1
+    connection.close()
+
+
+def test_owner_column_is_added_to_a_legacy_outbox(app):
+    OutboxMessage.__table__.drop(db.engine)
+    db.session.execute(text("CREATE TABLE outbox_messages (id INTEGER PRIMARY KEY, recipient TEXT, subject TEXT, "
+                            "html TEXT, status TEXT, attempts INTEGER, not_before TIMESTAMP, last_error TEXT, "
+                            "created_at TIMESTAMP, updated_at TIMESTAMP, sent_at TIMESTAMP)"))
+    db.session.commit()
+    ensure_outbox_columns()
+    ensure_outbox_columns()
+    assert "user_id" in {column["name"] for column in inspect(db.engine).get_columns("outbox_messages")}
+    enqueue_email("lena@acme.com", "New tasks", "<p>Task</p>", user_id=7)
+    db.session.commit()
+    assert OutboxMessage.query.one().user_id == 7
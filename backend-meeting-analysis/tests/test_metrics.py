@@ -0,0 +1,29 @@
+import sys
+import os
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.metrics import Registry
+
+
+def test_prometheus_text_output():
+    registry = Registry()
+    errors = registry.counter("test_errors_total", "Errors", ["component"])
+    in_flight = registry.gauge("test_in_flight", "In flight")
+    latency = registry.histogram("test_seconds", "Latency", ["kind"], buckets=(0.1, 1))
+
+    errors.inc(component="llm")
+    errors.inc(2, component="llm")
+    with in_flight.track_inprogress():
+        assert in_flight.get() == 1
+    for value in (0.05, 0.5, 5):
+        latency.observe(value, kind='say "hi"')
+
+    lines = registry.render().splitlines()
+    assert "# TYPE test_errors_total counter" in lines
+    assert 'test_errors_total{component="llm"} 3' in lines
+    assert "test_in_flight 0" in lines
+    assert 'test_seconds_bucket{kind="say \\"hi\\"",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{kind="say \\"hi\\"",le="1"} 2' in lines
+    assert 'test_seconds_bucket{kind="say \\"hi\\"",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{kind="say \\"hi\\""} 3' in lines
+    assert latency.get(kind='say "hi"') == (3, 5.55)
@@ -0,0 +1,141 @@
+import sys
+import os
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from flask_login import LoginManager
+
+from api import notification_routes
+from api.notification_routes import notification_bp
+from database.models import db, DigestItem, OutboxMessage, PendingTask, User
+from utils import notification_digest
+from utils.notification_digest import collect, flush_due_digests
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(notification_digest.Config, "NOTIFICATION_DIGEST_ENABLED", True)
+    monkeypatch.setattr(notification_routes.mail_outbox, "wake", lambda app=None: None)
+    monkeypatch.setattr(notification_routes.digest_flusher, "start", lambda app: None)
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI="sqlite://", LOGIN_DISABLED=True)
+    db.init_app(app)
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.request_loader
+    def load_user(request):
+        return db.session.get(User, int(request.headers.get("X-User", 1)))
+
+    app.register_blueprint(notification_bp, url_prefix='/notifications')
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(id=1, google_id="g1", email="manel@acme.com"),
+                            User(id=2, google_id="g2", email="eve@other.com")])
+        db.session.commit()
+        yield app
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    calls = []
+    render = notification_digest.render_task_email
+
+    def counting(task_data):
+        calls.append([item['task']['description'] for item in task_data])
+        return render(task_data)
+    monkeypatch.setattr(notification_digest, "render_task_email", counting)
+    return calls
+
+
+def task(description, email, priority="medium"):
+    return {"type": "action_item", "description": description, "assignee": "Lena", "assignee_email": email,
+            "priority": priority, "deadline": "01.07.2025"}
+
+
+def test_tasks_are_collected_and_sent_as_one_digest(app, renders):
+    client = app.test_client()
+    first = client.post('/notifications/send', json={'events': [task("Report", "lena@acme.com"),
+                                                                 task("Budget", "omar@acme.com")]})
+    second = client.post('/notifications/send', json={'events': [task("Slides", "lena@acme.com", "low")]})
+    assert first.status_code == 202 and first.json["collected"] == 2 and first.json["queued"] == 0
+    assert second.json["collected"] == 1
+    assert OutboxMessage.query.count() == 0
+
+    # Window not over yet
+    assert flush_due_digests(window=900) == 0
+    DigestItem.query.update({"created_at": datetime.utcnow() - timedelta(seconds=901)})
+    db.session.commit()
+    assert flush_due_digests(window=900) == 2
+
+    assert sorted(renders) == [["Budget"], ["Report", "Slides"]]
+    lena = OutboxMessage.query.filter_by(recipient="lena@acme.com").one()
+    assert "2 new task(s)" in lena.subject
+    for pending in PendingTask.query.filter_by(assignee_email="lena@acme.com"):
+        assert f"/tasks/accept/{pending.token}" in lena.html
+    assert DigestItem.query.count() == 0
+
+
+def test_high_priority_bypasses_the_window_with_collected_tasks(app, renders):
+    client = app.test_client()
+    client.post('/notifications/send', json={'events': [task("Report", "lena@acme.com"),
+                                                        task("Budget", "omar@acme.com")]})
+    response = client.post('/notifications/send', json={'events': [task("Outage fix", "lena@acme.com", "high")]})
+
+    assert response.json["queued"] == 1 and response.json["collected"] == 0
+    assert renders == [["Report", "Outage fix"]]
+    assert [item.recipient for item in DigestItem.query] == ["omar@acme.com"]
+
+
+def test_digest_can_be_skipped_per_request(app, renders):
+    response = app.test_client().post('/notifications/send', json={
+        'events': [task("Report", "lena@acme.com")], 'digest': False})
+    assert response.json["queued"] == 1 and DigestItem.query.count() == 0
+
+
+def test_flush_skips_items_already_taken(app, monkeypatch):
+    collect("lena@acme.com", [{'task': task("Report", "lena@acme.com"), 'token': "t1"}])
+    db.session.commit()
+    monkeypatch.setattr(notification_digest, "take_collected", lambda recipient, user_id: None)
+    assert flush_due_digests(window=0) == 0
+    assert OutboxMessage.query.count() == 0
+
+
+def test_digests_are_kept_apart_per_sender(app, renders):
+    client = app.test_client()
+
+    def send(user, *events):
+        with app.app_context():
+            return client.post('/notifications/send', json={'events': list(events)}, headers={"X-User": str(user)})
+    send(1, task("Report", "lena@acme.com"))
+    send(2, task("Phishing", "lena@acme.com"))
+    # User 2's urgent task only takes their own collected item along
+    assert send(2, task("Urgent", "lena@acme.com", "high")).json["queued"] == 1
+    assert renders == [["Phishing", "Urgent"]]
+
+    send(2, task("Later", "lena@acme.com"))
+    DigestItem.query.update({"created_at": datetime.utcnow() - timedelta(seconds=901)})
+    db.session.commit()
+    assert flush_due_digests(window=900) == 2
+    assert sorted(renders[1:]) == [["Later"], ["Report"]]
+    owners = {message.user_id: message.html for message in OutboxMessage.query.filter(OutboxMessage.id > 1)}
+    assert "Report" in owners[1] and "Later" in owners[2]
+
+
+def test_outbox_status_is_only_visible_to_the_sender(app, monkeypatch):
+    monkeypatch.setattr(notification_digest.Config, "NOTIFICATION_DIGEST_ENABLED", False)
+    client = app.test_client()
+
+    def get(user, path):
+        # A fresh app context per request, so current_user is loaded again
+        with app.app_context():
+            return client.get(path, headers={"X-User": str(user)})
+    [message_id] = client.post('/notifications/send', json={'events': [task("Report", "lena@acme.com")]}
+                               ).json["message_ids"]
+    assert db.session.get(OutboxMessage, message_id).user_id == 1
+    assert get(2, f'/notifications/outbox/{message_id}').status_code == 404
+    response = get(1, f'/notifications/outbox/{message_id}')
+    assert response.status_code == 200 and response.json["recipient"] == "lena@acme.com"
@@ -0,0 +1,96 @@
+import sys
+import os
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import io
+import json
+import zipfile
+
+import pytest
+from flask import Flask
+
+from api import parse_routes
+from api.parse_routes import parse_bp
+
+
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    path = tmp_path / "spool"
+    path.mkdir()
+    # Every document goes to a temp file, so leaks are visible on disk
+    monkeypatch.setattr(parse_routes.Config, "UPLOAD_SPOOL_BYTES", 0)
+    monkeypatch.setattr(parse_routes.Config, "UPLOAD_TMP_DIR", str(path))
+    return path
+
+
+@pytest.fixture
+def published(monkeypatch):
+    batches = []
+    monkeypatch.setattr(parse_routes, "send_to_queue", batches.append)
+    return batches
+
+
+@pytest.fixture
+def client(spool_dir, published, monkeypatch):
+    def analyze(content, chunked=None, mode=None, scope=None):
+        if "broken" in content:
+            raise ValueError("Model answered nonsense")
+        return [{"type": "action_item", "description": content.strip()}], {"path": "rules", "prompt_version": None}
+    monkeypatch.setattr(parse_routes, "analyze_text", analyze)
+    app = Flask(__name__)
+    app.config["LOGIN_DISABLED"] = True
+    app.register_blueprint(parse_bp)
+    return app.test_client()
+
+
+def zipped(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, text in members.items():
+            archive.writestr(name, text)
+    buffer.seek(0)
+    return buffer
+
+
+def post_batch(client, files):
+    response = client.post('/parse/batch', data={'files': files})
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    return response, lines
+
+
+def test_zip_members_and_files_stream_one_line_each(client, spool_dir, published):
+    archive = zipped({"week1/a.txt": "Report", "week1/b.txt": "broken notes", "logo.png": "x", "__MACOSX/a.txt": "x"})
+    response, lines = post_batch(client, [(archive, "notes.zip"), (io.BytesIO(b"Slides"), "c.txt")])
+
+    assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+    documents = {line["source"]: line for line in lines[:-1]}
+    assert set(documents) == {"notes.zip/a.txt", "notes.zip/b.txt", "c.txt"}
+    assert documents["notes.zip/a.txt"]["status"] == "ok"
+    assert documents["notes.zip/a.txt"]["events"] == [{"type": "action_item", "description": "Report"}]
+    assert documents["notes.zip/b.txt"] == {"index": 1, "source": "notes.zip/b.txt", "status": "error",
+                                            "error": "Model answered nonsense"}
+    assert lines[-1]["summary"] == {"documents": 3, "succeeded": 2, "failed": 1, "events": 2, "published": True}
+    assert sorted(event["description"] for event in published[0]) == ["Report", "Slides"]
+    assert len(os.listdir(spool_dir)) == 3
+    # What the WSGI server does once the stream is sent - runs call_on_close
+    response.close()
+    assert os.listdir(spool_dir) == []
+
+
+def test_oversized_zip_member_is_rejected(client, spool_dir, monkeypatch):
+    monkeypatch.setattr(parse_routes.Config, "BATCH_MAX_ZIP_MEMBER_BYTES", 10)
+    archive = zipped({"a.txt": "Report", "big.txt": "x" * 100})
+    response = client.post('/parse/batch', data={'files': [(io.BytesIO(b"Slides"), "c.txt"), (archive, "notes.zip")]})
+    assert response.status_code == 413 and "big.txt" in response.json["error"]
+    assert os.listdir(spool_dir) == []
+
+
+def test_too_many_documents_are_rejected(client, spool_dir, monkeypatch):
+    monkeypatch.setattr(parse_routes.Config, "BATCH_MAX_DOCUMENTS", 2)
+    response = client.post('/parse/batch', data={
+        'files': [(io.BytesIO(b"Report"), "a.txt"), (io.BytesIO(b"Slides"), "b.txt")],
+        'urls': ["https://example.com/notes.txt"]})
+    assert response.status_code == 400 and "at most 2" in response.json["error"]
+    response = client.post('/parse/batch', data={'files': [(zipped({"a.txt": "1", "b.txt": "2", "c.txt": "3"}), "n.zip")]})
+    assert response.status_code == 400
+    assert os.listdir(spool_dir) == []
@@ -0,0 +1,162 @@
+import sys
+import os
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from flask import Flask
+from flask_login import LoginManager
+
+from api import parse_routes
+from api.parse_routes import parse_bp
+from database.models import db, User
+from utils import parse_jobs
+
+
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    path = tmp_path / "spool"
+    path.mkdir()
+    # Every upload goes to a temp file, so leaks are visible on disk
+    monkeypatch.setattr(parse_jobs.Config, "UPLOAD_SPOOL_BYTES", 0)
+    monkeypatch.setattr(parse_jobs.Config, "UPLOAD_TMP_DIR", str(path))
+    return path
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=1)
+    pool.gates = []
+    monkeypatch.setattr(parse_jobs, "job_executor", pool)
+    yield pool
+    for gate in pool.gates:
+        gate.set()
+    pool.shutdown(wait=True)
+
+
+@pytest.fixture
+def app(tmp_path, spool_dir, executor, monkeypatch):
+    monkeypatch.setattr(parse_routes, "send_to_queue", lambda events: None)
+    monkeypatch.setattr(parse_routes, "analyze_text", analyzed)
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'jobs.db'}"
+    db.init_app(app)
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.request_loader
+    def load_user(request):
+        user_id = request.headers.get("X-User")
+        return db.session.get(User, int(user_id)) if user_id else None
+
+    app.register_blueprint(parse_bp)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(id=1, google_id="g1", email="lena@acme.com"),
+                            User(id=2, google_id="g2", email="omar@acme.com")])
+        db.session.commit()
+    # No app context held open: each request gets its own g, so current_user is not reused
+    return app
+
+
+def upload(client, user=1, text="Lena writes the report by 01.07.2025"):
+    return client.post('/parse?async=1', headers={"X-User": str(user)},
+                       data={'file': (io.BytesIO(text.encode()), 'notes.txt')})
+
+
+def block_pool(executor):
+    """Occupy the only worker so submitted jobs stay queued."""
+    gate = threading.Event()
+    executor.gates.append(gate)
+    executor.submit(gate.wait)
+    return gate
+
+
+def test_cancelling_a_queued_job_removes_its_upload(app, executor, spool_dir):
+    block_pool(executor)
+    client = app.test_client()
+    job_id = upload(client).json["job_id"]
+    assert len(os.listdir(spool_dir)) == 1
+
+    response = client.delete(f'/parse/jobs/{job_id}', headers={"X-User": "1"})
+    assert response.status_code == 200 and response.json["status"] == "cancelled"
+    assert os.listdir(spool_dir) == []
+
+
+def analyzed(content, chunked=None, mode=None, scope=None):
+    return [{"type": "action_item", "description": content}], {"path": "rules", "prompt_version": None}
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def job_status(client, job_id, user=1):
+    return client.get(f'/parse/jobs/{job_id}', headers={"X-User": str(user)})
+
+
+def test_job_runs_and_reports_its_stages(app, monkeypatch, spool_dir):
+    monkeypatch.setattr(parse_routes, "analyze_text", analyzed)
+    client = app.test_client()
+    response = upload(client)
+    assert response.status_code == 202
+    job_id = response.json["job_id"]
+    assert response.json["status_url"] == f"/parse/jobs/{job_id}"
+
+    wait_until(lambda: job_status(client, job_id).json["status"] == "done")
+    job = job_status(client, job_id).json
+    assert [stage["stage"] for stage in job["progress"]] == ["extracting", "analyzing", "publishing"]
+    assert job["events"][0]["description"] == "Lena writes the report by 01.07.2025"
+    assert job["extraction_path"] == "rules"
+    assert os.listdir(spool_dir) == []
+
+
+def test_full_queue_is_rejected(app, executor, monkeypatch, spool_dir):
+    monkeypatch.setattr(parse_jobs.Config, "PARSE_JOB_QUEUE_LIMIT", 1)
+    block_pool(executor)
+    client = app.test_client()
+    assert upload(client).status_code == 202
+    response = upload(client)
+    assert response.status_code == 503
+    # Only the queued job's upload is left
+    assert len(os.listdir(spool_dir)) == 1
+
+
+def test_running_job_stops_at_the_next_stage(app, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def slow(content, chunked=None, mode=None, scope=None):
+        started.set()
+        release.wait(10)
+        return analyzed(content)
+    monkeypatch.setattr(parse_routes, "analyze_text", slow)
+    client = app.test_client()
+    job_id = upload(client).json["job_id"]
+    assert started.wait(10)
+
+    response = client.delete(f'/parse/jobs/{job_id}', headers={"X-User": "1"})
+    assert response.status_code == 200 and response.json["status"] == "cancelled"
+    release.set()
+    wait_until(lambda: not parse_jobs.pending_jobs)
+    job = job_status(client, job_id).json
+    assert job["status"] == "cancelled" and job["stage"] == "analyzing" and job["events"] is None
+
+    response = client.delete(f'/parse/jobs/{job_id}', headers={"X-User": "1"})
+    assert response.status_code == 409
+
+
+def test_jobs_of_other_users_are_not_found(app, executor):
+    block_pool(executor)
+    client = app.test_client()
+    job_id = upload(client).json["job_id"]
+    assert job_status(client, job_id, user=2).status_code == 404
+    assert client.delete(f'/parse/jobs/{job_id}', headers={"X-User": "2"}).status_code == 404
+    assert job_status(client, "missing").status_code == 404
+    assert job_status(client, job_id).json["status"] == "queued"
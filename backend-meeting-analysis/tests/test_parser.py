@@ -0,0 +1,119 @@
+import sys
+import os
+import json
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from ai.stream_parser import IncrementalJSONParser
+
+
+def test_incremental_parser_emits_entries_as_soon_as_they_close():
+    output = 'Here is the JSON:\n```json\n' + json.dumps({
+        "participants": [{"name": "Lena", "email": "lena@company.com"}],
+        "action_items": [{"description": "Fix {braces} and \"quotes\"", "assignee": "Lena"}],
+        "decisions": ["Ship beta", "Drop toggle"],
+        "summary": {"decisions": ["not a category array"]},
+    }) + '\n```'
+
+    parser = IncrementalJSONParser()
+    emitted = []
+    for i in range(0, len(output), 5):
+        emitted.extend(parser.feed(output[i:i + 5]))
+
+    assert emitted == [
+        ("participants", {"name": "Lena", "email": "lena@company.com"}),
+        ("action_items", {"description": "Fix {braces} and \"quotes\"", "assignee": "Lena"}),
+        ("decisions", "Ship beta"),
+        ("decisions", "Drop toggle"),
+    ]
+    assert parser.finished
+
+
+def test_incremental_parser_holds_back_unfinished_entry():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"decisions": ["Ship beta", "Drop') == [("decisions", "Ship beta")]
+    assert parser.feed(' toggle"]}') == [("decisions", "Drop toggle")]
+
+
+def test_rule_pass_extracts_templated_protocol_with_high_coverage():
+    from ai.rules import extract_with_rules
+    text = (
+        "Meeting Minutes\n"
+        "Date: 10 June 2025\n"
+        "Decision: The beta release is postponed to August 5.\n"
+        "Action: Thomas to prepare benchmarks by next Tuesday (June 17).\n"
+        "Lena (lena@company.com) will update the runbook by Friday.\n"
+        "Ticket 70 Test Imens Crawler → Jonas\n"
+        "Aufgaben zu nächster Woche\n"
+        "- Imen: Crawler mergen bis 01.07.2025\n"
+    )
+    data, report = extract_with_rules(text)
+
+    assert data["decisions"] == ["The beta release is postponed to August 5"]
+    tasks = {item["assignee"]: item for item in data["action_items"]}
+    assert tasks["Thomas"]["deadline"] == "17.06.2025"
+    assert tasks["Thomas"]["description"] == "Prepare benchmarks"
+    assert tasks["Lena"]["assignee_email"] == "lena@company.com"
+    assert tasks["Lena"]["deadline"] == "13.06.2025"
+    assert tasks["Jonas"]["description"] == "Test Imens Crawler (Ticket 70)"
+    assert tasks["Imen"]["deadline"] == "01.07.2025"
+    assert report["coverage"] == 1.0
+    assert report["confidence"] >= 0.8
+
+
+def test_rule_pass_reads_a_leading_deadline():
+    from ai.rules import extract_with_rules
+    text = (
+        "Protokoll Teamrunde\n"
+        "Datum: 10.06.2025\n"
+        "Bis 01.07. erstellt Lena den Bericht.\n"
+        "Spätestens Freitag wird Omar die Folien prüfen.\n"
+        "By Friday, Jonas will send the slides.\n"
+    )
+    data, report = extract_with_rules(text)
+
+    tasks = {item["assignee"]: item for item in data["action_items"]}
+    assert (tasks["Lena"]["description"], tasks["Lena"]["deadline"]) == ("Den Bericht", "01.07.2025")
+    assert (tasks["Omar"]["description"], tasks["Omar"]["deadline"]) == ("Die Folien prüfen", "13.06.2025")
+    assert tasks["Jonas"]["deadline"] == "13.06.2025"
+    assert report["coverage"] == 1.0
+
+
+def test_rule_pass_ignores_subjects_that_are_not_names():
+    from ai.rules import extract_with_rules
+    data, report = extract_with_rules(
+        "Meeting 12.06.2026\n"
+        "We will finalize the budget by Friday.\n"
+        "This should be discussed later.\n"
+        "Sie wird den Bericht bis 20.06.2026 schreiben.\n"
+        "Das Team soll die Folien prüfen.\n"
+        "Decision: Ship beta.")
+
+    assert "action_items" not in data
+    # The sentences stay uncovered, so hybrid mode asks the LLM
+    assert report["coverage"] < 0.8
+
+
+def test_rule_pass_keeps_the_verb_after_a_german_deadline():
+    from ai.rules import extract_with_rules
+    data, _ = extract_with_rules("Meeting 12.06.2026\nLena wird den Bericht bis 20.06.2026 schreiben.")
+
+    [item] = data["action_items"]
+    assert (item["assignee"], item["description"], item["deadline"]) == ("Lena", "Den Bericht schreiben", "20.06.2026")
+
+
+def test_hybrid_mode_skips_llm_when_rules_are_conclusive():
+    from unittest.mock import patch
+    import ai.parser as parser
+
+    with patch.object(parser, "get_insights_data") as llm:
+        events, info = parser.analyze_text(
+            "Decision: Ship the beta.\nAction: Thomas to prepare benchmarks by 17.06.2026.", mode="hybrid")
+    assert info["path"] == "rules"
+    assert not llm.called
+    assert [e.type for e in events] == ["action_item", "decision"]
+
+    with patch.object(parser, "get_insights_data", return_value={"decisions": ["From LLM"]}) as llm:
+        events, info = parser.analyze_text("We talked about many things.", mode="hybrid")
+    assert info["path"] == "llm"
+    assert info["prompt_version"] == "full@2"
+    assert events[0].message == "Decision 1: From LLM"
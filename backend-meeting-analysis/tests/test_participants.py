@@ -0,0 +1,112 @@
+import sys
+import os
+import time
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from flask import Flask
+
+from ai.participants import (ParticipantDirectory, MeetingDirectory, directory_for_meeting, directory_scope,
+                             directory_store)
+from database.models import db, Participant, User
+
+
+def make_directory():
+    directory = ParticipantDirectory()
+    directory.add("Lena Maier", "lena@company.com")
+    directory.add("Manel Khammari", "manel@company.com")
+    directory.add("Jonas Müller", "jonas@company.com")
+    directory.add("Jonas Schmidt", "jschmidt@company.com")
+    return directory
+
+
+def test_lookup_variants():
+    directory = make_directory()
+    assert directory.lookup("Lena Maier") == "lena@company.com"
+    assert directory.lookup("lena") == "lena@company.com"
+    assert directory.lookup("Lena M.") == "lena@company.com"
+    assert directory.lookup("L. Maier") == "lena@company.com"
+    assert directory.lookup("Herr Khammari") == "manel@company.com"
+    assert directory.lookup("Jonas Mueller") == "jonas@company.com"
+    assert directory.lookup("Lena Meier") == "lena@company.com"
+    assert directory.lookup("Mannel") == "manel@company.com"
+
+
+def test_ambiguous_and_unknown_names_are_not_guessed():
+    directory = make_directory()
+    assert directory.lookup("Jonas") is None
+    assert directory.lookup("Jonas S.") == "jschmidt@company.com"
+    assert directory.lookup("Thomas") is None
+    assert directory.lookup("") is None
+
+
+def test_meeting_participants_take_precedence():
+    local = ParticipantDirectory()
+    local.add("Jonas Weber", "jonas.weber@other.org")
+    resolver = MeetingDirectory(local, [make_directory()])
+    assert resolver.lookup("Jonas") == "jonas.weber@other.org"
+    assert resolver.lookup("Lena M.") == "lena@company.com"
+
+
+def test_lookups_stay_fast_on_a_large_directory():
+    def word(i):
+        return "".join("abcdefghijklmnopqrstuvwxyz"[(i // 26 ** k) % 26] for k in range(3))
+
+    directory = ParticipantDirectory()
+    for i in range(5000):
+        directory.add(f"Kim{word(i)} Lee{word(i)}", f"p{i}@company.com")
+    names = ("Kimqrc Leeqrc", "Kimqrc L.", "Herr Leeqrc", "Kimqrc Leeqr")
+    start = time.perf_counter()
+    emails = [directory.lookup(name) for name in names]
+    assert (time.perf_counter() - start) / len(names) < 0.01
+    assert len(set(emails)) == 1 and emails[0] is not None
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    directory_store.clear()
+    with app.app_context():
+        db.create_all()
+        yield app
+    directory_store.clear()
+
+
+def add_user(user_id, email):
+    user = User(id=user_id, google_id=f"g{user_id}", email=email, name=email.split("@")[0].title())
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_free_mail_users_do_not_share_a_directory(app):
+    anna = add_user(1, "anna@gmail.com")
+    ben = add_user(2, "ben@gmail.com")
+    assert directory_scope(anna) == "user:1"
+
+    directory_for_meeting([{"name": "Lena Maier", "email": "lena.private@gmail.com"}], directory_scope(anna))
+    assert directory_for_meeting([], directory_scope(anna)).lookup("Lena") == "lena.private@gmail.com"
+    assert directory_for_meeting([], directory_scope(ben)).lookup("Lena") is None
+    assert directory_for_meeting([], directory_scope(ben)).lookup("Anna") is None
+    assert {p.organisation for p in Participant.query} == {"user:1"}
+
+
+def test_company_directory_is_shared_but_not_opened_by_participants(app):
+    lena = add_user(1, "lena@acme.com")
+    omar = add_user(2, "omar@acme.com")
+    outsider = add_user(3, "eve@gmail.com")
+    directory_for_meeting([{"name": "Jonas Weber", "email": "jonas@partner.de"}], directory_scope(lena))
+
+    assert directory_for_meeting([], directory_scope(omar)).lookup("Jonas") == "jonas@partner.de"
+    # Naming an acme.com participant does not give the outsider acme's directory
+    resolver = directory_for_meeting([{"name": "Omar Said", "email": "omar@acme.com"}], directory_scope(outsider))
+    assert resolver.lookup("Jonas") is None
+    assert directory_for_meeting([], "acme.com").lookup("Omar Said") == "omar@acme.com"
+    assert Participant.query.filter_by(organisation="acme.com", name="Omar Said").count() == 0
+
+
+def test_no_shared_directory_without_an_uploader(app):
+    resolver = directory_for_meeting([{"name": "Lena Maier", "email": "lena@acme.com"}])
+    assert resolver.organisations == [] and Participant.query.count() == 0
@@ -0,0 +1,50 @@
+import sys
+import os
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from io import BytesIO
+
+from PyPDF2 import PdfReader
+
+from config import Config
+from documents import pdf
+from documents.pdf import extract_pdf_text, iter_pdf_pages
+
+SAMPLE = os.path.join(os.path.dirname(__file__), '..', 'MEETING PROTOCOL – MKSS2 Project.pdf')
+
+
+def load_sample():
+    with open(SAMPLE, 'rb') as f:
+        return f.read()
+
+
+def test_pages_in_order_and_same_text_as_reader():
+    content = load_sample()
+    expected = [page.extract_text() for page in PdfReader(BytesIO(content)).pages]
+
+    assert list(iter_pdf_pages(content)) == expected
+    assert extract_pdf_text(content) == "".join(text + "\n" for text in expected)
+
+
+def test_page_and_character_budget():
+    content = load_sample()
+    pages = list(iter_pdf_pages(content))
+
+    assert extract_pdf_text(content, max_pages=1) == pages[0] + "\n"
+    limit = len(pages[0]) + 100
+    text = extract_pdf_text(content, max_chars=limit)
+    assert text == pages[0] + "\n" + pages[1][:99] + "\n"
+
+
+def test_process_pool_keeps_page_order(monkeypatch):
+    content = load_sample()
+    monkeypatch.setattr(Config, "PDF_WORKERS", 2)
+    monkeypatch.setattr(Config, "PDF_PARALLEL_MIN_PAGES", 1)
+    monkeypatch.setattr(Config, "PDF_PAGES_PER_TASK", 1)
+    try:
+        parallel = list(iter_pdf_pages(content))
+    finally:
+        pdf.shutdown_pool()
+
+    monkeypatch.setattr(Config, "PDF_WORKERS", 1)
+    assert parallel == list(iter_pdf_pages(content))
@@ -0,0 +1,90 @@
+import sys
+import os
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from sqlalchemy import event, inspect, text
+
+from database.models import db, PendingTask, PendingTaskArchive
+from utils.pending_tasks import create_pending_tasks, ensure_pending_task_indexes, sweep_expired_tasks
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+
+
+def add_task(token, status="pending", age_days=0):
+    db.session.add(PendingTask(assignee_email="lena@acme.com", description=token, token=token, status=status,
+                               created_at=datetime.utcnow() - timedelta(days=age_days)))
+
+
+def test_one_insert_for_a_whole_notification_run(app):
+    statements = []
+    event.listen(db.engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    tasks_by_email = {
+        "lena@acme.com": [{"description": "Report", "priority": "high", "deadline": "01.07.2025"},
+                          {"description": "Slides"}],
+        "omar@acme.com": [{"description": "Budget"}],
+    }
+    task_data = create_pending_tasks(tasks_by_email)
+    db.session.commit()
+
+    assert len([s for s in statements if s.startswith("INSERT")]) == 1
+    assert [item["task"]["description"] for item in task_data["lena@acme.com"]] == ["Report", "Slides"]
+    token = task_data["omar@acme.com"][0]["token"]
+    task = PendingTask.query.filter_by(token=token).one()
+    assert (task.assignee_email, task.status, task.priority, task.deadline) == \
+        ("omar@acme.com", "pending", "medium", "No deadline")
+    assert PendingTask.query.count() == 3
+
+
+def test_token_lookup_uses_the_unique_index(app):
+    indexes = {index["name"]: index for index in inspect(db.engine).get_indexes("pending_tasks")}
+    assert indexes["ix_pending_tasks_token"]["unique"]
+    assert indexes["ix_pending_tasks_assignee_status"]["column_names"] == ["assignee_email", "status"]
+    plan = db.session.execute(
+        text("EXPLAIN QUERY PLAN SELECT * FROM pending_tasks WHERE token = 'x' AND status = 'pending'")).all()
+    assert "ix_pending_tasks_token" in str(plan)
+
+
+def test_indexes_are_added_to_a_legacy_table(app):
+    db.drop_all()
+    db.session.execute(text("CREATE TABLE pending_tasks (id INTEGER PRIMARY KEY, description TEXT, "
+                            "assignee_email TEXT, deadline TEXT, priority TEXT, token TEXT, status TEXT, "
+                            "created_at TIMESTAMP)"))
+    db.session.commit()
+    ensure_pending_task_indexes()
+    ensure_pending_task_indexes()
+    names = {index["name"] for index in inspect(db.engine).get_indexes("pending_tasks")}
+    assert {"ix_pending_tasks_token", "ix_pending_tasks_assignee_status", "ix_pending_tasks_status_created"} <= names
+
+
+def test_sweep_archives_old_rows_in_batches(app):
+    for i in range(5):
+        add_task(f"old-{i}", status="pending" if i % 2 else "accepted", age_days=40)
+    add_task("old-syncing", status="syncing", age_days=40)
+    add_task("recent", age_days=1)
+    db.session.commit()
+
+    assert sweep_expired_tasks(ttl_days=30, batch_size=2, archive=True) == 5
+    assert {task.token for task in PendingTask.query} == {"old-syncing", "recent"}
+    archived = PendingTaskArchive.query.order_by(PendingTaskArchive.token).all()
+    assert [row.token for row in archived] == [f"old-{i}" for i in range(5)]
+    assert archived[1].status == "pending" and archived[0].created_at < datetime.utcnow() - timedelta(days=39)
+
+
+def test_sweep_can_delete_instead(app):
+    add_task("old", age_days=40)
+    db.session.commit()
+    assert sweep_expired_tasks(ttl_days=30, archive=False) == 1
+    assert PendingTask.query.count() == 0 and PendingTaskArchive.query.count() == 0
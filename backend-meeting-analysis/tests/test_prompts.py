@@ -0,0 +1,30 @@
+import sys
+import os
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from ai.prompts import TEMPLATES, detect_language, select_template, token_report
+
+
+def test_language_variant_is_picked_from_the_document():
+    german = "Teilnehmer: Lena, Jonas\nJonas - macht die Tests für das Ticket und wird bis Freitag fertig sein."
+    english = "Attendees: Lena, Jonas\nJonas will finish the tests for the ticket by Friday."
+    assert detect_language(german) == "de"
+    assert detect_language(english) == "en"
+    assert select_template(german, "compact").id == "compact-de@1"
+    assert select_template(english, "compact").id == "compact-en@1"
+    assert select_template(german, "full").id == "full@2"
+
+
+def test_system_message_is_static_and_document_goes_last():
+    template = TEMPLATES["full"][None]
+    first = template.render("Decision: ship it.")
+    second = template.render("Something else", [{"name": "Lena", "email": "lena@company.com"}])
+    assert first[0] == second[0]
+    assert "Decision: ship it." not in first[0]["content"]
+    assert "lena@company.com" in second[1]["content"]
+    assert "{{" not in first[0]["content"]
+
+
+def test_compact_templates_are_much_smaller():
+    rows = {row["template"]: row for row in token_report("Decision: ship it.")}
+    assert rows["compact-en@1"]["total_tokens"] * 2 < rows["full@2"]["total_tokens"]
@@ -0,0 +1,150 @@
+import sys
+import os
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import time
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+from api import task_routes
+from api.task_routes import task_bp
+from database.models import db, PendingTask
+from utils import task_tokens
+from utils.pending_tasks import create_pending_tasks
+from utils.task_tokens import (ConsumedTokenFilter, ExpiredTaskToken, InvalidTaskToken, check_signing_key,
+                               load_or_create_key, sign_task_token, verify_task_token)
+
+
+@pytest.fixture(autouse=True)
+def secret(monkeypatch):
+    monkeypatch.setattr(task_tokens.Config, "TASK_TOKEN_SECRET", "test-secret")
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(task_routes, "consumed_tokens", ConsumedTokenFilter(1000, 0.001))
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    app.register_blueprint(task_bp, url_prefix='/tasks')
+    with app.app_context():
+        db.create_all()
+        yield app
+
+
+@pytest.fixture
+def statements(app):
+    seen = []
+    event.listen(db.engine, "before_cursor_execute", lambda conn, cursor, statement, *args: seen.append(statement))
+    return seen
+
+
+def test_token_carries_task_assignee_and_expiry():
+    expires_at = time.time() + 60
+    claims = verify_task_token(sign_task_token(42, "lena@acme.com", expires_at))
+    assert claims == {'task_id': 42, 'assignee_email': "lena@acme.com", 'expires_at': int(expires_at)}
+
+
+def test_altered_and_expired_tokens_are_rejected(monkeypatch):
+    token = sign_task_token(42, "lena@acme.com")
+    payload, signature = token.split('.')
+    forged = task_tokens._encode(b"43:9999999999:lena@acme.com")
+    for bad in (f"{forged}.{signature}", f"{payload}.{signature[:-2]}", "not.a.token", "é.x"):
+        with pytest.raises(InvalidTaskToken):
+            verify_task_token(bad)
+    with pytest.raises(ExpiredTaskToken):
+        verify_task_token(sign_task_token(42, "lena@acme.com", time.time() - 1))
+    monkeypatch.setattr(task_tokens.Config, "TASK_TOKEN_SECRET", "other-secret")
+    with pytest.raises(InvalidTaskToken):
+        verify_task_token(token)
+
+
+def test_created_tasks_get_signed_tokens(app):
+    task_data = create_pending_tasks({"lena@acme.com": [{"description": "Report"}, {"description": "Slides"}]})
+    db.session.commit()
+    for item in task_data["lena@acme.com"]:
+        claims = verify_task_token(item['token'])
+        task = db.session.get(PendingTask, claims['task_id'])
+        assert (task.token, task.description, claims['assignee_email']) == \
+            (item['token'], item['task']['description'], "lena@acme.com")
+
+
+def test_bad_links_never_reach_the_database(app, statements):
+    client = app.test_client()
+    expired = sign_task_token(1, "lena@acme.com", time.time() - 1)
+    assert client.get(f'/tasks/decline/{expired}').status_code == 410
+    assert client.get('/tasks/accept/bm90.c2lnbmVk').status_code == 404
+    assert statements == []
+
+
+def test_replayed_link_is_answered_from_the_filter(app, statements):
+    [item] = create_pending_tasks({"lena@acme.com": [{"description": "Report"}]})["lena@acme.com"]
+    db.session.commit()
+    client = app.test_client()
+
+    assert client.get(f"/tasks/decline/{item['token']}").status_code == 200
+    assert PendingTask.query.one().status == 'declined'
+    del statements[:]
+    assert client.get(f"/tasks/decline/{item['token']}").status_code == 404
+    assert client.get(f"/tasks/accept/{item['token']}").status_code == 404
+    assert statements == []
+
+
+def test_decline_loses_to_a_concurrent_accept(app, monkeypatch):
+    [item] = create_pending_tasks({"lena@acme.com": [{"description": "Report"}]})["lena@acme.com"]
+    db.session.commit()
+    find_pending_task = task_routes.find_pending_task
+
+    def accepted_meanwhile(token):
+        found = find_pending_task(token)
+        PendingTask.query.update({'status': 'syncing'}, synchronize_session=False)
+        return found
+    monkeypatch.setattr(task_routes, "find_pending_task", accepted_meanwhile)
+
+    assert app.test_client().get(f"/tasks/decline/{item['token']}").status_code == 404
+    db.session.expire_all()
+    assert PendingTask.query.one().status == 'syncing'
+    assert not task_routes.consumed_tokens.might_contain(item['token'])
+
+
+def test_unsigned_legacy_links_still_work(app, monkeypatch):
+    db.session.add(PendingTask(assignee_email="lena@acme.com", description="Report", token="legacytoken"))
+    db.session.commit()
+    monkeypatch.setattr(task_routes.Config, "TASK_TOKEN_ACCEPT_LEGACY", False)
+    assert app.test_client().get('/tasks/decline/legacytoken').status_code == 404
+    monkeypatch.setattr(task_routes.Config, "TASK_TOKEN_ACCEPT_LEGACY", True)
+    assert app.test_client().get('/tasks/decline/legacytoken').status_code == 200
+
+
+def test_filter_is_rebuilt_from_answered_tasks(app):
+    for i, status in enumerate(("accepted", "declined", "syncing", "pending")):
+        db.session.add(PendingTask(assignee_email="lena@acme.com", token=f"tok-{i}", status=status))
+    db.session.commit()
+    consumed = ConsumedTokenFilter(1000, 0.001)
+    consumed.add("added-before-load")
+    assert consumed.load() == 2
+    assert [consumed.might_contain(f"tok-{i}") for i in range(4)] == [True, True, False, False]
+    assert consumed.might_contain("added-before-load")
+    # Near the configured error rate at capacity
+    for i in range(1000):
+        consumed.add(f"used-{i}")
+    assert sum(consumed.might_contain(f"fresh-{i}") for i in range(10000)) < 50
+
+
+def test_generated_key_is_kept(tmp_path):
+    path = str(tmp_path / "keys" / "task_token.key")
+    key = load_or_create_key(path)
+    assert len(key) == 32 and load_or_create_key(path) == key
+    assert os.listdir(tmp_path / "keys") == ["task_token.key"]
+
+
+def test_production_requires_the_secret(monkeypatch, capsys):
+    monkeypatch.setattr(task_tokens.Config, "TASK_TOKEN_SECRET", None)
+    monkeypatch.setattr(task_tokens.Config, "TASK_TOKEN_REQUIRE_SECRET", True)
+    with pytest.raises(ValueError):
+        check_signing_key()
+    monkeypatch.setattr(task_tokens.Config, "TASK_TOKEN_REQUIRE_SECRET", False)
+    check_signing_key()
+    assert "TASK_TOKEN_SECRET not set" in capsys.readouterr().out
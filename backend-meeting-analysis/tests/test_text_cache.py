@@ -0,0 +1,50 @@
+import sys
+import os
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from io import BytesIO
+
+from werkzeug.datastructures import FileStorage
+
+from documents import handlers
+from documents.text_cache import TextCache
+
+
+def test_lru_eviction_by_total_size(tmp_path):
+    cache = TextCache(str(tmp_path / "text.sqlite"), max_bytes=2500, compression_level=1)
+    texts = {key: os.urandom(1000).hex() for key in "abc"}   # ~1000 bytes compressed each
+    cache.put("a", texts["a"], 5000)
+    cache.put("b", texts["b"], 5000)
+    assert cache.get("a") == texts["a"]      # a is now more recently used than b
+    cache.put("c", texts["c"], 5000)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == texts["a"]
+    assert cache.get("c") == texts["c"]
+    stats = cache.get_stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 2 and stats["stored_bytes"] <= 2500
+    assert stats["hits"] == 3 and stats["misses"] == 1
+    assert stats["bytes_saved"] == 15000
+
+
+def test_repeated_upload_skips_parsing(tmp_path, monkeypatch):
+    cache = TextCache(str(tmp_path / "text.sqlite"), max_bytes=10 ** 6)
+    monkeypatch.setattr(handlers, "text_cache", cache)
+    calls = []
+
+    def fake_pdf(source):
+        calls.append(source)
+        return "Decision 1: ship on Friday\n"
+
+    monkeypatch.setattr(handlers, "extract_text_from_pdf", fake_pdf)
+    for _ in range(3):
+        upload = FileStorage(BytesIO(b"%PDF-1.4 same protocol"), filename="protocol.pdf")
+        assert handlers.extract_text_from_file(upload) == "Decision 1: ship on Friday\n"
+    other = FileStorage(BytesIO(b"%PDF-1.4 other protocol"), filename="protocol.pdf")
+    handlers.extract_text_from_file(other)
+
+    assert len(calls) == 2
+    stats = cache.get_stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2
+    assert stats["hit_ratio"] == 0.5
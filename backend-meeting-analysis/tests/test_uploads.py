@@ -0,0 +1,37 @@
+import sys
+import os
+os.environ["OPENROUTER_API_KEY"] = "dummykeyfortesting"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from io import BytesIO
+
+import pytest
+
+from documents.handlers import extract_text_from_txt
+from documents.uploads import UploadTooLarge, spool_stream
+
+
+def test_small_documents_stay_in_memory():
+    document = spool_stream(BytesIO(b"Decision: ship it"), "notes.txt", max_bytes=1000, threshold=100)
+    assert document.path is None
+    assert document.size == 17
+    assert extract_text_from_txt(document.source) == "Decision: ship it"
+
+
+def test_large_documents_are_spooled_and_deleted_on_close():
+    content = "Entscheidung: Release am Freitag. ".encode("utf-8") * 10000
+    with spool_stream(BytesIO(content), "notes.txt", max_bytes=10 ** 6, threshold=1024) as document:
+        path = document.path
+        assert path and path.endswith(".txt")
+        assert os.path.getsize(path) == len(content)
+        assert extract_text_from_txt(document.source) == content.decode("utf-8")
+        with document.open() as f:
+            assert f.read(12) == b"Entscheidung"
+    assert not os.path.exists(path)
+
+
+def test_size_limit_stops_copying():
+    stream = BytesIO(b"x" * 200000)
+    with pytest.raises(UploadTooLarge):
+        spool_stream(stream, "big.txt", max_bytes=100000, threshold=1024)
+    # Rejected after the first chunks past the limit, not after reading everything
+    assert stream.tell() < 200000
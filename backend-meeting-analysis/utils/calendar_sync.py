@@ -0,0 +1,370 @@
+"""Background Google Calendar writes - persistent queue drained by a quota-aware worker
+
+POST /calendar/add and task acceptance only store a CalendarSyncJob and return. A worker
+thread picks queued jobs earliest deadline first (then highest priority, then oldest),
+and only when the global and the user's token bucket hold enough calls for the job's
+events, so a burst of requests is spread over time instead of hitting Google's
+rateLimitExceeded. Jobs refused for quota reasons go back to the queue with exponential
+backoff and pause the bucket concerned; events already written are skipped on the next
+attempt (integrations/calendar_index.py). Jobs are claimed with a conditional UPDATE, so
+several processes can run a worker on the same database.
+"""
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from config import Config
+from database.models import db, CalendarSyncJob, PendingTask, User
+from integrations.google_auth import CalendarAuthError, credential_manager
+from integrations.google_calendar import add_events_to_calendar_for_user, convert_date
+from utils.metrics import errors_total
+from utils.task_tokens import consumed_tokens
+
+PRIORITY_RANK = {'high': 0, 'medium': 1, 'low': 2}
+
+
+class CalendarQueueFull(Exception):
+    """Raised when CALENDAR_SYNC_QUEUE_LIMIT jobs are already waiting."""
+
+
+class TokenBucket:
+    """rate tokens per second, at most capacity stored. Not thread-safe (QuotaLimiter locks)."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def refill(self, now):
+        if now <= self.updated:
+            # Paused - refilling starts when the pause ends
+            return
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until amount tokens are available (0 if they are now)."""
+        self.refill(now)
+        amount = min(amount, self.capacity)
+        wait = max(0.0, self.paused_until - now)
+        if self.tokens < amount:
+            wait = max(wait, (amount - self.tokens) / self.rate)
+        return wait
+
+    def take(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+    def give_back(self, amount):
+        self.tokens = min(self.capacity, self.tokens + min(amount, self.capacity))
+
+    def pause(self, seconds, now):
+        """Google said no - nothing is taken for seconds, and the bucket starts empty after."""
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0.0
+        self.updated = max(self.updated, self.paused_until)
+
+
+class QuotaLimiter:
+    """One global bucket for the project's quota and one bucket per user."""
+
+    def __init__(self, rate, burst, user_rate, user_burst):
+        self.global_bucket = TokenBucket(rate, burst)
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.users = {}
+        self._lock = threading.Lock()
+
+    def user_bucket(self, user_id):
+        bucket = self.users.get(user_id)
+        if bucket is None:
+            bucket = self.users[user_id] = TokenBucket(self.user_rate, self.user_burst)
+        return bucket
+
+    def acquire(self, user_id, calls):
+        """Take calls from both buckets and return 0, or return the seconds to wait (nothing taken)."""
+        now = time.monotonic()
+        with self._lock:
+            user = self.user_bucket(user_id)
+            wait = max(self.global_bucket.wait_time(calls, now), user.wait_time(calls, now))
+            if wait == 0:
+                self.global_bucket.take(calls)
+                user.take(calls)
+            return wait
+
+    def refund(self, user_id, calls):
+        """Return calls taken by acquire() for a job that did not run."""
+        with self._lock:
+            self.global_bucket.give_back(calls)
+            self.user_bucket(user_id).give_back(calls)
+
+    def backoff(self, user_id, scopes, seconds):
+        now = time.monotonic()
+        with self._lock:
+            if 'global' in scopes:
+                self.global_bucket.pause(seconds, now)
+            if 'user' in scopes:
+                self.user_bucket(user_id).pause(seconds, now)
+
+    def get_stats(self):
+        with self._lock:
+            now = time.monotonic()
+            self.global_bucket.refill(now)
+            return {
+                "global_tokens": round(self.global_bucket.tokens, 1),
+                "global_paused_seconds": round(max(0.0, self.global_bucket.paused_until - now), 1),
+                "users": len(self.users)
+            }
+
+
+def job_priority(events):
+    """Rank of the most urgent action item (0 = high); milestones count as medium."""
+    ranks = [PRIORITY_RANK.get(str(event.get('priority', 'medium')).lower(), 1) for event in events]
+    return min(ranks, default=1)
+
+
+def job_due_at(events):
+    """Earliest deadline / milestone date among the events, or None."""
+    dates = []
+    for event in events:
+        date = convert_date(event.get('deadline') or event.get('date'))
+        if date:
+            dates.append(datetime.strptime(date, '%Y-%m-%d'))
+    return min(dates, default=None)
+
+
+def merge_results(previous, result):
+    """Job result after another attempt; events written by earlier attempts stay counted."""
+    summary = {
+        'created_events': result['created_events'],
+        'updated_events': result['updated_events'],
+        'unchanged_events': result['unchanged_events'],
+        'failed_events': result['failed_events'],
+        'personal_tasks': result['personal_tasks'],
+        'invitations_sent': result['invitations_sent'],
+    }
+    if previous:
+        written = previous['created_events'] + previous['updated_events']
+        ids = {event.get('id') for event in written}
+        summary['created_events'] = previous['created_events'] + result['created_events']
+        summary['updated_events'] = previous['updated_events'] + result['updated_events']
+        # Written by the earlier attempt, so found again as unchanged now
+        summary['unchanged_events'] = [event for event in result['unchanged_events'] if event.get('id') not in ids]
+        # Both describe the requested events, not one attempt
+        summary['personal_tasks'] = previous['personal_tasks']
+        summary['invitations_sent'] = previous['invitations_sent']
+    for key in ('created', 'updated', 'unchanged', 'failed'):
+        summary[f'{key}_count'] = len(summary[f'{key}_events'])
+    return summary
+
+
+def enqueue_calendar_sync(user_id, events, send_invitations=True, task_token=None):
+    """Store a calendar write for the worker. Returns the job."""
+    queued = CalendarSyncJob.query.filter_by(status='queued').count()
+    if queued >= Config.CALENDAR_SYNC_QUEUE_LIMIT:
+        raise CalendarQueueFull()
+    job = CalendarSyncJob(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        status='queued',
+        events=events,
+        event_count=len(events),
+        send_invitations=send_invitations,
+        task_token=task_token,
+        priority=job_priority(events),
+        due_at=job_due_at(events),
+        not_before=datetime.utcnow()
+    )
+    db.session.add(job)
+    db.session.commit()
+    if Config.CALENDAR_SYNC_WORKER:
+        calendar_sync.start(current_app._get_current_object())
+    calendar_sync.notify()
+    return job
+
+
+class CalendarSyncWorker:
+    def __init__(self, limiter, poll_interval, lease_seconds, max_attempts, backoff_base):
+        self.limiter = limiter
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.app = None
+        self.thread = None
+        self.wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self.stats = {"done": 0, "failed": 0, "rate_limited": 0, "requeued": 0}
+
+    def start(self, app):
+        """Start the worker thread of this process (once)."""
+        with self._lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.app = app
+            self.thread = threading.Thread(target=self.run, name="calendar-sync", daemon=True)
+            self.thread.start()
+        print("📅 Calendar sync worker started")
+
+    def notify(self):
+        self.wakeup.set()
+
+    def run(self):
+        last_recovery = 0.0
+        while True:
+            wait = self.poll_interval
+            try:
+                with self.app.app_context():
+                    if time.monotonic() - last_recovery > self.lease_seconds / 2:
+                        self.recover_stale()
+                        last_recovery = time.monotonic()
+                    wait = self.run_next()
+            except Exception as e:
+                errors_total.inc(component='calendar_sync')
+                print(f"❌ Calendar sync worker error: {e}")
+            finally:
+                with self.app.app_context():
+                    db.session.remove()
+            if wait:
+                self.wakeup.wait(min(wait, self.poll_interval))
+                self.wakeup.clear()
+
+    def recover_stale(self):
+        """Jobs left running by a process that died go back to the queue."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+        recovered = CalendarSyncJob.query.filter(
+            CalendarSyncJob.status == 'running',
+            CalendarSyncJob.updated_at < cutoff
+        ).update({'status': 'queued', 'updated_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        if recovered:
+            print(f"🔁 Requeued {recovered} interrupted calendar sync job(s)")
+
+    def candidates(self, limit=20):
+        return CalendarSyncJob.query.filter(
+            CalendarSyncJob.status == 'queued',
+            CalendarSyncJob.not_before <= datetime.utcnow()
+        ).order_by(
+            CalendarSyncJob.due_at.is_(None),
+            CalendarSyncJob.due_at,
+            CalendarSyncJob.priority,
+            CalendarSyncJob.created_at
+        ).limit(limit).all()
+
+    def claim(self, job):
+        claimed = CalendarSyncJob.query.filter_by(id=job.id, status='queued').update(
+            {'status': 'running', 'attempts': CalendarSyncJob.attempts + 1, 'updated_at': datetime.utcnow()},
+            synchronize_session=False)
+        db.session.commit()
+        return claimed == 1
+
+    def run_next(self):
+        """Run the most urgent job the quotas allow. Returns seconds to wait before the next look (0 = now)."""
+        waits = []
+        for job in self.candidates():
+            # One Calendar call per event (fewer when some are unchanged)
+            calls = max(job.event_count, 1)
+            wait = self.limiter.acquire(job.user_id, calls)
+            if wait:
+                # That user (or everyone) is out of quota - a job of another user may still go
+                waits.append(wait)
+                continue
+            if not self.claim(job):
+                # Another worker got it - its quota is still ours to use
+                self.limiter.refund(job.user_id, calls)
+                continue
+            db.session.refresh(job)
+            self.process(job)
+            return 0
+        return min(waits, default=self.poll_interval)
+
+    def process(self, job):
+        user = db.session.get(User, job.user_id)
+        try:
+            if user is None:
+                raise CalendarAuthError("User no longer exists")
+            result = add_events_to_calendar_for_user(
+                access_token=credential_manager.credentials_for(user),
+                events_data=job.events,
+                organizer_email=user.email,
+                send_invitations=job.send_invitations,
+                user_id=user.id
+            )
+        except CalendarAuthError as e:
+            db.session.rollback()
+            self.finish(job, 'failed', error=str(e))
+            return
+        except Exception as e:
+            db.session.rollback()
+            errors_total.inc(component='calendar_sync')
+            print(f"❌ Calendar sync job {job.id} failed: {e}")
+            self.retry_or_fail(job, job.result, str(e), scopes=())
+            return
+
+        summary = merge_results(job.result, result)
+        if result['rate_limited']:
+            with self._lock:
+                self.stats["rate_limited"] += 1
+            self.retry_or_fail(job, summary, "Google Calendar rate limit", scopes=result['rate_limited'])
+            return
+        written = summary['created_count'] + summary['updated_count'] + summary['unchanged_count']
+        status = 'failed' if summary['failed_count'] and not written else 'done'
+        self.finish(job, status, result=summary,
+                    error=summary['failed_events'][0]['error'] if status == 'failed' else None)
+
+    def retry_or_fail(self, job, result, error, scopes):
+        if job.attempts >= self.max_attempts:
+            self.finish(job, 'failed', result=result, error=error)
+            return
+        delay = min(self.backoff_base * (2 ** (job.attempts - 1)), 3600)
+        delay += random.uniform(0, delay / 4)
+        if scopes:
+            self.limiter.backoff(job.user_id, scopes, delay)
+        CalendarSyncJob.query.filter_by(id=job.id).update({
+            'status': 'queued',
+            'result': result,
+            'error': error,
+            'not_before': datetime.utcnow() + timedelta(seconds=delay),
+            'updated_at': datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+        with self._lock:
+            self.stats["requeued"] += 1
+        print(f"⏸️ Calendar sync job {job.id} requeued in {delay:.0f}s ({error})")
+
+    def finish(self, job, status, result=None, error=None):
+        CalendarSyncJob.query.filter_by(id=job.id).update(
+            {'status': status, 'result': result, 'error': error, 'updated_at': datetime.utcnow()},
+            synchronize_session=False)
+        if job.task_token:
+            # An accepted task is done once its event is in the calendar; otherwise the link works again
+            PendingTask.query.filter_by(token=job.task_token, status='syncing').update(
+                {'status': 'accepted' if status == 'done' else 'pending'}, synchronize_session=False)
+        db.session.commit()
+        if job.task_token and status == 'done':
+            consumed_tokens.add(job.task_token)
+        with self._lock:
+            self.stats[status] += 1
+        print(f"{'✅' if status == 'done' else '❌'} Calendar sync job {job.id} {status}")
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["running"] = self.thread is not None and self.thread.is_alive()
+        stats.update(self.limiter.get_stats())
+        return stats
+
+
+calendar_sync = CalendarSyncWorker(
+    QuotaLimiter(Config.CALENDAR_QUOTA_RATE, Config.CALENDAR_QUOTA_BURST,
+                 Config.CALENDAR_USER_QUOTA_RATE, Config.CALENDAR_USER_QUOTA_BURST),
+    poll_interval=Config.CALENDAR_SYNC_POLL_INTERVAL,
+    lease_seconds=Config.CALENDAR_SYNC_LEASE_SECONDS,
+    max_attempts=Config.CALENDAR_SYNC_MAX_ATTEMPTS,
+    backoff_base=Config.CALENDAR_SYNC_BACKOFF_BASE
+)
@@ -0,0 +1,70 @@
+"""One JSON encoder for everything that leaves the process (API, SSE, NDJSON, RabbitMQ, DB)
+
+Uses orjson when it is installed and falls back to the standard json module.
+Event structs (anything with to_dict()) are serialised through their own layout.
+"""
+import dataclasses
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def default(obj):
+    """Fallback for types the encoder does not know."""
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is not None:
+        return to_dict()
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (Decimal, UUID)):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj, sort_keys=False, indent=None):
+    """Encode to UTF-8 bytes (RabbitMQ bodies, HTTP payloads)."""
+    if orjson is not None:
+        options = ORJSON_OPTIONS
+        if sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=options)
+    return dumps(obj, sort_keys, indent).encode("utf-8")
+
+
+def dumps(obj, sort_keys=False, indent=None):
+    """Encode to str; non-ASCII characters are kept as they are."""
+    if orjson is not None:
+        return dumps_bytes(obj, sort_keys, indent).decode("utf-8")
+    separators = None if indent else (",", ":")
+    return json.dumps(obj, default=default, ensure_ascii=False, sort_keys=sort_keys,
+                      indent=indent, separators=separators)
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider (jsonify, request.get_json) backed by the encoder above."""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj, sort_keys=kwargs.get("sort_keys", self.sort_keys), indent=kwargs.get("indent"))
+
+    def loads(self, s, **kwargs):
+        return loads(s)
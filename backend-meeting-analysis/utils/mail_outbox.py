@@ -0,0 +1,212 @@
+"""Notification email outbox - rows written with the request, delivered by a pool of SMTP workers
+
+The request only adds OutboxMessage rows (in the same transaction as the pending tasks
+their links point to) and returns. MAIL_WORKERS threads claim due messages with a
+conditional UPDATE and send them over their own long-lived SMTP session, so a meeting
+with 15 assignees costs a few handshakes instead of 15. Temporary failures (4xx answers,
+dropped connections, timeouts) are retried with exponential backoff; permanent ones (5xx,
+refused recipients) mark the message failed at once.
+"""
+import random
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import inspect, text
+
+from config import Config
+from database.models import db, OutboxMessage
+from integrations.email_service import Message, SMTPConnection
+from utils.metrics import errors_total, smtp_send_seconds
+
+
+def enqueue_email(recipient, subject, html, user_id=None):
+    """Add a message to the outbox; it is sent once the caller commits and calls mail_outbox.wake().
+
+    user_id is the sender, the only user who may read the message's status.
+    """
+    message = OutboxMessage(user_id=user_id, recipient=recipient, subject=subject, html=html, status='queued',
+                            not_before=datetime.utcnow())
+    db.session.add(message)
+    return message
+
+
+def ensure_outbox_columns():
+    """Add user_id to an outbox_messages table created before messages had an owner."""
+    columns = {column["name"] for column in inspect(db.engine).get_columns(OutboxMessage.__tablename__)}
+    if "user_id" not in columns:
+        with db.engine.begin() as connection:
+            connection.execute(text("ALTER TABLE outbox_messages ADD COLUMN user_id INTEGER REFERENCES \"user\" (id)"))
+    for index in OutboxMessage.__table__.indexes:
+        index.create(bind=db.engine, checkfirst=True)
+
+
+def is_permanent(error):
+    """5xx answers and refused recipients will not succeed on a retry."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        # Wrong credentials are fixed in the config, not by the message - keep it queued meanwhile
+        return False
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    return False
+
+
+class MailOutbox:
+    def __init__(self, workers, poll_interval, max_attempts, backoff_base, lease_seconds):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.lease_seconds = lease_seconds
+        self.app = None
+        self.threads = []
+        self.wakeup = threading.Event()
+        self.stopping = False
+        self._lock = threading.Lock()
+        self.stats = {"sent": 0, "failed": 0, "retried": 0, "connections": 0}
+
+    def start(self, app):
+        """Start the SMTP workers of this process (once)."""
+        with self._lock:
+            if any(thread.is_alive() for thread in self.threads) or self.workers <= 0:
+                return
+            self.app = app
+            self.stopping = False
+            self.threads = [threading.Thread(target=self.run, args=(i,), name=f"smtp-{i}", daemon=True)
+                            for i in range(self.workers)]
+            for thread in self.threads:
+                thread.start()
+        print(f"📮 Mail outbox started with {self.workers} SMTP workers")
+
+    def wake(self, app=None):
+        """New messages were committed."""
+        self.start(app or current_app._get_current_object())
+        self.wakeup.set()
+
+    def stop(self):
+        self.stopping = True
+        self.wakeup.set()
+        for thread in self.threads:
+            thread.join(timeout=10)
+        self.threads = []
+
+    def run(self, index):
+        connection = SMTPConnection.from_app(
+            self.app,
+            timeout=Config.MAIL_TIMEOUT,
+            max_messages=Config.MAIL_MESSAGES_PER_CONNECTION,
+            idle_seconds=Config.MAIL_IDLE_SECONDS
+        )
+        last_recovery = 0.0
+        while not self.stopping:
+            delivered = False
+            try:
+                with self.app.app_context():
+                    if index == 0 and time.monotonic() - last_recovery > self.lease_seconds / 2:
+                        self.recover_stale()
+                        last_recovery = time.monotonic()
+                    delivered = self.deliver_next(connection)
+            except Exception as e:
+                errors_total.inc(component='smtp')
+                print(f"❌ Mail worker {index} error: {e}")
+            finally:
+                with self.app.app_context():
+                    db.session.remove()
+            if not delivered:
+                connection.close_if_idle()
+                self.wakeup.wait(self.poll_interval)
+                self.wakeup.clear()
+        connection.close()
+
+    def recover_stale(self):
+        """Messages left 'sending' by a process that died go back to the queue."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+        OutboxMessage.query.filter(
+            OutboxMessage.status == 'sending',
+            OutboxMessage.updated_at < cutoff
+        ).update({'status': 'queued', 'updated_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+
+    def claim_next(self):
+        """The oldest due message no other worker took, marked sending - or None."""
+        candidates = db.session.query(OutboxMessage.id).filter(
+            OutboxMessage.status == 'queued',
+            OutboxMessage.not_before <= datetime.utcnow()
+        ).order_by(OutboxMessage.not_before, OutboxMessage.id).limit(self.workers * 2).all()
+        for (message_id,) in candidates:
+            claimed = OutboxMessage.query.filter_by(id=message_id, status='queued').update(
+                {'status': 'sending', 'attempts': OutboxMessage.attempts + 1, 'updated_at': datetime.utcnow()},
+                synchronize_session=False)
+            db.session.commit()
+            if claimed:
+                return db.session.get(OutboxMessage, message_id)
+        return None
+
+    def deliver_next(self, connection):
+        """Send one due message over connection. False if there was none."""
+        message = self.claim_next()
+        if message is None:
+            return False
+        mail_message = Message(subject=message.subject, recipients=[message.recipient], html=message.html)
+        opened = connection.opened
+        start = time.perf_counter()
+        try:
+            connection.send(mail_message.sender, list(mail_message.send_to), mail_message.as_bytes())
+        except Exception as e:
+            smtp_send_seconds.observe(time.perf_counter() - start, outcome='error')
+            errors_total.inc(component='smtp')
+            if not isinstance(e, smtplib.SMTPResponseException) and not isinstance(e, smtplib.SMTPRecipientsRefused):
+                # The session itself is broken (timeout, dropped connection); an SMTP answer leaves it usable
+                connection.close()
+            self.count(connections=connection.opened - opened)
+            self.failed(message, e)
+            return True
+        smtp_send_seconds.observe(time.perf_counter() - start, outcome='ok')
+        message.status = 'sent'
+        message.sent_at = datetime.utcnow()
+        message.last_error = None
+        db.session.commit()
+        self.count(sent=1, connections=connection.opened - opened)
+        print(f"✅ Email sent to {message.recipient}")
+        return True
+
+    def failed(self, message, error):
+        if is_permanent(error) or message.attempts >= self.max_attempts:
+            message.status = 'failed'
+            message.last_error = str(error)
+            db.session.commit()
+            self.count(failed=1)
+            print(f"❌ Failed to send email to {message.recipient}: {error}")
+            return
+        delay = min(self.backoff_base * (2 ** (message.attempts - 1)), 3600)
+        delay += random.uniform(0, delay / 4)
+        message.status = 'queued'
+        message.last_error = str(error)
+        message.not_before = datetime.utcnow() + timedelta(seconds=delay)
+        db.session.commit()
+        self.count(retried=1)
+        print(f"⏸️ Email to {message.recipient} retried in {delay:.0f}s: {error}")
+
+    def count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self.stats[name] += delta
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["workers"] = sum(thread.is_alive() for thread in self.threads)
+        return stats
+
+
+mail_outbox = MailOutbox(
+    Config.MAIL_WORKERS,
+    poll_interval=Config.MAIL_POLL_INTERVAL,
+    max_attempts=Config.MAIL_MAX_ATTEMPTS,
+    backoff_base=Config.MAIL_BACKOFF_BASE,
+    lease_seconds=Config.MAIL_LEASE_SECONDS
+)
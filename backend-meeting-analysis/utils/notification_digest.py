@@ -0,0 +1,131 @@
+"""Digest mode for task notifications - one email per recipient and sender per window
+
+With NOTIFICATION_DIGEST_ENABLED, /notifications/send stores each recipient's tasks
+as DigestItem rows, with the sending user, instead of emailing right away. Once the
+oldest item of a recipient from one sender is NOTIFICATION_DIGEST_WINDOW seconds old,
+the flusher renders all of those items into a single email and hands it to the outbox
+as that sender's message. A high-priority task is not held back: it is sent at once,
+taking the items its sender collected for the recipient along.
+
+A flush claims a recipient's items by deleting them in the transaction that adds the
+outbox message; if another process deleted them first, the flush is rolled back.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, inspect, text
+
+from config import Config
+from database.models import db, DigestItem
+from integrations.email_service import render_task_email
+from utils.mail_outbox import enqueue_email, mail_outbox
+from utils.metrics import errors_total
+
+
+def needs_immediate(task_data):
+    """High-priority tasks bypass the digest window."""
+    return Config.NOTIFICATION_DIGEST_HIGH_PRIORITY_BYPASS and any(
+        str(item['task'].get('priority', '')).lower() == 'high' for item in task_data)
+
+
+def ensure_digest_columns():
+    """Add user_id to a notification_digest_items table created before items had a sender."""
+    columns = {column["name"] for column in inspect(db.engine).get_columns(DigestItem.__tablename__)}
+    if "user_id" not in columns:
+        with db.engine.begin() as connection:
+            connection.execute(text(
+                "ALTER TABLE notification_digest_items ADD COLUMN user_id INTEGER REFERENCES \"user\" (id)"))
+
+
+def collect(recipient, task_data, user_id=None):
+    """Hold tasks for the recipient's next digest from user_id (not committed)."""
+    now = datetime.utcnow()
+    db.session.execute(insert(DigestItem), [
+        {"recipient": recipient, "task": item['task'], "token": item['token'], "user_id": user_id,
+         "created_at": now}
+        for item in task_data
+    ])
+
+
+def take_collected(recipient, user_id=None):
+    """Remove and return the tasks user_id collected for the recipient, oldest first (not committed).
+
+    Returns None if another process took some of them meanwhile.
+    """
+    items = DigestItem.query.filter_by(recipient=recipient, user_id=user_id).order_by(DigestItem.id).all()
+    if not items:
+        return []
+    deleted = DigestItem.query.filter(DigestItem.id.in_([item.id for item in items])).delete(
+        synchronize_session=False)
+    if deleted != len(items):
+        return None
+    return [{'task': item.task, 'token': item.token} for item in items]
+
+
+def queue_task_email(recipient, task_data, user_id=None):
+    """Render once and add to the outbox (not committed)."""
+    subject, html = render_task_email(task_data)
+    return enqueue_email(recipient, subject, html, user_id)
+
+
+def flush_due_digests(window=None):
+    """Send the digests whose window has passed. Returns the number of emails queued."""
+    window = Config.NOTIFICATION_DIGEST_WINDOW if window is None else window
+    cutoff = datetime.utcnow() - timedelta(seconds=window)
+    due = db.session.query(DigestItem.recipient, DigestItem.user_id).group_by(
+        DigestItem.recipient, DigestItem.user_id).having(func.min(DigestItem.created_at) <= cutoff).all()
+    queued = 0
+    for recipient, user_id in due:
+        task_data = take_collected(recipient, user_id)
+        if not task_data:
+            db.session.rollback()
+            continue
+        queue_task_email(recipient, task_data, user_id)
+        db.session.commit()
+        queued += 1
+        print(f"📬 Digest with {len(task_data)} task(s) queued for {recipient}")
+    return queued
+
+
+class DigestFlusher:
+    """Runs flush_due_digests on a daemon thread, several times per window."""
+
+    def __init__(self, window):
+        self.interval = max(1, min(window / 4, 60))
+        self.thread = None
+        self._lock = threading.Lock()
+        self.stats = {"digests": 0}
+
+    def start(self, app):
+        with self._lock:
+            if (self.thread is not None and self.thread.is_alive()) or not Config.NOTIFICATION_DIGEST_ENABLED:
+                return
+            self.thread = threading.Thread(target=self.run, args=(app,), name="digest-flusher", daemon=True)
+            self.thread.start()
+
+    def run(self, app):
+        while True:
+            with app.app_context():
+                try:
+                    queued = flush_due_digests()
+                    if queued:
+                        with self._lock:
+                            self.stats["digests"] += queued
+                        mail_outbox.wake(app)
+                except Exception as e:
+                    db.session.rollback()
+                    errors_total.inc(component='digest')
+                    print(f"❌ Digest flush failed: {e}")
+                finally:
+                    db.session.remove()
+            time.sleep(self.interval)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["enabled"] = Config.NOTIFICATION_DIGEST_ENABLED
+        return stats
+
+
+digest_flusher = DigestFlusher(Config.NOTIFICATION_DIGEST_WINDOW)
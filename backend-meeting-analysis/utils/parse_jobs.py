@@ -0,0 +1,139 @@
+"""Background execution of /parse jobs on a bounded worker pool"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from config import Config
+from database.models import db, ParseJob
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+job_executor = ThreadPoolExecutor(max_workers=Config.PARSE_JOB_WORKERS, thread_name_prefix="parse-job")
+
+# Futures of jobs submitted by this process (job_id -> Future)
+pending_jobs = {}
+pending_lock = threading.Lock()
+
+
+class JobQueueFull(Exception):
+    """Raised when the background pool already has PARSE_JOB_QUEUE_LIMIT jobs."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it was cancelled between stages."""
+
+
+class JobContext:
+    """Handle passed to job functions for stage/progress reporting and cancellation checks."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.current = None
+        self.started = None
+
+    def update(self, **values):
+        """Atomically update the job row while it is still active; False if it no longer is."""
+        values['updated_at'] = datetime.utcnow()
+        updated = ParseJob.query.filter(
+            ParseJob.id == self.job_id,
+            ParseJob.status.in_(ACTIVE_STATUSES)
+        ).update(values, synchronize_session=False)
+        db.session.commit()
+        return updated == 1
+
+    def is_cancelled(self):
+        status = db.session.query(ParseJob.status).filter_by(id=self.job_id).scalar()
+        return status == 'cancelled'
+
+    def close_stage(self, progress):
+        if self.current is not None:
+            progress[-1]['seconds'] = round(time.monotonic() - self.started, 3)
+
+    def stage(self, name):
+        """Finish the current stage and start the next one (raises JobCancelled if cancelled)."""
+        if self.is_cancelled():
+            raise JobCancelled()
+        job = db.session.get(ParseJob, self.job_id)
+        progress = list(job.progress or [])
+        self.close_stage(progress)
+        progress.append({'stage': name, 'started_at': datetime.utcnow().isoformat() + 'Z'})
+        self.current, self.started = name, time.monotonic()
+        if not self.update(stage=name, progress=progress):
+            raise JobCancelled()
+        print(f"⏳ Job {self.job_id}: {name}")
+
+    def finish(self, events):
+        job = db.session.get(ParseJob, self.job_id)
+        progress = list(job.progress or [])
+        self.close_stage(progress)
+        self.update(status='done', stage='done', progress=progress, events=events)
+
+    def fail(self, error):
+        job = db.session.get(ParseJob, self.job_id)
+        progress = list(job.progress or [])
+        self.close_stage(progress)
+        self.update(status='failed', progress=progress, error=error)
+
+
+def run_job(app, job_id, fn, args):
+    """Worker entry point - runs fn(job, *args) inside an app context."""
+    with app.app_context():
+        job = JobContext(job_id)
+        try:
+            if not job.update(status='running'):
+                return
+            events = fn(job, *args)
+            job.finish(events)
+            print(f"✅ Job {job_id} done")
+        except JobCancelled:
+            print(f"🛑 Job {job_id} cancelled")
+        except Exception as e:
+            print(f"❌ Job {job_id} failed: {e}")
+            db.session.rollback()
+            job.fail(str(e))
+        finally:
+            db.session.remove()
+
+
+def submit_job(app, user_id, fn, *args, cleanup=None):
+    """Create the job row and queue fn on the pool. Returns the job id.
+
+    cleanup() runs once the job is over - done, failed, skipped or cancelled while queued.
+    """
+    with pending_lock:
+        if len(pending_jobs) >= Config.PARSE_JOB_QUEUE_LIMIT:
+            raise JobQueueFull()
+
+        job_id = str(uuid.uuid4())
+        db.session.add(ParseJob(id=job_id, user_id=user_id, status='queued', progress=[]))
+        db.session.commit()
+
+        future = job_executor.submit(run_job, app, job_id, fn, args)
+        pending_jobs[job_id] = future
+
+    def forget(_):
+        with pending_lock:
+            pending_jobs.pop(job_id, None)
+        if cleanup is not None:
+            cleanup()
+    future.add_done_callback(forget)
+    return job_id
+
+
+def cancel_job(job_id):
+    """Mark an active job cancelled. Queued work in this process is dropped right away;
+    running work (here or in another process) stops at its next stage boundary."""
+    updated = ParseJob.query.filter(
+        ParseJob.id == job_id,
+        ParseJob.status.in_(ACTIVE_STATUSES)
+    ).update({'status': 'cancelled', 'updated_at': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    if not updated:
+        return False
+    with pending_lock:
+        future = pending_jobs.get(job_id)
+    if future is not None:
+        future.cancel()
+    return True
@@ -0,0 +1,144 @@
+"""Emailed tasks - bulk creation, index upkeep and the expiry sweep
+
+All tasks of one notification run are inserted with a single executemany; their link
+tokens carry the task id, so they are signed from the returned ids and set with one
+bulk UPDATE (see utils/task_tokens.py). Rows older
+than PENDING_TASK_TTL_DAYS (answered or not - an unanswered link has expired by then)
+are moved to pending_tasks_archive, or deleted, PENDING_TASK_SWEEP_BATCH rows per
+transaction so the sweep never holds a long write lock on a table of millions of rows.
+"""
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, update
+
+from config import Config
+from database.models import db, PendingTask, PendingTaskArchive
+from utils.metrics import errors_total
+from utils.task_tokens import sign_task_token
+
+# Accepted tasks whose calendar write is still queued are left alone
+SWEPT_STATUSES = ('pending', 'accepted', 'declined')
+
+
+def create_pending_tasks(tasks_by_email):
+    """Store every task with a signed link token (one INSERT and one UPDATE, not committed).
+
+    Returns {email: [{'task': task, 'token': token}, ...]}.
+    """
+    rows = []
+    task_data = {}
+    now = datetime.utcnow()
+    for email, tasks in tasks_by_email.items():
+        for task in tasks:
+            # Unique placeholder until the id is known
+            token = secrets.token_urlsafe(16)
+            rows.append({
+                "description": task.get('description', task.get('message', 'No description')),
+                "assignee_email": email,
+                "deadline": task.get('deadline', 'No deadline'),
+                "priority": task.get('priority', 'medium'),
+                "token": token,
+                "status": 'pending',
+                "created_at": now
+            })
+            task_data.setdefault(email, []).append({'task': task, 'token': token})
+    if not rows:
+        return task_data
+    inserted = db.session.execute(insert(PendingTask).returning(PendingTask.id, PendingTask.token), rows).all()
+    emails = {row["token"]: row["assignee_email"] for row in rows}
+    expires_at = time.time() + Config.TASK_TOKEN_TTL_DAYS * 86400
+    tokens = {placeholder: sign_task_token(task_id, emails[placeholder], expires_at)
+              for task_id, placeholder in inserted}
+    db.session.execute(update(PendingTask), [
+        {"id": task_id, "token": tokens[placeholder]} for task_id, placeholder in inserted
+    ])
+    for items in task_data.values():
+        for item in items:
+            item['token'] = tokens[item['token']]
+    return task_data
+
+
+def ensure_pending_task_indexes():
+    """Add the declared indexes to a pending_tasks table created before the model existed."""
+    for index in PendingTask.__table__.indexes:
+        index.create(bind=db.engine, checkfirst=True)
+
+
+def sweep_expired_tasks(ttl_days=None, batch_size=None, archive=None):
+    """Archive (or delete) tasks older than ttl_days in batches. Returns the number of rows swept."""
+    ttl_days = Config.PENDING_TASK_TTL_DAYS if ttl_days is None else ttl_days
+    batch_size = batch_size or Config.PENDING_TASK_SWEEP_BATCH
+    archive = Config.PENDING_TASK_ARCHIVE if archive is None else archive
+    cutoff = datetime.utcnow() - timedelta(days=ttl_days)
+    swept = 0
+    while True:
+        # Served by ix_pending_tasks_status_created
+        batch = PendingTask.query.filter(
+            PendingTask.status.in_(SWEPT_STATUSES),
+            PendingTask.created_at < cutoff
+        ).order_by(PendingTask.created_at).limit(batch_size).all()
+        if not batch:
+            break
+        if archive:
+            now = datetime.utcnow()
+            db.session.execute(insert(PendingTaskArchive), [{
+                "description": task.description,
+                "assignee_email": task.assignee_email,
+                "deadline": task.deadline,
+                "priority": task.priority,
+                "token": task.token,
+                "status": task.status,
+                "created_at": task.created_at,
+                "archived_at": now
+            } for task in batch])
+        PendingTask.query.filter(PendingTask.id.in_([task.id for task in batch])).delete(synchronize_session=False)
+        db.session.commit()
+        swept += len(batch)
+        if len(batch) < batch_size:
+            break
+    if swept:
+        print(f"🧹 {'Archived' if archive else 'Deleted'} {swept} expired pending task(s)")
+    return swept
+
+
+class TaskSweeper:
+    """Runs sweep_expired_tasks every interval seconds on a daemon thread."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.thread = None
+        self._lock = threading.Lock()
+        self.stats = {"runs": 0, "swept": 0}
+
+    def start(self, app):
+        with self._lock:
+            if (self.thread is not None and self.thread.is_alive()) or self.interval <= 0:
+                return
+            self.thread = threading.Thread(target=self.run, args=(app,), name="task-sweeper", daemon=True)
+            self.thread.start()
+
+    def run(self, app):
+        while True:
+            with app.app_context():
+                try:
+                    swept = sweep_expired_tasks()
+                    with self._lock:
+                        self.stats["runs"] += 1
+                        self.stats["swept"] += swept
+                except Exception as e:
+                    db.session.rollback()
+                    errors_total.inc(component='task_sweeper')
+                    print(f"❌ Pending task sweep failed: {e}")
+                finally:
+                    db.session.remove()
+            time.sleep(self.interval)
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats)
+
+
+task_sweeper = TaskSweeper(Config.PENDING_TASK_SWEEP_INTERVAL)
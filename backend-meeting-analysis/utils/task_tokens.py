@@ -0,0 +1,205 @@
+"""Signed accept/decline link tokens and the filter of used links
+
+A link token is base64url("<task id>:<expiry>:<assignee email>") + "." + a truncated
+HMAC-SHA256 of that payload. Forged, mangled and expired links are turned away before
+any database access, so link-prefetching mail scanners and guessed URLs cost nothing.
+
+Links that were already used are answered from ConsumedTokenFilter, a Bloom filter
+rebuilt from the accepted/declined rows and extended as tasks are answered. Its false
+positives (CONSUMED_TOKEN_FILTER_ERROR_RATE at full capacity) report a fresh link as
+already processed; it never lets a used link through, the row's status still decides.
+"""
+import base64
+import hashlib
+import hmac
+import math
+import os
+import secrets
+import threading
+import time
+
+from config import Config
+from database.models import db, PendingTask
+
+SIGNATURE_BYTES = 16
+# 'syncing' goes back to 'pending' if the calendar write fails, so it is not final
+CONSUMED_STATUSES = ('accepted', 'declined')
+
+_file_key = None
+_key_lock = threading.Lock()
+
+
+class InvalidTaskToken(ValueError):
+    """The link was not issued by us or has been altered."""
+
+
+class ExpiredTaskToken(InvalidTaskToken):
+    """The link is genuine but past its expiry."""
+
+
+def load_or_create_key(path):
+    """Read the signing key at path, generating it on first use."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(secrets.token_bytes(32))
+    try:
+        # Atomic and fails if another process created the key meanwhile
+        os.link(tmp_path, path)
+        print(f"🔑 Generated task link signing key at {path}")
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp_path)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def check_signing_key():
+    """Startup check: the secret is required in production, the generated key is only a fallback."""
+    if Config.TASK_TOKEN_SECRET:
+        return
+    if Config.TASK_TOKEN_REQUIRE_SECRET:
+        raise ValueError("TASK_TOKEN_SECRET must be set - links signed with a per-instance key "
+                         "break on redeploy and on other replicas")
+    print(f"⚠️ TASK_TOKEN_SECRET not set - signing task links with the key at {Config.TASK_TOKEN_KEY_PATH}. "
+          f"Keep it on a persistent volume shared by all instances.")
+
+
+def signing_key():
+    global _file_key
+    if Config.TASK_TOKEN_SECRET:
+        return Config.TASK_TOKEN_SECRET.encode()
+    with _key_lock:
+        if _file_key is None:
+            _file_key = load_or_create_key(Config.TASK_TOKEN_KEY_PATH)
+        return _file_key
+
+
+def _encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def _decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _signature(payload):
+    return hmac.new(signing_key(), payload, hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+
+def sign_task_token(task_id, assignee_email, expires_at=None):
+    """Link token for a task; expires_at is a unix timestamp (default TASK_TOKEN_TTL_DAYS from now)."""
+    if expires_at is None:
+        expires_at = time.time() + Config.TASK_TOKEN_TTL_DAYS * 86400
+    payload = f"{task_id}:{int(expires_at)}:{assignee_email}".encode()
+    return f"{_encode(payload)}.{_encode(_signature(payload))}"
+
+
+def is_signed_token(token):
+    """Unsigned tokens from before signing (token_urlsafe) never contain a dot."""
+    return '.' in token
+
+
+def verify_task_token(token, now=None):
+    """Claims of a signed token, checked without the database.
+
+    Returns {'task_id', 'assignee_email', 'expires_at'}; raises InvalidTaskToken or ExpiredTaskToken.
+    """
+    try:
+        encoded, signature = token.split('.')
+        payload = _decode(encoded)
+        signature = _decode(signature)
+    except ValueError:
+        raise InvalidTaskToken("Malformed task token")
+    if not hmac.compare_digest(signature, _signature(payload)):
+        raise InvalidTaskToken("Bad task token signature")
+    try:
+        task_id, expires_at, assignee_email = payload.decode().split(':', 2)
+        claims = {'task_id': int(task_id), 'assignee_email': assignee_email, 'expires_at': int(expires_at)}
+    except ValueError:
+        raise InvalidTaskToken("Malformed task token")
+    if claims['expires_at'] <= (time.time() if now is None else now):
+        raise ExpiredTaskToken("Task link has expired")
+    return claims
+
+
+class ConsumedTokenFilter:
+    """Bloom filter of link tokens whose task was accepted or declined.
+
+    Sized for capacity tokens at error_rate false positives. Each process rebuilds it
+    from pending_tasks on first use; answers given by other processes afterwards are
+    not in it, those requests fall through to the row's status.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(64, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.stats = {"added": 0, "checks": 0, "hits": 0}
+
+    def _positions(self, token):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        step = int.from_bytes(digest[8:], 'big') | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    @staticmethod
+    def _set(bits, positions):
+        for position in positions:
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def add(self, token):
+        positions = self._positions(token)
+        with self._lock:
+            self._set(self.bits, positions)
+            self.stats["added"] += 1
+
+    def might_contain(self, token):
+        positions = self._positions(token)
+        with self._lock:
+            hit = all(self.bits[position >> 3] & (1 << (position & 7)) for position in positions)
+            self.stats["checks"] += 1
+            self.stats["hits"] += hit
+        return hit
+
+    def load(self):
+        """Rebuild from the answered tasks, keeping tokens added meanwhile. Returns the number loaded."""
+        bits = bytearray(len(self.bits))
+        loaded = 0
+        for (token,) in db.session.query(PendingTask.token).filter(
+                PendingTask.status.in_(CONSUMED_STATUSES)).yield_per(10000):
+            self._set(bits, self._positions(token))
+            loaded += 1
+        with self._lock:
+            merged = int.from_bytes(bits, 'little') | int.from_bytes(self.bits, 'little')
+            self.bits = bytearray(merged.to_bytes(len(bits), 'little'))
+            self.loaded = True
+        print(f"🧾 Consumed task link filter loaded with {loaded} token(s)")
+        return loaded
+
+    def ensure_loaded(self):
+        if self.loaded:
+            return
+        with self._load_lock:
+            if not self.loaded:
+                self.load()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update({"loaded": self.loaded, "bits": self.size, "hashes": self.hashes})
+        return stats
+
+
+consumed_tokens = ConsumedTokenFilter(Config.CONSUMED_TOKEN_FILTER_CAPACITY, Config.CONSUMED_TOKEN_FILTER_ERROR_RATE)